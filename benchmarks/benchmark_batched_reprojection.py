@@ -0,0 +1,74 @@
+"""Throughput of reproject_using_grid_batched against per variable, per time step reproject_using_grid calls.
+
+Run from the repository root: python benchmarks/benchmark_batched_reprojection.py
+"""
+
+import time
+from typing import Callable
+
+import numpy as np
+import xarray as xr
+from pyproj import CRS
+from rasterio.enums import Resampling
+
+from geospatial_grid.georeferencing import georef_netcdf_rioxarray
+from geospatial_grid.gsgrid import GSGrid
+from geospatial_grid.regridder import clear_regridder_cache
+from geospatial_grid.reprojections import reproject_using_grid, reproject_using_grid_batched
+
+N_VARIABLES = 6
+N_TIME_STEPS = 24
+SOURCE_GRID = GSGrid(x0=300000, y0=5100000, resolution=250, width=600, height=500, crs=CRS.from_epsg(32631))
+OUTPUT_GRIDS = {
+    "other CRS": GSGrid(x0=1.0, y0=46.0, resolution=0.004, width=400, height=300, crs=CRS.from_epsg(4326)),
+    "aligned coarsening": GSGrid(x0=300000, y0=5100000, resolution=1000, width=150, height=125, crs=SOURCE_GRID.crs),
+}
+
+
+def synthetic_dataset() -> xr.Dataset:
+    rng = np.random.default_rng(0)
+    coords = {"time": np.arange(N_TIME_STEPS), **SOURCE_GRID.xarray_coords}
+    data_vars = {
+        f"variable_{i}": (("time", "y", "x"), rng.random((N_TIME_STEPS, *SOURCE_GRID.shape), dtype=np.float32))
+        for i in range(N_VARIABLES)
+    }
+    return georef_netcdf_rioxarray(xr.Dataset(data_vars, coords=coords), crs=SOURCE_GRID.crs)
+
+
+def per_call(data: xr.Dataset, output_grid: GSGrid, resampling: Resampling):
+    for name in data.data_vars:
+        for time_index in range(N_TIME_STEPS):
+            reproject_using_grid(
+                data=data[name].isel(time=time_index), output_grid=output_grid, resampling_method=resampling
+            )
+
+
+def batched(data: xr.Dataset, output_grid: GSGrid, resampling: Resampling):
+    clear_regridder_cache()
+    reproject_using_grid_batched(data=data, output_grid=output_grid, resampling_method=resampling)
+
+
+def megapixels_per_second(func: Callable, data: xr.Dataset, output_grid: GSGrid, resampling: Resampling) -> float:
+    start = time.perf_counter()
+    func(data, output_grid, resampling)
+    elapsed = time.perf_counter() - start
+    # Source pixels processed per second
+    return N_VARIABLES * N_TIME_STEPS * SOURCE_GRID.width * SOURCE_GRID.height / elapsed / 1e6
+
+
+def main():
+    data = synthetic_dataset()
+    print(f"{N_VARIABLES} variables x {N_TIME_STEPS} time steps, source grid {SOURCE_GRID.shape}")
+    print(f"{'output grid':<20}{'resampling':<12}{'per call Mpx/s':>16}{'batched Mpx/s':>16}{'speed-up':>10}")
+    for grid_name, output_grid in OUTPUT_GRIDS.items():
+        for resampling in (Resampling.nearest, Resampling.bilinear, Resampling.average):
+            per_call_throughput = megapixels_per_second(per_call, data, output_grid, resampling)
+            batched_throughput = megapixels_per_second(batched, data, output_grid, resampling)
+            print(
+                f"{grid_name:<20}{resampling.name:<12}{per_call_throughput:>16.2f}{batched_throughput:>16.2f}"
+                f"{batched_throughput / per_call_throughput:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
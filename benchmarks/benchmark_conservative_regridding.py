@@ -0,0 +1,62 @@
+"""Conservative regridding of fractional snow cover from SIN_375m to UTM_375m against GDAL average resampling.
+
+Run from the repository root: python benchmarks/benchmark_conservative_regridding.py
+"""
+
+import time
+
+import numpy as np
+import xarray as xr
+from rasterio.enums import Resampling
+
+from geospatial_grid.conservative import ConservativeRegridder
+from geospatial_grid.georeferencing import georef_netcdf_rioxarray
+from geospatial_grid.grid_database import SIN375mGrid, UTM375mGrid
+from geospatial_grid.reprojections import _source_window, reproject_using_grid
+
+N_TIME_STEPS = 9
+# Alps and Massif central part of UTM_375m
+OUTPUT_GRID = UTM375mGrid().sub_grid(rows=slice(800, 1600), cols=slice(1200, 2000))
+SOURCE_GRID = SIN375mGrid().sub_grid(*_source_window(SIN375mGrid(), OUTPUT_GRID, Resampling.average))
+
+
+def synthetic_fsc() -> xr.DataArray:
+    """Fractional snow cover in [0, 100] with cloud gaps (NaN)."""
+    rng = np.random.default_rng(0)
+    fsc = rng.uniform(0, 100, (N_TIME_STEPS, *SOURCE_GRID.shape)).astype(np.float32)
+    fsc[rng.random(fsc.shape) < 0.3] = np.nan
+    coords = {"time": np.arange(N_TIME_STEPS), **SOURCE_GRID.xarray_coords}
+    return georef_netcdf_rioxarray(xr.DataArray(fsc, dims=("time", "y", "x"), coords=coords), crs=SOURCE_GRID.crs)
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    fsc = synthetic_fsc()
+    megapixels = N_TIME_STEPS * SOURCE_GRID.width * SOURCE_GRID.height / 1e6
+    print(f"{N_TIME_STEPS} time steps, source grid {SOURCE_GRID.shape}, output grid {OUTPUT_GRID.shape}")
+
+    gdal_time = timed(
+        lambda: reproject_using_grid(data=fsc, output_grid=OUTPUT_GRID, resampling_method=Resampling.average)
+    )
+    regridder = None
+
+    def build():
+        nonlocal regridder
+        regridder = ConservativeRegridder(SOURCE_GRID, OUTPUT_GRID)
+
+    build_time = timed(build)
+    apply_time = timed(lambda: regridder.regrid(fsc))
+    print(f"{'method':<36}{'seconds':>10}{'Mpx/s':>10}")
+    print(f"{'rio.reproject average':<36}{gdal_time:>10.2f}{megapixels / gdal_time:>10.2f}")
+    print(f"{'conservative weights (once)':<36}{build_time:>10.2f}{'':>10}")
+    print(f"{'conservative regridding':<36}{apply_time:>10.2f}{megapixels / apply_time:>10.2f}")
+    print(f"{regridder.weights.nnz / OUTPUT_GRID.width / OUTPUT_GRID.height:.1f} weights per output pixel")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Reprojection benchmark suite on the grids of grid_database, compared against a stored baseline.
+
+Every case runs in a fresh process and reports its wall time (best of the repeats after a warm-up run), the peak RSS of the process
+and the throughput in output megapixels per second. Cases cover reproject_using_grid (in memory and chunked),
+reproject_data and GSGrid.from_xarray for every pair of grids, data type, resampling method and grid scale.
+
+Run from the repository root:
+    python benchmarks/benchmark_suite.py --quick                  # 1024 x 1024 output windows
+    python benchmarks/benchmark_suite.py --filter SIN_375m        # full size grids, cases matching a pattern
+    python benchmarks/benchmark_suite.py --quick --save-baseline  # record the baseline of this machine
+
+The exit code is 1 when a case is slower than its baseline by more than the threshold (25% by default).
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+import numpy as np
+import xarray as xr
+from rasterio.enums import Resampling
+
+from geospatial_grid.georeferencing import georef_netcdf
+from geospatial_grid.grid_database import LatLon375mGrid, SIN375mGrid, UTM375mGrid
+from geospatial_grid.gsgrid import GSGrid
+from geospatial_grid.reprojections import (
+    _source_window,
+    reproject_data,
+    reproject_using_grid,
+    reproject_using_grid_chunked,
+)
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+QUICK_WINDOW_SIZE = 1024
+CHUNK_SIZE = 1024
+# Slowdowns below this are timer and scheduling noise
+MIN_REGRESSION_SECONDS = 0.005
+
+# (source grid, output grid) of every pair
+GRID_PAIRS: Dict[str, Callable[[], Tuple[GSGrid, GSGrid]]] = {
+    "SIN_375m->UTM_375m": lambda: (SIN375mGrid(), UTM375mGrid()),
+    "UTM_375m->GEO_375m": lambda: (UTM375mGrid(), LatLon375mGrid()),
+    "GEO_375m->UTM_375m": lambda: (LatLon375mGrid(), UTM375mGrid()),
+    "UTM_375m->UTM_750m": lambda: (UTM375mGrid(), _scaled(UTM375mGrid(), 0.5)),
+}
+SCALES = (1, 2)
+DTYPES = ("float32", "uint8")
+RESAMPLINGS = (Resampling.nearest, Resampling.bilinear, Resampling.average)
+FUNCTIONS = ("reproject_using_grid", "reproject_using_grid_chunked", "reproject_data", "from_xarray")
+
+
+class Case(NamedTuple):
+    function: str
+    grid_pair: str
+    scale: int
+    dtype: str
+    resampling: Resampling
+
+    @property
+    def name(self) -> str:
+        if self.function == "from_xarray":
+            return f"{self.function}[{self.grid_pair}, x{self.scale}, {self.dtype}]"
+        return f"{self.function}[{self.grid_pair}, x{self.scale}, {self.dtype}, {self.resampling.name}]"
+
+
+def cases() -> List[Case]:
+    all_cases = []
+    for function, grid_pair, scale, dtype in itertools.product(FUNCTIONS, GRID_PAIRS, SCALES, DTYPES):
+        # Reading the grid of data does not depend on the resampling
+        resamplings = RESAMPLINGS if function != "from_xarray" else RESAMPLINGS[:1]
+        all_cases.extend(Case(function, grid_pair, scale, dtype, resampling) for resampling in resamplings)
+    return all_cases
+
+
+def _scaled(grid: GSGrid, scale: float) -> GSGrid:
+    """Same extent, scale times more pixels along each axis."""
+    return GSGrid(
+        crs=grid.crs,
+        resolution=(grid.resolution_x / scale, grid.resolution_y / scale),
+        x0=grid.x0,
+        y0=grid.y0,
+        width=int(round(grid.width * scale)),
+        height=int(round(grid.height * scale)),
+        name=grid.name,
+    )
+
+
+def case_grids(case: Case, quick: bool) -> Tuple[GSGrid, GSGrid]:
+    source_grid, output_grid = (_scaled(grid, case.scale) for grid in GRID_PAIRS[case.grid_pair]())
+    if quick:
+        # Central output window and the source window covering it
+        size = QUICK_WINDOW_SIZE * case.scale
+        row_start, col_start = (output_grid.height - size) // 2, (output_grid.width - size) // 2
+        output_grid = output_grid.sub_grid(slice(row_start, row_start + size), slice(col_start, col_start + size))
+        source_grid = source_grid.sub_grid(*_source_window(source_grid, output_grid, case.resampling))
+    return source_grid, output_grid
+
+
+def synthetic_data(grid: GSGrid, dtype: str) -> xr.DataArray:
+    """Smooth field plus noise, with the extremes as no data."""
+    rng = np.random.default_rng(0)
+    rows, cols = np.ogrid[: grid.height, : grid.width]
+    field = 50 + 40 * np.sin(rows / 97) * np.cos(cols / 89) + rng.normal(0, 5, grid.shape)
+    if dtype == "uint8":
+        values = np.clip(field, 0, 254).astype(np.uint8)
+        data = xr.DataArray(values, coords=grid.xarray_coords, attrs={"_FillValue": 255})
+    else:
+        data = xr.DataArray(np.where(field > 95, np.nan, field).astype(dtype), coords=grid.xarray_coords)
+    return georef_netcdf(data, crs=grid.crs)
+
+
+def run_case(case: Case, quick: bool, repeats: int) -> Dict:
+    """Run a case in the current process, meant to be the only one run by this process."""
+    source_grid, output_grid = case_grids(case, quick)
+    data = synthetic_data(source_grid, case.dtype)
+    if case.function == "reproject_using_grid":
+        func = partial(reproject_using_grid, data=data, output_grid=output_grid, resampling_method=case.resampling)
+    elif case.function == "reproject_using_grid_chunked":
+        func = partial(
+            _compute_chunked,
+            data=data.chunk({"y": CHUNK_SIZE, "x": CHUNK_SIZE}),
+            output_grid=output_grid,
+            tile_width=CHUNK_SIZE,
+            tile_height=CHUNK_SIZE,
+            resampling_method=case.resampling,
+        )
+    elif case.function == "reproject_data":
+        func = partial(
+            reproject_data,
+            data=data,
+            new_crs=output_grid.crs,
+            transform=output_grid.affine,
+            shape=output_grid.shape,
+            resampling=case.resampling,
+        )
+    else:
+        func = partial(GSGrid.from_xarray, data)
+        output_grid = source_grid
+
+    # Warm-up: GDAL drivers, transformers and other process-wide caches
+    func()
+    wall_times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        wall_times.append(time.perf_counter() - start)
+    wall_time = min(wall_times)
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    return {
+        "wall_time": wall_time,
+        "peak_rss_mb": peak_rss / 2**20,
+        "megapixels_per_second": output_grid.width * output_grid.height / wall_time / 1e6,
+    }
+
+
+def _compute_chunked(**kwargs) -> xr.DataArray:
+    return reproject_using_grid_chunked(**kwargs).compute()
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """Names of the cases slower than their baseline wall time by more than threshold (a fraction)."""
+    return [
+        name
+        for name, result in results.items()
+        if name in baseline
+        and result["wall_time"] > baseline[name]["wall_time"] * (1 + threshold)
+        and result["wall_time"] - baseline[name]["wall_time"] > MIN_REGRESSION_SECONDS
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help=f"{QUICK_WINDOW_SIZE} x {QUICK_WINDOW_SIZE} outputs")
+    parser.add_argument("--filter", default="", help="Only run the cases whose name contains this string")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.25, help="Tolerated slowdown, as a fraction")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the baseline")
+    arguments = parser.parse_args()
+
+    mode = "quick" if arguments.quick else "full"
+    stored = json.loads(arguments.baseline.read_text()) if arguments.baseline.exists() else {}
+    baseline = stored.get(mode, {}).get("results", {})
+    selected = [case for case in cases() if arguments.filter in case.name]
+
+    results = {}
+    print(f"{'case':<96}{'seconds':>9}{'peak MB':>9}{'Mpx/s':>9}{'vs base':>9}")
+    # A fresh process per case: peak RSS of the case alone, no warm caches from the previous cases
+    context = multiprocessing.get_context("spawn")
+    for case in selected:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            result = executor.submit(run_case, case, arguments.quick, arguments.repeats).result()
+        results[case.name] = result
+        ratio = f"{result['wall_time'] / baseline[case.name]['wall_time']:.2f}x" if case.name in baseline else "-"
+        print(
+            f"{case.name:<96}{result['wall_time']:>9.3f}{result['peak_rss_mb']:>9.0f}"
+            f"{result['megapixels_per_second']:>9.2f}{ratio:>9}",
+            flush=True,
+        )
+
+    if arguments.save_baseline:
+        stored[mode] = {
+            "machine": {"platform": platform.platform(), "processor": platform.processor(), "python": sys.version},
+            "results": {**baseline, **results},
+        }
+        arguments.baseline.write_text(json.dumps(stored, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline saved to {arguments.baseline}")
+        return
+
+    regressions = compare(results, baseline, arguments.threshold)
+    for name in regressions:
+        print(f"REGRESSION {name}: {results[name]['wall_time']:.3f} s vs {baseline[name]['wall_time']:.3f} s")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""Regridding between grids sharing a CRS and a pixel lattice with NumPy slicing and block reductions, no GDAL warp."""
+
+from enum import Enum
+from functools import partial
+from typing import Callable, Tuple
+
+import numpy as np
+import xarray as xr
+from rasterio.enums import Resampling
+
+from geospatial_grid.georeferencing import apply_on_grid, is_nodata
+from geospatial_grid.gsgrid import PIXEL_TOLERANCE, GSGrid, GSGridError
+
+
+class ReprojectionPath(str, Enum):
+    """Code path used to regrid data from a source grid to an output grid."""
+
+    # Same CRS, resolution and pixel lattice: crop and/or pad
+    SLICE = "slice"
+    # Same CRS and pixel lattice, output pixels are blocks of source pixels: block reduction
+    BLOCK_REDUCE = "block_reduce"
+    # Same CRS and pixel lattice, source pixels are blocks of output pixels: nearest repetition
+    REPEAT = "repeat"
+    # GDAL warp
+    WARP = "warp"
+
+
+BLOCK_REDUCE_RESAMPLINGS = (
+    Resampling.nearest,
+    Resampling.average,
+    Resampling.sum,
+    Resampling.min,
+    Resampling.max,
+    Resampling.mode,
+)
+# Source pixels processed at once by the mode block reduction, bounds its memory
+MODE_BATCH_SIZE = 2**18
+
+
+def select_reprojection_path(
+    source_grid: GSGrid | None, output_grid: GSGrid, resampling: Resampling | None = None
+) -> ReprojectionPath:
+    """Fastest code path able to regrid data from source_grid to output_grid with the same result as a GDAL warp.
+
+    Coarsening with an aggregating resampling is left to GDAL when output pixels extend out of the source grid:
+    GDAL fills such pixels from the edge pixels while a block reduction would write no data.
+    """
+    resampling = Resampling.nearest if resampling is None else Resampling(resampling)
+    alignment = _lattice_alignment(source_grid, output_grid) if source_grid is not None else None
+    if alignment is None:
+        return ReprojectionPath.WARP
+    row_offset, col_offset, factor_y, factor_x = alignment
+    if factor_y == factor_x == 1:
+        return ReprojectionPath.SLICE
+    if factor_y >= 1 and factor_x >= 1:
+        if resampling not in BLOCK_REDUCE_RESAMPLINGS:
+            return ReprojectionPath.WARP
+        inside = (
+            row_offset >= 0
+            and col_offset >= 0
+            and row_offset + output_grid.height * factor_y <= source_grid.height
+            and col_offset + output_grid.width * factor_x <= source_grid.width
+        )
+        if resampling != Resampling.nearest and not inside:
+            return ReprojectionPath.WARP
+        return ReprojectionPath.BLOCK_REDUCE
+    if factor_y <= 1 and factor_x <= 1 and resampling == Resampling.nearest:
+        return ReprojectionPath.REPEAT
+    return ReprojectionPath.WARP
+
+
+def regrid_aligned(
+    data: xr.Dataset | xr.DataArray,
+    output_grid: GSGrid,
+    nodata: int | float | None = None,
+    resampling_method: Resampling | None = None,
+) -> xr.Dataset | xr.DataArray:
+    """Regrid data on a grid sharing the CRS and pixel lattice of output_grid without GDAL.
+
+    Same resolution crops are zero-copy views of the input when no padding nor no data conversion is needed.
+
+    Args:
+        data (xr.Dataset | xr.DataArray): Data to regrid
+        output_grid (GSGrid): Output grid definition in the form of an object
+        nodata (int | float | None, optional): no data value of the output Xarray object. Defaults to None.
+        resampling_method (rasterio.enums.Resampling | None, optional): Resampling method. Defaults to nearest.
+
+    Returns:
+        xr.Dataset | xr.DataArray: the regridded Xarray object
+    """
+    resampling_method = Resampling.nearest if resampling_method is None else Resampling(resampling_method)
+    func = aligned_regridding_function(GSGrid.from_xarray(data), output_grid, resampling_method)
+    return apply_on_grid(data=data, output_grid=output_grid, func=func, nodata=nodata)
+
+
+def aligned_regridding_function(
+    source_grid: GSGrid, output_grid: GSGrid, resampling: Resampling
+) -> Callable[..., np.ndarray]:
+    """regrid_aligned_array() bound to the alignment of source_grid and output_grid, for apply_on_grid()."""
+    path = select_reprojection_path(source_grid, output_grid, resampling)
+    if path == ReprojectionPath.WARP:
+        raise GSGridError(f"Data grid {source_grid} and output grid {output_grid} are not aligned")
+    row_offset, col_offset, factor_y, factor_x = _lattice_alignment(source_grid, output_grid)
+    return partial(
+        regrid_aligned_array,
+        row_offset=row_offset,
+        col_offset=col_offset,
+        factor_y=factor_y,
+        factor_x=factor_x,
+        output_shape=output_grid.shape,
+        resampling=Resampling(resampling),
+    )
+
+
+def regrid_aligned_array(
+    array: np.ndarray,
+    row_offset: int,
+    col_offset: int,
+    factor_y: float,
+    factor_x: float,
+    output_shape: Tuple[int, int],
+    resampling: Resampling,
+    src_nodata: int | float | None = None,
+    dst_nodata: int | float = np.nan,
+    skip_nan: bool = False,
+) -> np.ndarray:
+    """Regrid a (..., y, x) array to a (..., output height, output width) array on an aligned lattice.
+
+    row_offset and col_offset are the position of the output grid origin in source pixels (output pixels when
+    refining). factor_y and factor_x are the number of source pixels per output pixel. See block_reduce() for
+    skip_nan.
+    """
+    height, width = output_shape
+    if factor_y >= 1 and factor_x >= 1:
+        factor_y, factor_x = int(factor_y), int(factor_x)
+        rows = slice(row_offset, row_offset + height * factor_y)
+        cols = slice(col_offset, col_offset + width * factor_x)
+        if factor_y == factor_x == 1 or resampling == Resampling.nearest:
+            window, inside = _window(array, rows=rows, cols=cols, fill=src_nodata, dst_nodata=dst_nodata)
+            regridded = window[..., factor_y // 2 :: factor_y, factor_x // 2 :: factor_x]
+            inside = inside[factor_y // 2 :: factor_y, factor_x // 2 :: factor_x]
+            return _set_nodata(regridded, inside=inside, src_nodata=src_nodata, dst_nodata=dst_nodata)
+        window, inside = _window(array, rows=rows, cols=cols, fill=src_nodata, dst_nodata=dst_nodata)
+        return block_reduce(
+            window,
+            factor_y=factor_y,
+            factor_x=factor_x,
+            resampling=resampling,
+            src_nodata=src_nodata,
+            dst_nodata=dst_nodata,
+            inside=inside,
+            skip_nan=skip_nan,
+        )
+
+    # Refinement: every output pixel center falls in a single source pixel
+    repeat_y, repeat_x = int(round(1 / factor_y)), int(round(1 / factor_x))
+    source_rows = np.floor_divide(np.arange(height) + row_offset, repeat_y)
+    source_cols = np.floor_divide(np.arange(width) + col_offset, repeat_x)
+    rows_inside = (source_rows >= 0) & (source_rows < array.shape[-2])
+    cols_inside = (source_cols >= 0) & (source_cols < array.shape[-1])
+    regridded = np.take(
+        np.take(array, np.clip(source_rows, 0, array.shape[-2] - 1), axis=-2),
+        np.clip(source_cols, 0, array.shape[-1] - 1),
+        axis=-1,
+    )
+    return _set_nodata(
+        regridded, inside=rows_inside[:, None] & cols_inside[None, :], src_nodata=src_nodata, dst_nodata=dst_nodata
+    )
+
+
+def block_reduce(
+    array: np.ndarray,
+    factor_y: int,
+    factor_x: int,
+    resampling: Resampling,
+    src_nodata: int | float | None = None,
+    dst_nodata: int | float = np.nan,
+    inside: np.ndarray | None = None,
+    skip_nan: bool = False,
+) -> np.ndarray:
+    """Reduce (..., height * factor_y, width * factor_x) to (..., height, width) aggregating factor_y x factor_x blocks.
+
+    Follows GDAL conventions: no data pixels are ignored, NaN propagates in average and sum and is ignored in
+    min, max and mode. skip_nan ignores NaN in average and sum too. Output pixels without valid source pixels
+    are set to dst_nodata. inside optionally flags the (y, x) pixels actually on the source grid, the others
+    being padding.
+    """
+    *leading_shape, full_height, full_width = array.shape
+    height, width = full_height // factor_y, full_width // factor_x
+    block_size = factor_y * factor_x
+    blocks = (
+        array.reshape(*leading_shape, height, factor_y, width, factor_x)
+        .swapaxes(-3, -2)
+        .reshape(*leading_shape, height, width, block_size)
+    )
+    valid = np.ones(blocks.shape, dtype=bool)
+    if src_nodata is not None:
+        valid &= ~is_nodata(blocks, src_nodata)
+    if inside is not None:
+        valid &= inside.reshape(height, factor_y, width, factor_x).swapaxes(-3, -2).reshape(height, width, block_size)
+    if skip_nan and np.issubdtype(blocks.dtype, np.floating):
+        valid &= ~np.isnan(blocks)
+
+    if resampling in (Resampling.average, Resampling.sum):
+        totals = np.where(valid, blocks, 0).sum(axis=-1, dtype=np.float64)
+        counts = valid.sum(axis=-1)
+        reduced = totals if resampling == Resampling.sum else totals / np.maximum(counts, 1)
+    else:
+        if np.issubdtype(blocks.dtype, np.floating):
+            valid &= ~np.isnan(blocks)
+        counts = valid.sum(axis=-1)
+        if resampling == Resampling.min:
+            reduced = np.where(valid, blocks, _largest(blocks.dtype)).min(axis=-1)
+        elif resampling == Resampling.max:
+            reduced = np.where(valid, blocks, _smallest(blocks.dtype)).max(axis=-1)
+        elif resampling == Resampling.mode:
+            reduced = _block_mode(blocks, valid)
+        else:
+            raise ValueError(f"Resampling {resampling.name} is not a block reduction")
+
+    if np.issubdtype(array.dtype, np.integer):
+        # GDAL rounds half up
+        reduced = np.floor(reduced + 0.5)
+    reduced = np.where(counts > 0, reduced, dst_nodata)
+    return reduced.astype(array.dtype, copy=False)
+
+
+def _block_mode(blocks: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """Most frequent valid value along the last axis, computed by batches of blocks to bound memory.
+
+    Like GDAL, ties go to the value reaching the top count first in row major order, that is the one whose last
+    occurrence comes first.
+    """
+    block_size = blocks.shape[-1]
+    flat_blocks, flat_valid = blocks.reshape(-1, block_size), valid.reshape(-1, block_size)
+    reduced = np.empty(flat_blocks.shape[0], dtype=blocks.dtype)
+    batch = max(1, MODE_BATCH_SIZE // block_size)
+    for start in range(0, flat_blocks.shape[0], batch):
+        batch_slice = slice(start, start + batch)
+        reduced[batch_slice] = _sorted_mode(flat_blocks[batch_slice], flat_valid[batch_slice])
+    return reduced.reshape(blocks.shape[:-1])
+
+
+def _sorted_mode(blocks: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """Mode of (number of blocks, block size) arrays from the run lengths of the sorted blocks."""
+    block_size = blocks.shape[-1]
+    # Stable sort on (validity, value): runs of equal valid values keep their row major order, invalid ones go last
+    order = np.lexsort((blocks, ~valid), axis=-1)
+    sorted_blocks = np.take_along_axis(blocks, order, axis=-1)
+    sorted_valid = np.take_along_axis(valid, order, axis=-1)
+    run_ends = np.ones(blocks.shape, dtype=bool)
+    run_ends[:, :-1] = (sorted_blocks[:, 1:] != sorted_blocks[:, :-1]) | (sorted_valid[:, 1:] != sorted_valid[:, :-1])
+    positions = np.arange(block_size)
+    run_starts = np.zeros(blocks.shape, dtype=np.intp)
+    run_starts[:, 1:] = np.where(run_ends[:, :-1], positions[1:], 0)
+    run_lengths = positions - np.maximum.accumulate(run_starts, axis=-1) + 1
+    # The run end holds the last occurrence of its value: score on count first, earliest last occurrence second
+    scores = np.where(run_ends & sorted_valid, run_lengths * block_size + (block_size - 1 - order), -1)
+    return np.take_along_axis(sorted_blocks, scores.argmax(axis=-1)[:, None], axis=-1)[:, 0]
+
+
+def _lattice_alignment(source_grid: GSGrid, output_grid: GSGrid) -> Tuple[int, int, float, float] | None:
+    """(row offset, col offset, factor y, factor x) when both grids share the CRS and pixel lattice, else None.
+
+    Factors are the number of source pixels per output pixel, integers when coarsening and 1 / integers when
+    refining. Offsets are the output grid origin position in source pixels, in output pixels when refining.
+    """
+    if source_grid.crs != output_grid.crs:
+        return None
+    factors = []
+    for source_resolution, output_resolution in (
+        (source_grid.resolution_y, output_grid.resolution_y),
+        (source_grid.resolution_x, output_grid.resolution_x),
+    ):
+        if _is_integer(output_resolution / source_resolution):
+            factors.append(round(output_resolution / source_resolution))
+        elif _is_integer(source_resolution / output_resolution):
+            factors.append(1 / round(source_resolution / output_resolution))
+        else:
+            return None
+    factor_y, factor_x = factors
+    if (factor_y - 1) * (factor_x - 1) < 0:
+        # Coarsening on one axis and refining on the other
+        return None
+    unit_y = source_grid.resolution_y if factor_y >= 1 else output_grid.resolution_y
+    unit_x = source_grid.resolution_x if factor_x >= 1 else output_grid.resolution_x
+    row_offset = (source_grid.y0 - output_grid.y0) / unit_y
+    col_offset = (output_grid.x0 - source_grid.x0) / unit_x
+    if not (_is_integer(row_offset) and _is_integer(col_offset)):
+        return None
+    return int(round(row_offset)), int(round(col_offset)), factor_y, factor_x
+
+
+def _window(
+    array: np.ndarray, rows: slice, cols: slice, fill: int | float | None, dst_nodata: int | float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """array[..., rows, cols] with rows and cols possibly out of the array, padded, and the inside pixels mask.
+
+    The window is a view of array when no padding is needed.
+    """
+    full_height, full_width = array.shape[-2:]
+    row_start, row_stop = max(rows.start, 0), min(rows.stop, full_height)
+    col_start, col_stop = max(cols.start, 0), min(cols.stop, full_width)
+    inside = np.zeros((rows.stop - rows.start, cols.stop - cols.start), dtype=bool)
+    inside_rows = slice(row_start - rows.start, max(row_stop - rows.start, row_start - rows.start))
+    inside_cols = slice(col_start - cols.start, max(col_stop - cols.start, col_start - cols.start))
+    inside[inside_rows, inside_cols] = True
+    if inside.all():
+        return array[..., rows, cols], inside
+    window = np.full(array.shape[:-2] + inside.shape, dst_nodata if fill is None else fill, dtype=array.dtype)
+    if row_stop > row_start and col_stop > col_start:
+        window[..., inside_rows, inside_cols] = array[..., row_start:row_stop, col_start:col_stop]
+    return window, inside
+
+
+def _set_nodata(
+    regridded: np.ndarray, inside: np.ndarray, src_nodata: int | float | None, dst_nodata: int | float
+) -> np.ndarray:
+    """Map source no data and padding to dst_nodata, copying only when needed."""
+    to_replace = ~inside
+    if src_nodata is not None and not is_nodata(dst_nodata, src_nodata):
+        to_replace = to_replace | is_nodata(regridded, src_nodata)
+    if not to_replace.any():
+        return regridded
+    return np.where(to_replace, dst_nodata, regridded).astype(regridded.dtype, copy=False)
+
+
+def _is_integer(value: float) -> bool:
+    return abs(value - round(value)) <= PIXEL_TOLERANCE
+
+
+def _largest(dtype: np.dtype) -> int | float:
+    return np.inf if np.issubdtype(dtype, np.floating) else np.iinfo(dtype).max
+
+
+def _smallest(dtype: np.dtype) -> int | float:
+    return -np.inf if np.issubdtype(dtype, np.floating) else np.iinfo(dtype).min
@@ -0,0 +1,179 @@
+"""Concurrent regridding of many files onto one grid, results streamed as they complete."""
+
+import multiprocessing
+import os
+import tempfile
+import threading
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, NamedTuple, Set
+
+import rasterio.enums
+import xarray as xr
+
+from geospatial_grid.gsgrid import GSGrid
+from geospatial_grid.reprojections import reproject_using_grid
+
+# Files opened with the grid mapping variable decoded as a coordinate, as rioxarray expects it
+DEFAULT_OPEN_KWARGS = {"decode_coords": "all"}
+
+# The HDF5 library behind NetCDF files is not thread-safe, file reads and writes of the worker threads are serialized
+_netcdf_lock = threading.Lock()
+
+
+class BatchError(Exception):
+    pass
+
+
+class BatchResult(NamedTuple):
+    path: Path
+    # Path of the written file, or the regridded Dataset loaded in memory when no output directory is given
+    output: Path | xr.Dataset | None
+    error: BaseException | None
+    # Formatted traceback of the error, raised in a worker thread or process
+    error_traceback: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def reproject_files(
+    paths: Iterable[str | Path],
+    output_grid: GSGrid,
+    output_dir: str | Path | None = None,
+    nodata: int | float | None = None,
+    resampling_method: rasterio.enums.Resampling | None = None,
+    max_workers: int | None = None,
+    max_pending: int | None = None,
+    use_processes: bool = False,
+    open_kwargs: Dict | None = None,
+    output_name: Callable[[Path], str] | None = None,
+) -> Iterator[BatchResult]:
+    """Regrid many files onto output_grid concurrently, yielding a BatchResult per file as soon as it completes.
+
+    Every file is read, regridded with reproject_using_grid() and written to output_dir as NetCDF by a worker,
+    so that reads, warps and writes of different files overlap. Worker threads read and write one file at a time
+    (HDF5 is not thread-safe) and regrid concurrently, worker processes are fully parallel.
+    At most max_pending files are in flight: paths are consumed lazily and the next file is only submitted when
+    one completes, which bounds memory whatever the number of files. A failing file is reported in its
+    BatchResult, the batch goes on. So is a file with the output path of a previous one (BatchError), which is
+    not regridded.
+    Files are written next to their final path and renamed, an interrupted batch leaves no partial file.
+
+    Args:
+        paths (Iterable[str | Path]): Files to regrid, read with xr.load_dataset()
+        output_grid (GSGrid): Output grid definition in the form of an object
+        output_dir (str | Path | None, optional): Directory of the regridded files. Defaults to None, the
+            regridded Datasets are loaded in memory and yielded instead, only keep the ones needed.
+        nodata (int | float | None, optional): no data value of the output Xarray objects. Defaults to None.
+        resampling_method (rasterio.enums.Resampling | None, optional): Resampling method. Defaults to nearest.
+        max_workers (int | None, optional): Worker threads or processes. Defaults to the number of CPUs.
+        max_pending (int | None, optional): Files submitted and not yet yielded. Defaults to 2 * max_workers.
+        use_processes (bool, optional): Spawned worker processes instead of threads, for CPU-bound regridding
+            (e.g. cubic or lanczos resampling of large files). Defaults to False.
+        open_kwargs (Dict | None, optional): Keyword arguments of xr.load_dataset(). Defaults to DEFAULT_OPEN_KWARGS.
+        output_name (Callable[[Path], str] | None, optional): Output file name in output_dir of an input path.
+            Defaults to the input file name with a .nc suffix.
+
+    Yields:
+        BatchResult: path, output and error of every file, in completion order
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    max_pending = max(max_pending or 2 * max_workers, 1)
+    if output_dir is not None:
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+    open_kwargs = DEFAULT_OPEN_KWARGS if open_kwargs is None else open_kwargs
+    output_name = _default_output_name if output_name is None else output_name
+
+    executor: Executor
+    if use_processes:
+        # Spawned workers: forking a process where GDAL and dask threads run can deadlock
+        executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+    else:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    paths = iter(paths)
+    pending: Dict[Future, Path] = {}
+    output_paths: Set[Path] = set()
+    try:
+        while True:
+            # Backpressure: paths are only pulled while there is room in flight
+            while len(pending) < max_pending:
+                path = next(paths, None)
+                if path is None:
+                    break
+                path = Path(path)
+                output_path = output_dir / output_name(path) if output_dir is not None else None
+                if output_path is not None and output_path in output_paths:
+                    # Inputs of the same name in different directories would overwrite each other
+                    error = BatchError(f"Output file {output_path} of {path} is the output of a previous file")
+                    yield BatchResult(path=path, output=None, error=error, error_traceback=_format_error(error))
+                    continue
+                if output_path is not None:
+                    output_paths.add(output_path)
+                future = executor.submit(
+                    _reproject_file,
+                    path=path,
+                    output_grid=output_grid,
+                    output_path=output_path,
+                    nodata=nodata,
+                    resampling_method=resampling_method,
+                    open_kwargs=open_kwargs,
+                )
+                pending[future] = path
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield _batch_result(pending.pop(future), future)
+    finally:
+        # Also reached when the consumer stops iterating: files not started yet are dropped
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _default_output_name(path: Path) -> str:
+    return path.with_suffix(".nc").name
+
+
+def _batch_result(path: Path, future: Future) -> BatchResult:
+    error = future.exception()
+    if error is not None:
+        return BatchResult(path=path, output=None, error=error, error_traceback=_format_error(error))
+    return BatchResult(path=path, output=future.result(), error=None)
+
+
+def _format_error(error: BaseException) -> str:
+    return "".join(traceback.format_exception(type(error), error, error.__traceback__))
+
+
+def _reproject_file(
+    path: Path,
+    output_grid: GSGrid,
+    output_path: Path | None,
+    nodata: int | float | None,
+    resampling_method: rasterio.enums.Resampling | None,
+    open_kwargs: Dict,
+) -> Path | xr.Dataset:
+    # Read in full and closed: the regridding below runs outside of the lock
+    with _netcdf_lock:
+        data = xr.load_dataset(path, **open_kwargs)
+    regridded = reproject_using_grid(
+        data=data, output_grid=output_grid, nodata=nodata, resampling_method=resampling_method
+    )
+    if output_path is None:
+        return regridded
+    file_descriptor, temporary_path = tempfile.mkstemp(
+        dir=output_path.parent, prefix=f".{output_path.name}.", suffix=".tmp"
+    )
+    os.close(file_descriptor)
+    try:
+        with _netcdf_lock:
+            regridded.to_netcdf(temporary_path)
+        os.replace(temporary_path, output_path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+    return output_path
@@ -0,0 +1,238 @@
+"""Conservative (area-weighted) regridding with a sparse overlap matrix computed once per pair of grids."""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+import numpy as np
+import scipy.sparse
+import xarray as xr
+
+from geospatial_grid.georeferencing import apply_on_grid, is_nodata
+from geospatial_grid.gsgrid import GSGrid
+from geospatial_grid.regridder import RegridderError, _target_pixels_to_source_pixels
+
+# (target pixel, source pixel) candidate pairs clipped at once, bounds the memory of the weight computation
+OVERLAP_BATCH_SIZE = 2**20
+# Overlaps below this fraction of a source pixel are rounding noise on shared edges
+MIN_OVERLAP = 1e-9
+
+
+class ConservativeRegridder:
+    """
+    Area-weighted regridding from a source grid to a target grid.
+
+    weights[i, j] is the area of the intersection of target pixel i with source pixel j, in source pixels. The
+    target pixel footprint is the polygon of its 4 corners projected to the source grid, i.e. pixel edges are
+    considered straight in the source CRS. Weights are computed once and stored as a CSR sparse matrix,
+    regridding is then a sparse matrix product on all the fields at once, split by rows between max_workers
+    threads (SciPy releases the GIL in sparse products).
+
+    The output is the mean of the valid source values weighted by overlap: NaN and no data source pixels are
+    left out and the weights are renormalized on the remaining ones.
+    """
+
+    def __init__(
+        self,
+        source_grid: GSGrid,
+        target_grid: GSGrid,
+        weights: scipy.sparse.csr_matrix | None = None,
+        max_workers: int | None = None,
+    ) -> None:
+        self.source_grid = source_grid
+        self.target_grid = target_grid
+        if weights is None:
+            weights = compute_overlap_weights(source_grid, target_grid)
+        expected_shape = (target_grid.width * target_grid.height, source_grid.width * source_grid.height)
+        if weights.shape != expected_shape:
+            raise RegridderError(f"Weight matrix shape {weights.shape} does not match the grids {expected_shape}")
+        self.weights = weights.tocsr()
+        self.weights_sum = np.asarray(self.weights.sum(axis=1)).ravel()
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._row_blocks = _balanced_row_blocks(self.weights, n_blocks=self.max_workers)
+
+    @property
+    def nbytes(self) -> int:
+        return self.weights.data.nbytes + self.weights.indices.nbytes + self.weights.indptr.nbytes
+
+    def regrid_array(
+        self, array: np.ndarray, src_nodata: int | float | None = None, dst_nodata: int | float = np.nan
+    ) -> np.ndarray:
+        """Regrid a (..., source height, source width) array to a (..., target height, target width) array."""
+
+        if array.shape[-2:] != self.source_grid.shape:
+            raise RegridderError(
+                f"Array shape {array.shape[-2:]} does not match source grid shape {self.source_grid.shape}"
+            )
+        leading_shape = array.shape[:-2]
+        flat = array.reshape(-1, self.source_grid.width * self.source_grid.height)
+        valid = ~np.isnan(flat) if np.issubdtype(array.dtype, np.floating) else np.ones(flat.shape, dtype=bool)
+        if src_nodata is not None:
+            valid &= ~is_nodata(flat, src_nodata)
+
+        # Fields as columns, the sparse product runs over all of them at once
+        all_valid = bool(valid.all())
+        values = flat.T if all_valid else np.where(valid, flat, 0).T
+        weighted_values = self._matmul(np.ascontiguousarray(values, dtype=np.float64))
+        if all_valid:
+            weights_sum = np.broadcast_to(self.weights_sum[:, None], weighted_values.shape)
+        else:
+            weights_sum = self._matmul(np.ascontiguousarray(valid.T, dtype=np.float64))
+
+        regridded = np.full_like(weighted_values, np.nan)
+        np.divide(weighted_values, weights_sum, out=regridded, where=weights_sum > 0)
+        regridded = regridded.T
+        missing = (weights_sum <= 0).T
+        if np.issubdtype(array.dtype, np.integer):
+            regridded = np.rint(regridded)
+        regridded[missing] = dst_nodata
+        return regridded.astype(array.dtype).reshape(*leading_shape, *self.target_grid.shape)
+
+    def _matmul(self, dense: np.ndarray) -> np.ndarray:
+        if len(self._row_blocks) == 1:
+            return self.weights @ dense
+        product = np.empty((self.weights.shape[0], dense.shape[1]), dtype=np.float64)
+
+        def _block_product(block: Tuple[int, int]) -> None:
+            start, stop = block
+            product[start:stop] = _row_block(self.weights, start, stop) @ dense
+
+        with ThreadPoolExecutor(max_workers=len(self._row_blocks)) as executor:
+            list(executor.map(_block_product, self._row_blocks))
+        return product
+
+    def regrid(self, data: xr.Dataset | xr.DataArray, nodata: int | float | None = None) -> xr.Dataset | xr.DataArray:
+        """Regrid an Xarray object on the source grid to the target grid.
+
+        Args:
+            data (xr.Dataset | xr.DataArray): Data on the source grid
+            nodata (int | float | None, optional): no data value of the output Xarray object. Defaults to None.
+
+        Returns:
+            xr.Dataset | xr.DataArray: the regridded Xarray object
+        """
+        data_shape = (data.sizes["y"], data.sizes["x"])
+        if data_shape != self.source_grid.shape:
+            raise RegridderError(f"Data shape {data_shape} does not match source grid shape {self.source_grid.shape}")
+        return apply_on_grid(data=data, output_grid=self.target_grid, func=self.regrid_array, nodata=nodata)
+
+
+def compute_overlap_weights(source_grid: GSGrid, target_grid: GSGrid) -> scipy.sparse.csr_matrix:
+    """Sparse (target pixels, source pixels) matrix of the target pixel footprint areas on every source pixel.
+
+    Footprints are the quadrilaterals of the target pixel corners in source pixel coordinates, clipped against
+    each source pixel of their bounding box, in vectorized batches of OVERLAP_BATCH_SIZE pairs.
+    """
+
+    corner_rows, corner_cols = np.meshgrid(
+        np.arange(target_grid.height + 1), np.arange(target_grid.width + 1), indexing="ij"
+    )
+    corner_cols, corner_rows = _target_pixels_to_source_pixels(
+        source_grid, target_grid, rows=corner_rows, cols=corner_cols
+    )
+    # (target pixels, 4) vertices of the footprints, in order around the pixel
+    quad_cols = _pixel_corners(corner_cols)
+    quad_rows = _pixel_corners(corner_rows)
+    # Source pixels of the footprint bounding boxes, in the source grid
+    first_cols, n_cols = _pixel_range(quad_cols, size=source_grid.width)
+    first_rows, n_rows = _pixel_range(quad_rows, size=source_grid.height)
+    # Footprints with unprojectable corners are dropped, as are those out of the source grid
+    candidates = np.isfinite(quad_cols).all(axis=1) & np.isfinite(quad_rows).all(axis=1) & (n_cols > 0) & (n_rows > 0)
+    targets = np.flatnonzero(candidates)
+    max_cols, max_rows = int(n_cols[targets].max(initial=1)), int(n_rows[targets].max(initial=1))
+    offset_cols, offset_rows = [offset.ravel() for offset in np.meshgrid(np.arange(max_cols), np.arange(max_rows))]
+
+    rows, cols, areas = [], [], []
+    targets_per_batch = max(1, OVERLAP_BATCH_SIZE // offset_cols.size)
+    for start in range(0, targets.size, targets_per_batch):
+        batch = targets[start : start + targets_per_batch]
+        # Every (target pixel, source pixel of its bounding box) pair in the source grid
+        pair_cols = first_cols[batch, None] + offset_cols[None, :]
+        pair_rows = first_rows[batch, None] + offset_rows[None, :]
+        in_box = (offset_cols[None, :] < n_cols[batch, None]) & (offset_rows[None, :] < n_rows[batch, None])
+        pair_targets, pair_offsets = np.nonzero(in_box)
+        pair_cols, pair_rows = pair_cols[pair_targets, pair_offsets], pair_rows[pair_targets, pair_offsets]
+        pair_targets = batch[pair_targets]
+        # Footprint relative to the source pixel, clipped against the unit square
+        pair_areas = _clipped_area(
+            quad_cols[pair_targets] - pair_cols[:, None], quad_rows[pair_targets] - pair_rows[:, None]
+        )
+        overlapping = pair_areas > MIN_OVERLAP
+        rows.append(pair_targets[overlapping])
+        cols.append(pair_rows[overlapping] * source_grid.width + pair_cols[overlapping])
+        areas.append(pair_areas[overlapping])
+
+    shape = (target_grid.width * target_grid.height, source_grid.width * source_grid.height)
+    if not areas:
+        return scipy.sparse.csr_matrix(shape, dtype=np.float64)
+    return scipy.sparse.csr_matrix((np.concatenate(areas), (np.concatenate(rows), np.concatenate(cols))), shape=shape)
+
+
+def _pixel_range(positions: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """First pixel and number of pixels in [0, size) covered by the (n, vertices) positions of every polygon."""
+    with np.errstate(invalid="ignore"):
+        first = np.clip(np.floor(np.nan_to_num(positions.min(axis=1), nan=-1)), 0, size).astype(np.int64)
+        stop = np.clip(np.ceil(np.nan_to_num(positions.max(axis=1), nan=-1)), 0, size).astype(np.int64)
+    return first, stop - first
+
+
+def _pixel_corners(corners: np.ndarray) -> np.ndarray:
+    """(pixels, 4) corner values of every pixel of a (height + 1, width + 1) corner array, counterclockwise."""
+    return np.stack(
+        [corners[:-1, :-1].ravel(), corners[1:, :-1].ravel(), corners[1:, 1:].ravel(), corners[:-1, 1:].ravel()],
+        axis=1,
+    )
+
+
+def _clipped_area(xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    """Area of the intersection of (n, vertices) polygons with the unit square [0, 1] x [0, 1].
+
+    Green's theorem on G(x, y) = 1[0 <= x <= 1] * clip(y, 0, 1): the area is the sum over the polygon edges of the
+    integral of G along x, which has a closed form on each edge. No polygon clipping, and the result holds for
+    any simple polygon.
+    """
+    next_xs, next_ys = np.roll(xs, -1, axis=1), np.roll(ys, -1, axis=1)
+    # Part of every edge over 0 <= x <= 1, as [start, stop] along x
+    start = np.clip(np.minimum(xs, next_xs), 0, 1)
+    stop = np.clip(np.maximum(xs, next_xs), 0, 1)
+    # Vertical edges have no length along x
+    dx = next_xs - xs
+    slope = np.divide(next_ys - ys, dx, out=np.zeros_like(dx), where=dx != 0)
+    start_ys = ys + slope * (start - xs)
+    stop_ys = ys + slope * (stop - xs)
+    length = stop - start
+    # clip(y, 0, 1) = max(y, 0) - max(y - 1, 0)
+    integral = _ramp_integral(start_ys, stop_ys, length) - _ramp_integral(start_ys - 1, stop_ys - 1, length)
+    integral = np.sign(dx) * integral
+    # Orientation independent
+    return np.abs(integral.sum(axis=1))
+
+
+def _ramp_integral(start_values: np.ndarray, stop_values: np.ndarray, length: np.ndarray) -> np.ndarray:
+    """Integral of max(L, 0) for L linear from start_values to stop_values over length."""
+    both_positive = (start_values >= 0) & (stop_values >= 0)
+    positive = np.maximum(np.maximum(start_values, stop_values), 0)
+    # Sign change: triangle up to the zero crossing
+    with np.errstate(invalid="ignore", divide="ignore"):
+        triangle = positive**2 / (2 * np.abs(stop_values - start_values))
+    return length * np.where(both_positive, (start_values + stop_values) / 2, np.nan_to_num(triangle))
+
+
+def _balanced_row_blocks(weights: scipy.sparse.csr_matrix, n_blocks: int) -> List[Tuple[int, int]]:
+    """(start, stop) bounds of row blocks of about the same number of non zero weights."""
+    n_blocks = max(1, min(n_blocks, weights.shape[0]))
+    if n_blocks == 1:
+        return [(0, weights.shape[0])]
+    bounds = np.searchsorted(weights.indptr, np.linspace(0, weights.nnz, n_blocks + 1)[1:-1])
+    bounds = np.unique(np.concatenate([[0], bounds, [weights.shape[0]]]))
+    return [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def _row_block(weights: scipy.sparse.csr_matrix, start: int, stop: int) -> scipy.sparse.csr_matrix:
+    """Rows start:stop of a CSR matrix sharing its weights and indices, weights[start:stop] would copy them."""
+    first, last = weights.indptr[start], weights.indptr[stop]
+    block = scipy.sparse.csr_matrix((stop - start, weights.shape[1]), dtype=weights.dtype)
+    # Set after construction: the constructor copies views of much larger arrays
+    block.data, block.indices = weights.data[first:last], weights.indices[first:last]
+    block.indptr = weights.indptr[start : stop + 1] - first
+    return block
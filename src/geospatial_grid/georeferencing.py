@@ -1,6 +1,21 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Tuple
+
+import numpy as np
 import xarray as xr
 import pyproj
 import rioxarray
+from affine import Affine
+
+from geospatial_grid.gsgrid import GSGrid
+from geospatial_grid.instrumentation import stage
+
+GEOREFERENCING_ATTRS_CACHE_SIZE = 64
+
+_georeferencing_attrs_cache: OrderedDict = OrderedDict()
+_georeferencing_attrs_cache_lock = threading.Lock()
 
 
 def georef_netcdf_manually(data_array: xr.DataArray | xr.Dataset, crs: pyproj.CRS) -> xr.Dataset | xr.Dataset:
@@ -33,6 +48,134 @@ def georef_netcdf_rioxarray(data_array: xr.DataArray | xr.Dataset, crs: pyproj.C
     return data_array.rio.write_crs(crs).rio.write_coordinate_system()
 
 
+def georef_netcdf(
+    data: xr.DataArray | xr.Dataset, crs: pyproj.CRS, transform: Affine | None = None
+) -> xr.DataArray | xr.Dataset:
+    """
+    Same georeferencing as georef_netcdf_rioxarray() in a single metadata-only pass.
+
+    The CF grid mapping and x/y coordinate attributes are serialized once per CRS and cached. The output is a
+    shallow copy of data: data buffers are shared, never copied.
+    With transform, the GeoTransform is written as rio.write_transform() does, as in the outputs of rio.reproject().
+    """
+
+    with stage("georeferencing"):
+        grid_mapping_attrs, x_attrs, y_attrs = _georeferencing_attrs(crs)
+        georeferenced = data.copy(deep=False)
+        grid_mapping_attrs = dict(grid_mapping_attrs)
+        if transform is not None:
+            grid_mapping_attrs["GeoTransform"] = " ".join(str(item) for item in transform.to_gdal())
+            georeferenced.attrs.pop("transform", None)
+        georeferenced.coords["spatial_ref"] = xr.Variable((), 0, attrs=grid_mapping_attrs)
+        for name, attrs in (("x", x_attrs), ("y", y_attrs)):
+            coordinate = georeferenced.coords[name].variable
+            coordinate.attrs = {**coordinate.attrs, **attrs}
+
+        # Grid mapping in the encoding of the spatial variables, as rio.write_crs() does
+        if isinstance(georeferenced, xr.Dataset):
+            for variable in georeferenced.data_vars.values():
+                if {"x", "y"}.issubset(variable.dims):
+                    variable.attrs.pop("grid_mapping", None)
+                    variable.encoding["grid_mapping"] = "spatial_ref"
+        georeferenced.attrs.pop("grid_mapping", None)
+        georeferenced.attrs.pop("crs", None)
+        georeferenced.encoding["grid_mapping"] = "spatial_ref"
+    return georeferenced
+
+
+def _georeferencing_attrs(crs: pyproj.CRS | str) -> Tuple[Dict, Dict, Dict]:
+    """spatial_ref, x and y attributes written by rioxarray for crs, computed once on a 1 pixel template."""
+    # The user input of a CRS identifies it without serializing it to WKT
+    key = crs.srs if isinstance(crs, pyproj.CRS) else crs
+    with _georeferencing_attrs_cache_lock:
+        if key in _georeferencing_attrs_cache:
+            _georeferencing_attrs_cache.move_to_end(key)
+            return _georeferencing_attrs_cache[key]
+
+    template = xr.DataArray(np.zeros((1, 1), dtype=np.uint8), coords={"y": [0.0], "x": [0.0]}, dims=("y", "x"))
+    template = georef_netcdf_rioxarray(template, crs=crs)
+    attrs = template.coords["spatial_ref"].attrs, template.coords["x"].attrs, template.coords["y"].attrs
+    with _georeferencing_attrs_cache_lock:
+        _georeferencing_attrs_cache[key] = attrs
+        while len(_georeferencing_attrs_cache) > GEOREFERENCING_ATTRS_CACHE_SIZE:
+            _georeferencing_attrs_cache.popitem(last=False)
+    return attrs
+
+
 def extract_crs(data: xr.DataArray | xr.Dataset) -> pyproj.CRS:
     """Wrap up rioxarray crs so that it's typed"""
     return data.rio.crs
+
+
+def resolve_nodata(data_array: xr.DataArray, nodata: int | float | None = None) -> int | float:
+    """Output no data value following rio.reproject() logic: explicit value, then source no data, then dtype default."""
+    if nodata is not None:
+        return nodata
+    if data_array.rio.nodata is not None:
+        return data_array.rio.nodata
+    return default_nodata(data_array.dtype)
+
+
+def default_nodata(dtype: np.dtype) -> int | float:
+    """rio.reproject() default no data value: NaN for floats, the max for unsigned and the min for signed integers."""
+    if np.issubdtype(dtype, np.floating):
+        return np.nan
+    dtype_info = np.iinfo(dtype)
+    return dtype_info.max if dtype_info.min == 0 else dtype_info.min
+
+
+def is_nodata(values: np.ndarray | float, nodata: int | float) -> np.ndarray | bool:
+    """No data mask, NaN aware."""
+    if np.isnan(nodata):
+        return np.isnan(values)
+    return values == nodata
+
+
+def apply_on_grid(
+    data: xr.Dataset | xr.DataArray,
+    output_grid: GSGrid,
+    func: Callable[..., np.ndarray],
+    nodata: int | float | None = None,
+    max_workers: int | None = 1,
+) -> xr.Dataset | xr.DataArray:
+    """Apply a NumPy regridding function to every spatial variable and georeference the result on output_grid.
+
+    func maps a (..., y, x) array of the data grid to a (..., height, width) array of output_grid, all the leading
+    dimensions (time, bands...) in one call. It is called with src_nodata and dst_nodata keyword arguments.
+    Dask-backed variables stay lazy. Variables without (y, x) dimensions are left untouched.
+    Dataset variables are regridded by max_workers threads (None for the ThreadPoolExecutor default), func has to
+    be thread-safe then.
+    """
+
+    def _apply(data_array: xr.DataArray) -> xr.DataArray:
+        if "x" not in data_array.dims or "y" not in data_array.dims:
+            return data_array
+        with stage("nodata"):
+            src_nodata, dst_nodata = data_array.rio.nodata, resolve_nodata(data_array, nodata)
+        regridded = xr.apply_ufunc(
+            func,
+            data_array,
+            kwargs={"src_nodata": src_nodata, "dst_nodata": dst_nodata},
+            input_core_dims=[["y", "x"]],
+            output_core_dims=[["y", "x"]],
+            exclude_dims={"y", "x"},
+            dask="parallelized",
+            output_dtypes=[data_array.dtype],
+            dask_gufunc_kwargs={"output_sizes": {"y": output_grid.height, "x": output_grid.width}, "allow_rechunk": True},
+            keep_attrs=True,
+        )
+        regridded.attrs["_FillValue"] = dst_nodata
+        return regridded.assign_coords(output_grid.xarray_coords)
+
+    data = data.drop_vars("spatial_ref", errors="ignore")
+    if isinstance(data, xr.Dataset) and max_workers != 1:
+        # NumPy and GDAL release the GIL, variables are regridded concurrently
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            regridded_variables = executor.map(_apply, data.data_vars.values())
+            regridded = xr.Dataset(dict(zip(data.data_vars, regridded_variables)), attrs=data.attrs)
+    elif isinstance(data, xr.Dataset):
+        regridded = data.map(_apply)
+        regridded.attrs = data.attrs
+    else:
+        regridded = _apply(data)
+    return georef_netcdf(regridded, crs=output_grid.crs, transform=output_grid.affine)
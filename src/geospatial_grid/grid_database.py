@@ -1,16 +1,36 @@
-from geospatial_grid.gsgrid import GSGrid
-from pyproj import CRS
+from __future__ import annotations
+
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Tuple
+
+# interned_crs is re-exported, it moved to gsgrid
+from geospatial_grid.gsgrid import GSGrid, GSGridError, _close, interned_crs  # noqa: F401
+
+if TYPE_CHECKING:
+    import xarray as xr
 
 
 # MODIS SIN grid
 PROJ4_MODIS = "+proj=sinu +lon_0=0 +x_0=0 +y_0=0 +R=6371007.181 +units=m +no_defs"
 
+# Grids shipped with the package
+DEFAULT_REGISTRY_PATH = Path(__file__).with_name("grid_database.json")
+
+
+class GridRegistryError(Exception):
+    pass
+
 
 class UTM375mGrid(GSGrid):
     """This grid bound correspond to a bounding box including all mountaineous areas over metropolitan France in UTM31 projection."""
+
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(
-            crs=CRS.from_epsg(32631),
+            crs="EPSG:32631",
             resolution=375,
             x0=0,
             y0=5400000,
@@ -21,9 +41,12 @@ class UTM375mGrid(GSGrid):
 
 class UTM375mGridCantal(GSGrid):
     """This grid is used in the ecample_usage.ipynb notebook."""
+
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(
-            crs=CRS.from_epsg(32631),
+            crs="EPSG:32631",
             resolution=375,
             x0=446831,
             y0=5024606,
@@ -35,9 +58,12 @@ class UTM375mGridCantal(GSGrid):
 
 class SIN375mGrid(GSGrid):
     """This grid bound correspond to a bounding box including all mountaineous areas over metropolitan France in MODIS SIN Grid."""
+
+    __slots__ = ()
+
     def __init__(self) -> None:
         super().__init__(
-            crs=CRS.from_proj4(PROJ4_MODIS),
+            crs=PROJ4_MODIS,
             resolution=370.650173222222,
             x0=-420000,
             y0=5450000,
@@ -49,9 +75,12 @@ class SIN375mGrid(GSGrid):
 
 class LatLon375mGrid(GSGrid):
     """This grid bound correspond to a bounding box including all mountaineous areas over metropolitan France in WGS84 geographic coordinates."""
+
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(
-            crs=CRS.from_epsg(4326),
+            crs="EPSG:4326",
             resolution=(0.003374578177758, 0.0033740359897170007),
             x0=-5.0033746,
             y0=51.496626,
@@ -59,3 +88,151 @@ class LatLon375mGrid(GSGrid):
             height=3112,
             name="GEO_375m",
         )
+
+
+class GridRegistry:
+    """
+    Named grids, looked up by name or by georeferencing.
+
+    find() answers "which known grid is this data on?" with a hash lookup on the CRS and shape, the few
+    candidates are then compared on their transform up to PIXEL_TOLERANCE. CRSs are matched by equivalence
+    rather than by their exact WKT. The match is memoized for every incoming CRS, repeated lookups only cost a dict access.
+    The lookup table is built on the first find(), registering grids does not parse their CRS.
+    """
+
+    def __init__(self, grids: Iterable[GSGrid] = ()) -> None:
+        self._grids_by_name: Dict[str, GSGrid] = {}
+        self._grids_by_key: Dict[Tuple, List[GSGrid]] | None = None
+        # Incoming CRS WKT -> WKT of the equivalent registry CRS (itself when none)
+        self._crs_ids: Dict[str, str] = {}
+        for grid in grids:
+            self.add(grid)
+
+    def add(self, grid: GSGrid) -> None:
+        if grid.name is None:
+            raise GridRegistryError("Only named grids can be registered")
+        if grid.name in self._grids_by_name:
+            raise GridRegistryError(f"A grid named {grid.name} is already registered")
+        self._grids_by_name[grid.name] = grid
+        # The CRS ids of previous lookups may now resolve to this grid CRS, the lookup table is rebuilt
+        self._crs_ids.clear()
+        self._grids_by_key = None
+
+    def __getitem__(self, name: str) -> GSGrid:
+        try:
+            return self._grids_by_name[name]
+        except KeyError:
+            raise GridRegistryError(f"No grid named {name}. Known grids: {list(self._grids_by_name)}") from None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._grids_by_name
+
+    def __iter__(self) -> Iterator[GSGrid]:
+        return iter(self._grids_by_name.values())
+
+    def __len__(self) -> int:
+        return len(self._grids_by_name)
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._grids_by_name)
+
+    def find(self, data: GSGrid | xr.Dataset | xr.DataArray) -> GSGrid | None:
+        """Registered grid data are on, None if there is none."""
+        if not isinstance(data, GSGrid):
+            try:
+                data = GSGrid.from_xarray(data)
+            except (GSGridError, KeyError):
+                # Not on a regular grid or no spatial coordinates
+                return None
+        if self._grids_by_key is None:
+            self._grids_by_key = {}
+            for grid in self:
+                self._grids_by_key.setdefault(self._lookup_key(grid), []).append(grid)
+        candidates = self._grids_by_key.get(self._lookup_key(data), [])
+        return next((grid for grid in candidates if _same_transform(data, grid)), None)
+
+    def _crs_id(self, grid: GSGrid) -> str | None:
+        if grid.crs is None:
+            return None
+        # The grid key caches the WKT
+        crs_wkt = grid.key[0]
+        if crs_wkt not in self._crs_ids:
+            registered_crs = {registered.key[0]: registered.crs for registered in self if registered.crs is not None}
+            self._crs_ids[crs_wkt] = next(
+                (wkt for wkt, crs in registered_crs.items() if wkt == crs_wkt or crs == grid.crs), crs_wkt
+            )
+        return self._crs_ids[crs_wkt]
+
+    def _lookup_key(self, grid: GSGrid) -> Tuple:
+        # Floating point values can't be hashed tolerantly, the transform is checked on the candidates
+        return self._crs_id(grid), grid.shape
+
+    @classmethod
+    def load(cls, path: str | Path) -> "GridRegistry":
+        """Load a JSON registry file.
+
+        {
+            "crs": {"<crs name>": "<EPSG code, PROJ string or WKT>", ...},
+            "grids": [{"name": ..., "crs": "<crs name>", "resolution": ..., "x0": ..., "y0": ..., "width": ...,
+                       "height": ...}, ...]
+        }
+        A grid "crs" can also be directly an EPSG code, PROJ string or WKT.
+        """
+        with open(path) as registry_file:
+            content = json.load(registry_file)
+        crs_definitions = content.get("crs", {})
+        try:
+            grids = [
+                GSGrid(
+                    crs=crs_definitions.get(grid["crs"], grid["crs"]) if grid["crs"] is not None else None,
+                    resolution=grid["resolution"],
+                    x0=grid["x0"],
+                    y0=grid["y0"],
+                    width=grid["width"],
+                    height=grid["height"],
+                    name=grid["name"],
+                )
+                for grid in content["grids"]
+            ]
+        except KeyError as error:
+            raise GridRegistryError(f"Missing {error} in grid registry file {path}") from None
+        return cls(grids)
+
+    def save(self, path: str | Path) -> None:
+        """Write the registry to a JSON file readable by load(), each CRS being written once."""
+        crs_names: Dict[str, str] = {}
+        grids = []
+        for grid in self:
+            crs_wkt = grid.key[0]
+            if crs_wkt is not None and crs_wkt not in crs_names:
+                crs_names[crs_wkt] = f"crs_{len(crs_names)}"
+            grids.append(
+                {
+                    "name": grid.name,
+                    "crs": crs_names.get(crs_wkt),
+                    "resolution": [grid.resolution_x, grid.resolution_y],
+                    "x0": grid.x0,
+                    "y0": grid.y0,
+                    "width": grid.width,
+                    "height": grid.height,
+                }
+            )
+        with open(path, "w") as registry_file:
+            json.dump({"crs": {name: wkt for wkt, name in crs_names.items()}, "grids": grids}, registry_file, indent=2)
+
+
+def _same_transform(grid: GSGrid, reference: GSGrid) -> bool:
+    """Origin and far edge within PIXEL_TOLERANCE of the reference ones, grids of the same shape."""
+    return (
+        _close(grid.x0, reference.x0, reference.resolution_x)
+        and _close(grid.y0, reference.y0, reference.resolution_y)
+        and _close(grid.resolution_x * grid.width, reference.resolution_x * reference.width, reference.resolution_x)
+        and _close(grid.resolution_y * grid.height, reference.resolution_y * reference.height, reference.resolution_y)
+    )
+
+
+@lru_cache(maxsize=1)
+def default_registry() -> GridRegistry:
+    """Registry of the grids shipped with the package, loaded once per process."""
+    return GridRegistry.load(DEFAULT_REGISTRY_PATH)
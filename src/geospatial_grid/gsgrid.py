@@ -1,10 +1,28 @@
-from typing import Tuple
+"""
+GSGrid grid objects. The pixel geometry (extents, windows, tiling) only needs NumPy: xarray, rasterio and pyproj
+are imported and grid CRSs parsed on first use, importing and building grids stays cheap in short-lived processes.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterable, List, NamedTuple, Sequence, Tuple
 
 import numpy as np
-import xarray as xr
-from affine import Affine
-from pyproj import CRS, Transformer
-from rasterio.transform import from_origin
+
+from geospatial_grid.instrumentation import stage
+
+if TYPE_CHECKING:
+    import rasterio
+    import xarray as xr
+    from affine import Affine
+    from pyproj import CRS
+
+
+# Tolerance on positions and sizes as a fraction of the pixel size, for floating point coordinates
+PIXEL_TOLERANCE = 1e-3
+# Points added on each edge of a grid when projecting its bounds, as in pyproj transform_bounds()
+BOUNDS_DENSIFICATION = 21
 
 
 class GSGridError(Exception):
@@ -12,6 +30,23 @@ class GSGridError(Exception):
 
 
 class GSGrid:
+    __slots__ = (
+        "resolution_x",
+        "resolution_y",
+        "x0",
+        "y0",
+        "width",
+        "height",
+        "name",
+        "_crs_input",
+        "_crs",
+        "_xcoords",
+        "_ycoords",
+        "_affine",
+        "_key",
+        "_xarray_coords",
+    )
+
     def __init__(
         self,
         x0: float,
@@ -19,23 +54,77 @@ class GSGrid:
         resolution: float | int | np.float64 | Tuple[float, float],
         width: int,
         height: int,
-        crs: CRS | None = None,
+        crs: CRS | int | str | None = None,
         name: str | None = None,
     ) -> None:
-        self.crs = crs
+        # GSGrid is immutable, attributes are set once here
+        _set = object.__setattr__
+        # Anything CRS.from_user_input() accepts, parsed on first use
+        _set(self, "_crs_input", crs)
         if type(resolution) is float or type(resolution) is int or type(resolution) is np.float64:
-            self.resolution_x = resolution
-            self.resolution_y = resolution
+            _set(self, "resolution_x", resolution)
+            _set(self, "resolution_y", resolution)
         elif len(resolution) == 2:
-            self.resolution_x = resolution[0]
-            self.resolution_y = resolution[1]
+            _set(self, "resolution_x", resolution[0])
+            _set(self, "resolution_y", resolution[1])
         else:
             raise GSGridError("Problem with resolution argument")
-        self.x0 = x0
-        self.y0 = y0
-        self.width = width
-        self.height = height
-        self.name = name
+        _set(self, "x0", x0)
+        _set(self, "y0", y0)
+        _set(self, "width", width)
+        _set(self, "height", height)
+        _set(self, "name", name)
+        self._reset_cache()
+
+    def _reset_cache(self) -> None:
+        for attribute in ("_crs", "_xcoords", "_ycoords", "_affine", "_key", "_xarray_coords"):
+            object.__setattr__(self, attribute, None)
+
+    def __setattr__(self, name, value):
+        raise GSGridError(f"GSGrid is immutable, cannot set {name}. Create a new grid instead.")
+
+    def __delattr__(self, name):
+        raise GSGridError(f"GSGrid is immutable, cannot delete {name}.")
+
+    def __getstate__(self):
+        state = {attribute: getattr(self, attribute) for attribute in GSGrid.__slots__ if not attribute.startswith("_")}
+        state["crs"] = self._crs_input
+        return state
+
+    def __setstate__(self, state):
+        for attribute, value in state.items():
+            object.__setattr__(self, "_crs_input" if attribute == "crs" else attribute, value)
+        self._reset_cache()
+
+    @property
+    def crs(self) -> CRS | None:
+        """pyproj CRS of the grid, parsed on first access. Grids given the same EPSG code, PROJ string or WKT share it."""
+        if self._crs is None and self._crs_input is not None:
+            object.__setattr__(self, "_crs", parse_crs(self._crs_input))
+        return self._crs
+
+    @property
+    def key(self) -> Tuple:
+        """Identity of the grid: CRS (WKT), affine transform and shape. The name is not part of it."""
+        if self._key is None:
+            crs_wkt = self.crs.to_wkt() if self.crs is not None else None
+            object.__setattr__(self, "_key", (crs_wkt, tuple(self.affine)[:6], self.shape))
+        return self._key
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, GSGrid):
+            return NotImplemented
+        return self is other or self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __repr__(self) -> str:
+        crs = self.crs.to_string() if self.crs is not None else None
+        return (
+            f"{type(self).__name__}(name={self.name!r}, crs={crs!r}, x0={self.x0}, y0={self.y0}, "
+            f"resolution=({self.resolution_x}, {self.resolution_y}), width={self.width}, height={self.height})"
+        )
 
     """
     GSGrid (GeoSpatial grid) object for automation of reprojections in Python.
@@ -93,15 +182,26 @@ class GSGrid:
 
     @property
     def xcoords(self) -> np.array:
-        return np.linspace(self.xmin, self.xmax, self.width)
+        """Pixel center x coordinates, computed once and returned as a read-only view."""
+        if self._xcoords is None:
+            object.__setattr__(self, "_xcoords", _read_only(np.linspace(self.xmin, self.xmax, self.width)))
+        return self._xcoords.view()
 
     @property
     def ycoords(self) -> np.array:
-        return np.linspace(self.ymax, self.ymin, self.height)
+        """Pixel center y coordinates, computed once and returned as a read-only view."""
+        if self._ycoords is None:
+            object.__setattr__(self, "_ycoords", _read_only(np.linspace(self.ymax, self.ymin, self.height)))
+        return self._ycoords.view()
 
     @property
     def affine(self) -> Affine:
-        return from_origin(self.x0, self.y0, self.resolution_x, self.resolution_y)
+        if self._affine is None:
+            from affine import Affine
+
+            affine = Affine(self.resolution_x, 0.0, self.x0, 0.0, -self.resolution_y, self.y0)
+            object.__setattr__(self, "_affine", affine)
+        return self._affine
 
     @property
     def shape(self) -> Tuple[int, int]:
@@ -109,38 +209,411 @@ class GSGrid:
 
     @property
     def xarray_coords(self) -> xr.Coordinates:
-        return xr.Coordinates({"y": self.ycoords, "x": self.xcoords})
+        """Pixel center coordinates, the indexes are built once and a shallow copy is returned."""
+        if self._xarray_coords is None:
+            import xarray as xr
+
+            with stage("coordinates") as coordinates:
+                object.__setattr__(self, "_xarray_coords", xr.Coordinates({"y": self.ycoords, "x": self.xcoords}))
+                coordinates.output = self._xcoords.nbytes + self._ycoords.nbytes
+        return self._xarray_coords.copy()
+
+    def sub_grid(self, rows: slice, cols: slice) -> "GSGrid":
+        """Grid of a pixel window of this grid."""
+        row_start, row_stop, _ = rows.indices(self.height)
+        col_start, col_stop, _ = cols.indices(self.width)
+        if row_stop <= row_start or col_stop <= col_start:
+            raise GSGridError(f"Empty window rows={rows} cols={cols} of a grid of shape {self.shape}")
+        x0, y0 = self._corner(row_start, col_start)
+        return GSGrid(
+            crs=self._shared_crs,
+            resolution=(self.resolution_x, self.resolution_y),
+            x0=x0,
+            y0=y0,
+            width=col_stop - col_start,
+            height=row_stop - row_start,
+        )
+
+    def tiles(self, tile_width: int, tile_height: int, halo: int = 0) -> List["GSGridTile"]:
+        """Split the grid in tiles of at most tile_width x tile_height pixels, row by row.
+
+        Each tile grid is extended by halo pixels on every side, clipped to the grid extent.
+        """
+        if tile_width <= 0 or tile_height <= 0 or halo < 0:
+            raise GSGridError("Tile size has to be positive and halo non negative")
+        tiles = []
+        for row_start in range(0, self.height, tile_height):
+            for col_start in range(0, self.width, tile_width):
+                core_rows = slice(row_start, min(row_start + tile_height, self.height))
+                core_cols = slice(col_start, min(col_start + tile_width, self.width))
+                rows = slice(max(core_rows.start - halo, 0), min(core_rows.stop + halo, self.height))
+                cols = slice(max(core_cols.start - halo, 0), min(core_cols.stop + halo, self.width))
+                tiles.append(
+                    GSGridTile(
+                        grid=self.sub_grid(rows=rows, cols=cols), window=(rows, cols), core_window=(core_rows, core_cols)
+                    )
+                )
+        return tiles
+
+    def coarsened(self, factor: int) -> "GSGrid":
+        """Grid of factor x factor pixel blocks on the same lattice and origin, covering the whole grid.
+
+        The last row and column of blocks are partial when the grid size is not a multiple of factor.
+        """
+        if int(factor) != factor or factor < 1:
+            raise GSGridError(f"Coarsening factor has to be a positive integer, got {factor}")
+        factor = int(factor)
+        if factor == 1:
+            return self
+        return GSGrid(
+            crs=self._shared_crs,
+            resolution=(self.resolution_x * factor, self.resolution_y * factor),
+            x0=self.x0,
+            y0=self.y0,
+            width=-(-self.width // factor),
+            height=-(-self.height // factor),
+            name=f"{self.name}_x{factor}" if self.name is not None else None,
+        )
+
+    def pyramid(self, factors: Sequence[int] = (1, 2, 4, 8)) -> List["GSGrid"]:
+        """Coarsened grids of every factor, e.g. 375 m, 750 m, 1.5 km and 3 km levels of a 375 m grid."""
+        return [self.coarsened(factor) for factor in factors]
+
+    def bounds_projected_to_epsg(self, target_epsg: int | str, densify_pts: int = BOUNDS_DENSIFICATION):
+        """Short-cut when we need grid bounds in another CRS. See project_bounds() for many grids."""
+        from geospatial_grid.transformers import get_transformer
+
+        transformer = get_transformer(self.key[0], int(target_epsg))
+        return transformer.transform_bounds(*self.extent_llx_lly_urx_ury, densify_pts=densify_pts)
+
+    def world_to_pixel(
+        self, xs: np.ndarray, ys: np.ndarray, crs: CRS | None = None
+    ) -> Tuple[np.ma.MaskedArray, np.ma.MaskedArray]:
+        """(rows, cols) of the pixels containing the (xs, ys) points, masked for points out of the grid.
+
+        Vectorized over arrays of points. xs and ys are in crs, defaults to the grid CRS.
+        """
+        xs, ys = self._to_grid_crs(xs, ys, crs)
+        cols = np.floor((xs - self.x0) / self.resolution_x)
+        rows = np.floor((self.y0 - ys) / self.resolution_y)
+        # NaN (points not projectable) compare False and are masked too
+        inside = (cols >= 0) & (cols < self.width) & (rows >= 0) & (rows < self.height)
+        rows = np.where(inside, rows, 0).astype(np.intp)
+        cols = np.where(inside, cols, 0).astype(np.intp)
+        return np.ma.MaskedArray(rows, mask=~inside), np.ma.MaskedArray(cols, mask=~inside)
+
+    def pixel_to_world(
+        self, rows: np.ndarray, cols: np.ndarray, crs: CRS | None = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(xs, ys) pixel center coordinates of (rows, cols) pixel indices, in crs (defaults to the grid CRS)."""
+        xs = self.xmin + np.asarray(cols) * self.resolution_x
+        ys = self.ymax - np.asarray(rows) * self.resolution_y
+        if crs is None or parse_crs(crs) == self.crs:
+            return xs, ys
+        from geospatial_grid.transformers import get_transformer
+
+        return get_transformer(self.key[0], crs).transform(xs, ys)
+
+    def sample(
+        self, data: np.ndarray | xr.DataArray, xs: np.ndarray, ys: np.ndarray, crs: CRS | None = None
+    ) -> np.ma.MaskedArray:
+        """Values of (..., y, x) data on this grid at the (xs, ys) points, shape (..., number of points).
+
+        Points out of the grid are masked.
+        """
+        if not isinstance(data, np.ndarray):
+            import xarray as xr
+
+            if isinstance(data, xr.DataArray):
+                data = data.transpose(..., "y", "x").values
+        if data.shape[-2:] != self.shape:
+            raise GSGridError(f"Data shape {data.shape[-2:]} does not match grid shape {self.shape}")
+        rows, cols = self.world_to_pixel(xs, ys, crs=crs)
+        values = data[..., rows.data, cols.data]
+        return np.ma.MaskedArray(values, mask=np.broadcast_to(rows.mask, values.shape))
+
+    def _to_grid_crs(self, xs: np.ndarray, ys: np.ndarray, crs: CRS | None) -> Tuple[np.ndarray, np.ndarray]:
+        xs, ys = np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+        if crs is None or parse_crs(crs) == self.crs:
+            return xs, ys
+        from geospatial_grid.transformers import get_transformer
+
+        return get_transformer(crs, self.key[0]).transform(xs, ys)
+
+    def window_of(self, other: "GSGrid") -> Tuple[slice, slice]:
+        """(rows, cols) pixel slices of other inside this grid.
+
+        other has to share the CRS, the resolution and the pixel lattice of this grid and be contained in it.
+        data_on_self.isel(y=rows, x=cols) is then a zero-copy crop of data on this grid to other.
+        """
+        if not self._same_crs(other):
+            raise GSGridError("Grids need to share the same CRS")
+        if not (
+            _close(self.resolution_x, other.resolution_x, self.resolution_x)
+            and _close(self.resolution_y, other.resolution_y, self.resolution_y)
+        ):
+            raise GSGridError("Grids need to have the same resolution")
+        col_offset = (other.x0 - self.x0) / self.resolution_x
+        row_offset = (self.y0 - other.y0) / self.resolution_y
+        if not (_close(col_offset, round(col_offset), 1) and _close(row_offset, round(row_offset), 1)):
+            raise GSGridError("Grids pixel lattices are not aligned")
+        col_offset, row_offset = int(round(col_offset)), int(round(row_offset))
+        if (
+            col_offset < 0
+            or row_offset < 0
+            or col_offset + other.width > self.width
+            or row_offset + other.height > self.height
+        ):
+            raise GSGridError("Grid is not contained in this grid")
+        return slice(row_offset, row_offset + other.height), slice(col_offset, col_offset + other.width)
+
+    def overlap_window(self, other: "GSGrid") -> Tuple[slice, slice] | None:
+        """(rows, cols) pixel slices of the part of this grid overlapped by other, None when they do not overlap.
+
+        other can be in any CRS: its bounds are projected with densified edges, so that the window covers its
+        whole footprint, possibly with a margin of pixels along curved edges.
+        """
+        window = self._pixel_window(self._bounds_of(other))
+        if window is None:
+            return None
+        (row_start, row_stop), (col_start, col_stop) = window
+        row_start, row_stop = max(row_start, 0), min(row_stop, self.height)
+        col_start, col_stop = max(col_start, 0), min(col_stop, self.width)
+        if row_stop <= row_start or col_stop <= col_start:
+            return None
+        return slice(row_start, row_stop), slice(col_start, col_stop)
+
+    def overlaps(self, other: "GSGrid") -> bool:
+        """other, in any CRS, overlaps this grid. See overlap_window()."""
+        return self.overlap_window(other) is not None
 
-    def bounds_projected_to_epsg(self, target_epsg: int | str):
-        """Short-cut when we need grid bounds in another CRS."""
-        transformer = Transformer.from_crs(crs_from=self.crs, crs_to=CRS.from_epsg(target_epsg), always_xy=True)
-        return transformer.transform_bounds(*self.extent_llx_lly_urx_ury)
+    def intersection(self, other: "GSGrid") -> "GSGrid | None":
+        """Sub-grid of this grid overlapped by other (in any CRS), None when they do not overlap.
+
+        The result is on the pixel lattice of this grid, grid.intersection(other) and other.intersection(grid)
+        differ for grids of different CRS or lattices. See overlap_window().
+        """
+        window = self.overlap_window(other)
+        return self.sub_grid(*window) if window is not None else None
+
+    def contains(self, other: "GSGrid") -> bool:
+        """The footprint of other, in any CRS, is inside the extent of this grid."""
+        window = self._pixel_window(self._bounds_of(other))
+        if window is None:
+            return False
+        (row_start, row_stop), (col_start, col_stop) = window
+        return row_start >= 0 and col_start >= 0 and row_stop <= self.height and col_stop <= self.width
+
+    def union(self, other: "GSGrid") -> "GSGrid":
+        """Smallest grid on the pixel lattice of this grid covering this grid and the footprint of other."""
+        window = self._pixel_window(self._bounds_of(other))
+        if window is None:
+            raise GSGridError(f"Grid {other} has no footprint in the CRS of this grid")
+        (row_start, row_stop), (col_start, col_stop) = window
+        row_start, row_stop = min(row_start, 0), max(row_stop, self.height)
+        col_start, col_stop = min(col_start, 0), max(col_stop, self.width)
+        x0, y0 = self._corner(row_start, col_start)
+        return GSGrid(
+            crs=self._shared_crs,
+            resolution=(self.resolution_x, self.resolution_y),
+            x0=x0,
+            y0=y0,
+            width=col_stop - col_start,
+            height=row_stop - row_start,
+        )
+
+    @property
+    def _shared_crs(self) -> CRS | int | str | None:
+        # CRS of the grids derived from this one: parsed once for all if it already is
+        return self._crs if self._crs is not None else self._crs_input
+
+    def _same_crs(self, other: "GSGrid") -> bool:
+        # Grids given the same CRS input (e.g. derived grids) are compared without parsing it
+        if self._crs_input is other._crs_input:
+            return True
+        return self.crs == other.crs
+
+    def _corner(self, row: int, col: int) -> Tuple[float, float]:
+        """(x, y) upper left corner of a pixel, as self.affine * (col, row)."""
+        return self.x0 + col * self.resolution_x, self.y0 - row * self.resolution_y
+
+    def _bounds_of(self, other: "GSGrid") -> np.ndarray:
+        """(xmin, ymin, xmax, ymax) bounds of other in the CRS of this grid, NaN when not projectable."""
+        if self._same_crs(other):
+            return np.array(other.extent_llx_lly_urx_ury, dtype=np.float64)
+        if other.crs is None or self.crs is None:
+            raise GSGridError("Grids without CRS can only be compared to grids without CRS")
+        return project_bounds([other], self.key[0])[0]
+
+    def _pixel_window(self, bounds: np.ndarray) -> Tuple[Tuple[int, int], Tuple[int, int]] | None:
+        """((row start, row stop), (col start, col stop)) pixels covering bounds, unclipped, None for NaN bounds.
+
+        Bounds within PIXEL_TOLERANCE of a pixel edge do not add the pixel beyond.
+        """
+        if np.isnan(bounds).any():
+            return None
+        xmin, ymin, xmax, ymax = bounds
+        col_start = int(np.floor((xmin - self.x0) / self.resolution_x + PIXEL_TOLERANCE))
+        col_stop = int(np.ceil((xmax - self.x0) / self.resolution_x - PIXEL_TOLERANCE))
+        row_start = int(np.floor((self.y0 - ymax) / self.resolution_y + PIXEL_TOLERANCE))
+        row_stop = int(np.ceil((self.y0 - ymin) / self.resolution_y - PIXEL_TOLERANCE))
+        return (row_start, row_stop), (col_start, col_stop)
 
     @classmethod
     def from_xarray(cls, data: xr.Dataset | xr.DataArray):
         """Extract gridding information from an Xarray object and build a GSGrid object."""
 
-        res_x = data.rio.transform().a
-        res_y = data.rio.transform().e
+        with stage("grid_from_xarray"):
+            transform = data.rio.transform()
+            res_x, res_y = transform.a, transform.e
 
-        y_coords, x_coords = data.coords["y"].values, data.coords["x"].values
+            y_coords, x_coords = data.coords["y"].values, data.coords["x"].values
 
-        width, height = len(x_coords), len(y_coords)
+            width, height = len(x_coords), len(y_coords)
 
-        if not np.array_equal(x_coords, np.arange(x_coords[0], x_coords[0] + width * res_x, res_x)) or not np.array_equal(
-            y_coords, np.arange(y_coords[0], y_coords[0] + height * res_y, res_y)
-        ):
-            raise GSGridError("Data need to be on a reguraly spaced grid")
+            if not _is_regularly_spaced(x_coords, res_x) or not _is_regularly_spaced(y_coords, res_y):
+                raise GSGridError("Data need to be on a reguraly spaced grid")
 
-        if res_y > 0:
-            raise GSGridError(
-                "Dataset/DatArray y coordinates have to be decreasing (from North to South) to use this function."
+            if res_y > 0:
+                raise GSGridError(
+                    "Dataset/DatArray y coordinates have to be decreasing (from North to South) to use this function."
+                )
+            with stage("crs_parsing"):
+                crs = data.rio.crs
+                crs = parse_crs(crs) if crs is not None else None
+            return cls(
+                crs=crs,
+                resolution=(res_x, np.abs(res_y)),
+                x0=transform.c,
+                y0=transform.f,
+                width=width,
+                height=height,
             )
+
+    @classmethod
+    def from_rasterio(cls, raster: rasterio.DatasetReader):
+        """Extract gridding information from an opened rasterio dataset and build a GSGrid object."""
+        transform = raster.transform
+        if transform.b != 0 or transform.d != 0 or transform.e > 0:
+            raise GSGridError("Raster needs to be north up, without rotation, to use this function.")
         return cls(
-            crs=data.rio.crs,
-            resolution=(res_x, np.abs(res_y)),
-            x0=data.rio.transform().c,
-            y0=data.rio.transform().f,
-            width=width,
-            height=height,
+            crs=parse_crs(raster.crs) if raster.crs is not None else None,
+            resolution=(transform.a, -transform.e),
+            x0=transform.c,
+            y0=transform.f,
+            width=raster.width,
+            height=raster.height,
+        )
+
+
+def _close(value: float, reference: float, pixel_size: float) -> bool:
+    return abs(value - reference) <= PIXEL_TOLERANCE * abs(pixel_size)
+
+
+def _is_regularly_spaced(coords: np.ndarray, step: float) -> bool:
+    """Constant stride check on coordinate differences, tolerant to floating point rounding."""
+    if coords.size < 2:
+        return True
+    steps = np.diff(coords)
+    tolerance = PIXEL_TOLERANCE * abs(step)
+    return bool(step - tolerance <= steps.min() and steps.max() <= step + tolerance)
+
+
+def parse_crs(crs: CRS | int | str) -> CRS:
+    """pyproj CRS of anything CRS.from_user_input() accepts, EPSG codes, PROJ strings and WKT through interned_crs()."""
+    if isinstance(crs, (int, str)):
+        return interned_crs(crs)
+    from pyproj import CRS
+
+    return CRS.from_user_input(crs)
+
+
+@lru_cache(maxsize=None)
+def interned_crs(crs_input: str | int) -> CRS:
+    """Shared CRS object for an EPSG code, PROJ string or WKT. Parsed once per process."""
+    from pyproj import CRS
+
+    return CRS.from_user_input(crs_input)
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    # Backed by an immutable bytes buffer, neither the array nor its views can be made writeable again
+    return np.frombuffer(array.tobytes(), dtype=array.dtype)
+
+
+class GSGridTile(NamedTuple):
+    """
+    Tile of a parent GSGrid.
+
+    grid: tile grid, halo included
+    window: (rows, cols) slices of the tile grid in the parent grid
+    core_window: (rows, cols) slices of the tile without halo in the parent grid
+    """
+
+    grid: GSGrid
+    window: Tuple[slice, slice]
+    core_window: Tuple[slice, slice]
+
+    @property
+    def row_off(self) -> int:
+        return self.window[0].start
+
+    @property
+    def col_off(self) -> int:
+        return self.window[1].start
+
+    @property
+    def core_in_tile(self) -> Tuple[slice, slice]:
+        """(rows, cols) slices of the tile without halo in the tile grid."""
+        return (
+            slice(self.core_window[0].start - self.row_off, self.core_window[0].stop - self.row_off),
+            slice(self.core_window[1].start - self.col_off, self.core_window[1].stop - self.col_off),
+        )
+
+
+def project_bounds(
+    grids: Sequence["GSGrid | GSGridTile"], crs: CRS | int | str, densify_pts: int = BOUNDS_DENSIFICATION
+) -> np.ndarray:
+    """(number of grids, 4) array of the (xmin, ymin, xmax, ymax) bounds of grids or tiles in crs.
+
+    Edges are densified with densify_pts points, all the points of the grids sharing a CRS are projected in one
+    vectorized call. Unlike pyproj transform_bounds(), bounds crossing the antimeridian are not handled.
+    Bounds of grids without any projectable point are NaN.
+    """
+    from geospatial_grid.transformers import get_transformer
+
+    grids = [grid.grid if isinstance(grid, GSGridTile) else grid for grid in grids]
+    bounds = np.full((len(grids), 4), np.nan)
+    edge = np.linspace(0, 1, densify_pts + 2)
+    xs_unit = np.concatenate([edge, np.ones_like(edge), edge[::-1], np.zeros_like(edge)])
+    ys_unit = np.concatenate([np.zeros_like(edge), edge, np.ones_like(edge), edge[::-1]])
+
+    grids_by_crs = {}
+    for index, grid in enumerate(grids):
+        grids_by_crs.setdefault(grid.key[0], []).append(index)
+    for crs_wkt, indices in grids_by_crs.items():
+        x0 = np.array([grids[i].x0 for i in indices])[:, None]
+        y0 = np.array([grids[i].y0 for i in indices])[:, None]
+        xend = np.array([grids[i].xend for i in indices])[:, None]
+        yend = np.array([grids[i].yend for i in indices])[:, None]
+        xs, ys = get_transformer(crs_wkt, crs).transform(x0 + xs_unit * (xend - x0), y0 + ys_unit * (yend - y0))
+        finite = np.isfinite(xs) & np.isfinite(ys)
+        grid_bounds = np.stack(
+            [
+                np.where(finite, xs, np.inf).min(axis=1),
+                np.where(finite, ys, np.inf).min(axis=1),
+                np.where(finite, xs, -np.inf).max(axis=1),
+                np.where(finite, ys, -np.inf).max(axis=1),
+            ],
+            axis=1,
         )
+        projectable = finite.any(axis=1)
+        bounds[np.array(indices)[projectable]] = grid_bounds[projectable]
+    return bounds
+
+
+def mosaic(tiles: Iterable[GSGridTile], tile_arrays: Iterable[np.ndarray], out: np.ndarray) -> np.ndarray:
+    """Write the (..., tile height, tile width) arrays of tiles, halo excluded, in place into the parent grid array."""
+    for tile, tile_array in zip(tiles, tile_arrays):
+        out[(..., *tile.core_window)] = tile_array[(..., *tile.core_in_tile)]
+    return out
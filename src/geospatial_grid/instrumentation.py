@@ -0,0 +1,152 @@
+"""
+Opt-in instrumentation of the reprojection pipeline.
+
+The pipeline functions time their stages (CRS parsing, coordinate building, path selection, warp, aligned
+regridding, nodata handling, georeferencing...) and report them as StageRecord to the registered callbacks.
+Without callbacks a stage costs a function call and a list check.
+
+    with record_stages() as recorder:
+        reproject_using_grid(data, output_grid=my_grid)
+    my_metrics_client.send(recorder.to_dicts())
+
+Stages can be nested (e.g. warp within reproject_using_grid), durations of nested stages overlap.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple
+
+
+class StageRecord(NamedTuple):
+    stage: str
+    # time.time() at the start of the stage
+    start: float
+    # Seconds
+    duration: float
+    bytes_in: int | None
+    bytes_out: int | None
+    # Code path taken, e.g. a ReprojectionPath value
+    path: str | None
+    # The stage raised an exception
+    failed: bool
+
+
+_callbacks: List[Callable[[StageRecord], None]] = []
+_callbacks_lock = threading.Lock()
+
+
+def add_callback(callback: Callable[[StageRecord], None]) -> None:
+    """Call callback with the record of every stage completed from now on, by any thread."""
+    global _callbacks
+    with _callbacks_lock:
+        # Replaced rather than mutated, stages iterate over it without locking
+        _callbacks = [*_callbacks, callback]
+
+
+def remove_callback(callback: Callable[[StageRecord], None]) -> None:
+    global _callbacks
+    with _callbacks_lock:
+        _callbacks = [registered for registered in _callbacks if registered != callback]
+
+
+def is_enabled() -> bool:
+    return bool(_callbacks)
+
+
+class StageRecorder:
+    """Callback collecting the stage records, as a context manager registering itself."""
+
+    def __init__(self) -> None:
+        self.records: List[StageRecord] = []
+
+    def __call__(self, record: StageRecord) -> None:
+        # list.append is atomic, stages of several threads can be recorded
+        self.records.append(record)
+
+    def __enter__(self) -> "StageRecorder":
+        add_callback(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        remove_callback(self)
+
+    def to_dicts(self) -> List[Dict]:
+        """Records as dictionaries, e.g. to be serialized to JSON."""
+        return [record._asdict() for record in self.records]
+
+    def total_durations(self) -> Dict[str, float]:
+        """Total duration of every stage, in seconds."""
+        totals: Dict[str, float] = {}
+        for record in self.records:
+            totals[record.stage] = totals.get(record.stage, 0.0) + record.duration
+        return totals
+
+
+def record_stages() -> StageRecorder:
+    """Record the stages run within a with block: with record_stages() as recorder: ..."""
+    return StageRecorder()
+
+
+class Stage:
+    """A timed stage of the pipeline. output and path can be set within the with block.
+
+    Sizes are only computed when the stage completes: data (the input) and output are arrays, Xarray objects or byte counts.
+    """
+
+    __slots__ = ("name", "data", "output", "path", "_start", "_wall_start")
+
+    def __init__(self, name: str, data: object = None, path: str | None = None) -> None:
+        self.name = name
+        self.data = data
+        self.output = None
+        self.path = path
+
+    def __enter__(self) -> "Stage":
+        self._wall_start = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        record = StageRecord(
+            stage=self.name,
+            start=self._wall_start,
+            duration=time.perf_counter() - self._start,
+            bytes_in=_nbytes(self.data),
+            bytes_out=_nbytes(self.output),
+            path=self.path,
+            failed=exc_type is not None,
+        )
+        for callback in _callbacks:
+            callback(record)
+
+
+class _DisabledStage:
+    """Shared no-op stage returned when instrumentation is disabled, attribute writes are dropped."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_DisabledStage":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+    def __setattr__(self, name, value) -> None:
+        pass
+
+
+_DISABLED_STAGE = _DisabledStage()
+
+
+def stage(name: str, data: object = None, path: str | None = None) -> Stage | _DisabledStage:
+    """Context manager timing a stage of the pipeline, a shared no-op when no callback is registered."""
+    if not _callbacks:
+        return _DISABLED_STAGE
+    return Stage(name, data=data, path=path)
+
+
+def _nbytes(value: object) -> int | None:
+    if value is None or isinstance(value, int):
+        return value
+    # NumPy, dask and Xarray objects, dask ones are not computed
+    return getattr(value, "nbytes", None)
@@ -0,0 +1,104 @@
+"""Multi-resolution pyramids on a base grid: one warp to the finest level, the coarser levels block reduced from it."""
+
+from functools import partial
+from typing import Dict, Iterable, Sequence
+
+import rasterio.enums
+import xarray as xr
+from rasterio.enums import Resampling
+
+from geospatial_grid.aligned import BLOCK_REDUCE_RESAMPLINGS, ReprojectionPath, regrid_aligned_array
+from geospatial_grid.georeferencing import apply_on_grid, georef_netcdf
+from geospatial_grid.gsgrid import GSGrid, GSGridError
+from geospatial_grid.instrumentation import stage
+from geospatial_grid.reprojections import reproject_using_grid
+
+
+def build_multiscale(
+    data: xr.Dataset | xr.DataArray,
+    base_grid: GSGrid,
+    factors: Sequence[int] = (1, 2, 4, 8),
+    nodata: int | float | None = None,
+    resampling_method: rasterio.enums.Resampling | None = None,
+    reduction: rasterio.enums.Resampling = Resampling.average,
+    categorical_variables: Iterable[str] = (),
+) -> Dict[int, xr.Dataset | xr.DataArray]:
+    """Regrid data on the levels of base_grid.pyramid(factors) for about the cost of a single warp.
+
+    Data are regridded once with reproject_using_grid() onto the finest level. Every coarser level is then
+    derived from the finest one by a block reduction, the levels sharing the pixel lattice: NaN and no data
+    pixels are ignored (including in averages), as are the pixels of partial blocks out of the finest level.
+
+    Args:
+        data (xr.Dataset | xr.DataArray): Data to regrid
+        base_grid (GSGrid): Grid of factor 1
+        factors (Sequence[int], optional): Coarsening factors of the levels, multiples of the smallest one.
+            Defaults to (1, 2, 4, 8), e.g. 375 m, 750 m, 1.5 km and 3 km on a 375 m base grid.
+        nodata (int | float | None, optional): no data value of the output Xarray objects. Defaults to None.
+        resampling_method (rasterio.enums.Resampling | None, optional): Resampling method of the warp to the
+            finest level. Defaults to nearest.
+        reduction (rasterio.enums.Resampling, optional): Block reduction to the coarser levels: average, sum,
+            min, max, mode or nearest. Defaults to average.
+        categorical_variables (Iterable[str], optional): Dataset variables reduced with mode whatever the
+            reduction, e.g. land cover classes. Defaults to ().
+
+    Returns:
+        Dict[int, xr.Dataset | xr.DataArray]: the regridded Xarray object of every factor, finest first
+    """
+    reduction = Resampling(reduction)
+    if reduction not in BLOCK_REDUCE_RESAMPLINGS:
+        raise GSGridError(f"Resampling {reduction.name} is not a block reduction")
+    factors = sorted(set(factors))
+    levels = base_grid.pyramid(factors)
+    finest_factor, finest_grid = factors[0], levels[0]
+    if any(factor % finest_factor for factor in factors):
+        raise GSGridError(f"Pyramid factors {factors} have to be multiples of the smallest one")
+
+    finest = reproject_using_grid(data, output_grid=finest_grid, nodata=nodata, resampling_method=resampling_method)
+    multiscale = {finest_factor: finest}
+    for factor, level_grid in zip(factors[1:], levels[1:]):
+        with stage("aligned", data=finest, path=ReprojectionPath.BLOCK_REDUCE.value) as reducing:
+            multiscale[factor] = _reduce_level(
+                finest,
+                level_grid=level_grid,
+                factor=factor // finest_factor,
+                reduction=reduction,
+                categorical_variables=set(categorical_variables),
+            )
+            reducing.output = multiscale[factor]
+    return multiscale
+
+
+def _reduce_level(
+    data: xr.Dataset | xr.DataArray,
+    level_grid: GSGrid,
+    factor: int,
+    reduction: Resampling,
+    categorical_variables: set,
+) -> xr.Dataset | xr.DataArray:
+    """Block reduce data by factor x factor blocks from the origin of the finest level onto level_grid."""
+
+    def _func(resampling: Resampling):
+        return partial(
+            regrid_aligned_array,
+            row_offset=0,
+            col_offset=0,
+            factor_y=factor,
+            factor_x=factor,
+            output_shape=level_grid.shape,
+            resampling=resampling,
+            skip_nan=True,
+        )
+
+    categorical = [name for name in categorical_variables if isinstance(data, xr.Dataset) and name in data.data_vars]
+    if not categorical:
+        return apply_on_grid(data=data, output_grid=level_grid, func=_func(reduction))
+    reduced = xr.merge(
+        [
+            apply_on_grid(data=data[categorical], output_grid=level_grid, func=_func(Resampling.mode)),
+            apply_on_grid(data=data.drop_vars(categorical), output_grid=level_grid, func=_func(reduction)),
+        ]
+    )
+    reduced = reduced[list(data.data_vars)]
+    reduced.attrs = data.attrs
+    return georef_netcdf(reduced, crs=level_grid.crs, transform=level_grid.affine)
@@ -0,0 +1,135 @@
+"""Packing of data in compact storage types following the CF conventions (scale_factor, add_offset, _FillValue)."""
+
+from typing import Dict
+
+import numpy as np
+import xarray as xr
+
+from geospatial_grid.georeferencing import default_nodata, is_nodata
+
+# CF attributes describing the packing, carried as attributes of the packed variables
+PACKING_ATTRS = ("scale_factor", "add_offset", "_FillValue")
+# Data types GDAL cannot warp, packed data are regridded in the second one and cast back
+WARP_DTYPES = {np.dtype(np.float16): np.dtype(np.float32)}
+# Pixels packed at once, bounds the memory of the float temporaries
+PACKING_BLOCK_SIZE = 2**20
+
+
+class PackingError(Exception):
+    pass
+
+
+def pack_array(
+    array: np.ndarray,
+    dtype: np.dtype | str,
+    scale_factor: float = 1.0,
+    add_offset: float = 0.0,
+    fill_value: int | float | None = None,
+    src_nodata: int | float | None = None,
+) -> np.ndarray:
+    """Pack a (..., y, x) array: (array - add_offset) / scale_factor rounded and clipped to dtype.
+
+    NaN and src_nodata pixels are set to fill_value (the dtype default no data when None). Integer values are
+    clipped to the dtype range without fill_value when it is one of its bounds. Packing goes by blocks of rows,
+    the float temporaries are of PACKING_BLOCK_SIZE pixels.
+    """
+    dtype = np.dtype(dtype)
+    fill_value = default_nodata(dtype) if fill_value is None else fill_value
+    if np.issubdtype(dtype, np.integer):
+        dtype_info = np.iinfo(dtype)
+        low = dtype_info.min + 1 if fill_value == dtype_info.min else dtype_info.min
+        high = dtype_info.max - 1 if fill_value == dtype_info.max else dtype_info.max
+
+    packed = np.empty(array.shape, dtype=dtype)
+    height, width = array.shape[-2:]
+    rows_per_block = max(1, PACKING_BLOCK_SIZE // max(width, 1))
+    for leading in np.ndindex(array.shape[:-2]):
+        for row_start in range(0, height, rows_per_block):
+            rows = slice(row_start, row_start + rows_per_block)
+            values, packed_values = array[leading][rows], packed[leading][rows]
+            scaled = np.subtract(values, add_offset, dtype=np.float64)
+            scaled /= scale_factor
+            if np.issubdtype(dtype, np.integer):
+                # NaN are filled below, zeroed here to be cast
+                np.clip(np.nan_to_num(np.rint(scaled, out=scaled), copy=False, nan=0), low, high, out=scaled)
+            packed_values[...] = scaled
+            if np.issubdtype(values.dtype, np.floating):
+                packed_values[np.isnan(values)] = fill_value
+            if src_nodata is not None:
+                packed_values[is_nodata(values, src_nodata)] = fill_value
+    return packed
+
+
+def pack(data: xr.Dataset | xr.DataArray, encoding: Dict, warpable: bool = False) -> xr.Dataset | xr.DataArray:
+    """Pack the spatial variables of data with their CF encoding.
+
+    encoding holds dtype and optionally scale_factor, add_offset and _FillValue: a single one for a DataArray,
+    one per variable name for a Dataset, as in to_netcdf() (variables left out are not packed). The packing is
+    carried by the variable attributes, NetCDF and Zarr writes store the values as they are and readers
+    unpack them. Dask-backed variables stay lazy.
+    With warpable, dtypes of WARP_DTYPES are packed in the GDAL compatible type, see cast_to_encoding().
+    """
+    if isinstance(data, xr.DataArray):
+        return _pack_data_array(data, encoding, warpable=warpable)
+    unknown = set(encoding) - set(data.data_vars)
+    if unknown:
+        raise PackingError(f"Encoding of variables {sorted(unknown)} not in the data")
+    packed = data.copy(deep=False)
+    for name, variable_encoding in encoding.items():
+        packed[name] = _pack_data_array(data[name], variable_encoding, warpable=warpable)
+    return packed
+
+
+def cast_to_encoding(data: xr.Dataset | xr.DataArray, encoding: Dict) -> xr.Dataset | xr.DataArray:
+    """Variables of data packed with pack(warpable=True) in their encoding dtype, with encoding["dtype"] set."""
+    if isinstance(data, xr.DataArray):
+        return _cast_data_array(data, encoding)
+    cast = data.copy(deep=False)
+    for name, variable_encoding in encoding.items():
+        cast[name] = _cast_data_array(data[name], variable_encoding)
+    return cast
+
+
+def _pack_data_array(data_array: xr.DataArray, encoding: Dict, warpable: bool) -> xr.DataArray:
+    if "dtype" not in encoding:
+        raise PackingError(f"No dtype in the encoding {encoding}")
+    unknown = set(encoding) - {"dtype", *PACKING_ATTRS}
+    if unknown:
+        raise PackingError(f"Unsupported encoding keys {sorted(unknown)}")
+    dtype = np.dtype(encoding["dtype"])
+    scale_factor, add_offset = encoding.get("scale_factor", 1.0), encoding.get("add_offset", 0.0)
+    fill_value = encoding.get("_FillValue", default_nodata(dtype))
+    packed_dtype = WARP_DTYPES.get(dtype, dtype) if warpable else dtype
+    if "x" not in data_array.dims or "y" not in data_array.dims:
+        return data_array
+    packed = xr.apply_ufunc(
+        pack_array,
+        data_array,
+        kwargs={
+            "dtype": packed_dtype,
+            "scale_factor": scale_factor,
+            "add_offset": add_offset,
+            "fill_value": fill_value,
+            "src_nodata": data_array.rio.nodata,
+        },
+        input_core_dims=[["y", "x"]],
+        output_core_dims=[["y", "x"]],
+        dask="parallelized",
+        output_dtypes=[packed_dtype],
+        keep_attrs=True,
+    ).transpose(*data_array.dims)
+    # The packing is described by the attributes, the encoding of the unpacked data would pack again on write
+    for key in ("dtype", "missing_value", *PACKING_ATTRS):
+        packed.encoding.pop(key, None)
+    packed.attrs.pop("missing_value", None)
+    packed.attrs.update({"scale_factor": scale_factor, "add_offset": add_offset, "_FillValue": fill_value})
+    packed.encoding["dtype"] = dtype
+    return packed
+
+
+def _cast_data_array(data_array: xr.DataArray, encoding: Dict) -> xr.DataArray:
+    dtype = np.dtype(encoding["dtype"])
+    cast = data_array.astype(dtype, copy=False, keep_attrs=True) if data_array.dtype != dtype else data_array
+    cast.encoding = {key: value for key, value in data_array.encoding.items() if key not in PACKING_ATTRS}
+    cast.encoding["dtype"] = dtype
+    return cast
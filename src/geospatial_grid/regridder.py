@@ -0,0 +1,382 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+import xarray as xr
+from pyproj import CRS
+from rasterio.enums import Resampling
+
+from geospatial_grid.georeferencing import apply_on_grid, is_nodata
+from geospatial_grid.gsgrid import GSGrid
+from geospatial_grid.transformers import get_transformer
+
+
+class RegridderError(Exception):
+    pass
+
+
+SUPPORTED_RESAMPLINGS = (Resampling.nearest, Resampling.bilinear, Resampling.average)
+# Index maps and weights kept in memory, the most recently used regridder is kept whatever its size
+REGRIDDER_CACHE_MAX_BYTES = 2**30
+
+
+class Regridder:
+    """
+    Precomputed source pixel index map and weights for a (source grid, target grid, resampling) triple.
+
+    Each target pixel is described by k source pixel flat indices and k weights, i.e. a sparse weight matrix
+    stored in ELLPACK layout (one row of fixed length k per target pixel):
+    - nearest: k=1, the source pixel containing the target pixel center
+    - bilinear: the source pixel centers surrounding the target pixel center (k=4 when not downsampling)
+    - average: the source pixels overlapping the target pixel footprint, weighted by overlap
+
+    The PROJ coordinate transform is done once at construction, applying the regridder to new data is a
+    vectorized NumPy gather (and weighted sum).
+    """
+
+    def __init__(
+        self,
+        source_grid: GSGrid,
+        target_grid: GSGrid,
+        resampling: Resampling | None = None,
+        indices: np.ndarray | None = None,
+        weights: np.ndarray | None = None,
+    ) -> None:
+        resampling = Resampling.nearest if resampling is None else Resampling(resampling)
+        if resampling not in SUPPORTED_RESAMPLINGS:
+            raise RegridderError(
+                f"Resampling {resampling.name} not supported. Use one of {[r.name for r in SUPPORTED_RESAMPLINGS]}."
+            )
+        self.source_grid = source_grid
+        self.target_grid = target_grid
+        self.resampling = resampling
+        if indices is None or weights is None:
+            indices, weights = compute_regridding_weights(source_grid, target_grid, resampling)
+        self.indices = indices
+        self.weights = weights
+        # Target pixels with at least one source pixel
+        self.covered = weights.sum(axis=1) > 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.indices.nbytes + self.weights.nbytes
+
+    def regrid_array(
+        self, array: np.ndarray, src_nodata: int | float | None = None, dst_nodata: int | float = np.nan
+    ) -> np.ndarray:
+        """Regrid a (..., source height, source width) array to a (..., target height, target width) array."""
+
+        if array.shape[-2:] != self.source_grid.shape:
+            raise RegridderError(
+                f"Array shape {array.shape[-2:]} does not match source grid shape {self.source_grid.shape}"
+            )
+        leading_shape = array.shape[:-2]
+        flat = array.reshape(-1, self.source_grid.width * self.source_grid.height)
+
+        if self.resampling == Resampling.nearest:
+            regridded = np.take(flat, self.indices[:, 0].astype(np.intp), axis=1)
+            if src_nodata is not None and not is_nodata(dst_nodata, src_nodata):
+                regridded[is_nodata(regridded, src_nodata)] = dst_nodata
+            regridded[:, ~self.covered] = dst_nodata
+        else:
+            regridded = self._weighted_sum(flat, src_nodata=src_nodata, dst_nodata=dst_nodata, dtype=array.dtype)
+        return regridded.reshape(*leading_shape, *self.target_grid.shape)
+
+    def _weighted_sum(
+        self, flat: np.ndarray, src_nodata: int | float | None, dst_nodata: int | float, dtype: np.dtype
+    ) -> np.ndarray:
+        # Accumulate over the k neighbours instead of gathering a (bands, pixels, k) array to keep memory bounded
+        work_dtype = np.float32 if dtype == np.float32 else np.float64
+        valid = ~np.isnan(flat) if np.issubdtype(dtype, np.floating) else np.ones(flat.shape, dtype=bool)
+        if src_nodata is not None:
+            valid &= ~is_nodata(flat, src_nodata)
+        all_valid = bool(valid.all())
+        values = flat.astype(work_dtype, copy=False) if all_valid else np.where(valid, flat, 0).astype(work_dtype)
+
+        weighted_values = np.zeros((flat.shape[0], self.indices.shape[0]), dtype=work_dtype)
+        if all_valid:
+            weights_sum = np.broadcast_to(self.weights.sum(axis=1), weighted_values.shape)
+        else:
+            weights_sum = np.zeros_like(weighted_values)
+        for k in range(self.indices.shape[1]):
+            neighbour_indices = self.indices[:, k].astype(np.intp)
+            neighbour_weights = np.ascontiguousarray(self.weights[:, k], dtype=work_dtype)
+            neighbour_values = np.take(values, neighbour_indices, axis=1)
+            neighbour_values *= neighbour_weights
+            weighted_values += neighbour_values
+            if not all_valid:
+                weights_sum += np.take(valid, neighbour_indices, axis=1) * neighbour_weights
+
+        regridded = np.full_like(weighted_values, np.nan)
+        np.divide(weighted_values, weights_sum, out=regridded, where=weights_sum > 0)
+        missing = weights_sum <= 0
+        if np.issubdtype(dtype, np.integer):
+            regridded = np.rint(regridded, out=regridded)
+            regridded[missing] = dst_nodata
+            return regridded.astype(dtype)
+        regridded = regridded.astype(dtype, copy=False)
+        regridded[missing] = dst_nodata
+        return regridded
+
+    def regrid(self, data: xr.Dataset | xr.DataArray, nodata: int | float | None = None) -> xr.Dataset | xr.DataArray:
+        """Regrid an Xarray object on the source grid to the target grid.
+
+        Args:
+            data (xr.Dataset | xr.DataArray): Data on the source grid
+            nodata (int | float | None, optional): no data value of the output Xarray object. Defaults to None.
+
+        Returns:
+            xr.Dataset | xr.DataArray: the regridded Xarray object
+        """
+        data_shape = (data.sizes["y"], data.sizes["x"])
+        if data_shape != self.source_grid.shape:
+            raise RegridderError(f"Data shape {data_shape} does not match source grid shape {self.source_grid.shape}")
+        return apply_on_grid(data=data, output_grid=self.target_grid, func=self.regrid_array, nodata=nodata)
+
+    def save(self, path: str | Path) -> None:
+        """Persist the regridder to a .npz file.
+
+        The file is written next to path and renamed, concurrent readers never see a partially written file.
+        """
+        path = Path(path)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "wb") as temporary_file:
+                np.savez(
+                    temporary_file,
+                    indices=self.indices,
+                    weights=self.weights,
+                    resampling=self.resampling.value,
+                    **_grid_to_arrays(self.source_grid, prefix="source_grid"),
+                    **_grid_to_arrays(self.target_grid, prefix="target_grid"),
+                )
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str | Path):
+        """Load a regridder persisted with save()."""
+        with np.load(path) as archive:
+            return cls(
+                source_grid=_grid_from_arrays(archive, prefix="source_grid"),
+                target_grid=_grid_from_arrays(archive, prefix="target_grid"),
+                resampling=Resampling(int(archive["resampling"])),
+                indices=archive["indices"],
+                weights=archive["weights"],
+            )
+
+
+def compute_regridding_weights(
+    source_grid: GSGrid, target_grid: GSGrid, resampling: Resampling
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Compute source flat indices and weights (ELLPACK sparse layout) of every target pixel.
+
+    Bilinear and average kernels are separable in source pixel space and follow GDAL conventions:
+    the bilinear kernel is widened to the target pixel size when downsampling and the average
+    weights are the overlap of source pixels with the bounding box of the target pixel footprint.
+    """
+
+    rows, cols = np.meshgrid(np.arange(target_grid.height), np.arange(target_grid.width), indexing="ij")
+    center_cols, center_rows = _target_pixels_to_source_pixels(
+        source_grid, target_grid, rows=rows.ravel() + 0.5, cols=cols.ravel() + 0.5
+    )
+    if resampling == Resampling.nearest:
+        neighbour_cols, neighbour_rows = _nan_floor(center_cols)[:, None], _nan_floor(center_rows)[:, None]
+        weights = _inside(source_grid, cols=center_cols, rows=center_rows)[:, None].astype(np.float32)
+    else:
+        corner_rows, corner_cols = np.meshgrid(
+            np.arange(target_grid.height + 1), np.arange(target_grid.width + 1), indexing="ij"
+        )
+        corner_cols, corner_rows = _target_pixels_to_source_pixels(
+            source_grid, target_grid, rows=corner_rows, cols=corner_cols
+        )
+        if resampling == Resampling.bilinear:
+            # Pixel centers are at half-integer positions
+            neighbour_cols, weights_x = _triangle_kernel(
+                center_cols - 0.5, _scale(np.diff(corner_cols, axis=1), axis=0)
+            )
+            neighbour_rows, weights_y = _triangle_kernel(
+                center_rows - 0.5, _scale(np.diff(corner_rows, axis=0), axis=1)
+            )
+        else:
+            neighbour_cols, weights_x = _box_kernel(*_footprint_bounds(corner_cols))
+            neighbour_rows, weights_y = _box_kernel(*_footprint_bounds(corner_rows))
+        n_x, n_y = neighbour_cols.shape[1], neighbour_rows.shape[1]
+        neighbour_cols = np.broadcast_to(neighbour_cols[:, None, :], (len(center_cols), n_y, n_x)).reshape(
+            -1, n_y * n_x
+        )
+        neighbour_rows = np.broadcast_to(neighbour_rows[:, :, None], (len(center_cols), n_y, n_x)).reshape(
+            -1, n_y * n_x
+        )
+        weights = (weights_y[:, :, None] * weights_x[:, None, :]).reshape(-1, n_y * n_x)
+        if resampling == Resampling.bilinear:
+            weights *= _inside(source_grid, cols=center_cols, rows=center_rows)[:, None]
+
+    # Neighbours out of the source grid are dropped, weights are renormalized at application
+    valid = (
+        (weights > 0)
+        & (neighbour_cols >= 0)
+        & (neighbour_cols < source_grid.width)
+        & (neighbour_rows >= 0)
+        & (neighbour_rows < source_grid.height)
+    )
+    index_dtype = np.int32 if source_grid.width * source_grid.height < np.iinfo(np.int32).max else np.int64
+    indices = np.where(valid, neighbour_rows * source_grid.width + neighbour_cols, 0).astype(index_dtype)
+    weights = np.where(valid, weights, 0).astype(np.float32)
+    return indices, weights
+
+
+def _target_pixels_to_source_pixels(
+    source_grid: GSGrid, target_grid: GSGrid, rows: np.ndarray, cols: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Fractional target pixel positions to fractional source pixel positions (pixel corner convention)."""
+    xs = target_grid.x0 + cols * target_grid.resolution_x
+    ys = target_grid.y0 - rows * target_grid.resolution_y
+    if source_grid.crs != target_grid.crs:
+        transformer = get_transformer(target_grid.key[0], source_grid.key[0])
+        xs, ys = transformer.transform(xs, ys)
+    xs, ys = np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+    xs[~np.isfinite(xs)], ys[~np.isfinite(ys)] = np.nan, np.nan
+    return (xs - source_grid.x0) / source_grid.resolution_x, (source_grid.y0 - ys) / source_grid.resolution_y
+
+
+def _footprint_bounds(corners: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Min and max over the 4 corners of every pixel of a (height + 1, width + 1) corner array."""
+    pixel_corners = np.stack([corners[:-1, :-1], corners[:-1, 1:], corners[1:, :-1], corners[1:, 1:]])
+    return pixel_corners.min(axis=0).ravel(), pixel_corners.max(axis=0).ravel()
+
+
+def _scale(edge_lengths: np.ndarray, axis: int) -> np.ndarray:
+    """Target pixel size in source pixels from the source pixel lengths of the two opposite pixel edges."""
+    edge_lengths = np.abs(edge_lengths)
+    if axis == 0:
+        return ((edge_lengths[:-1] + edge_lengths[1:]) / 2).ravel()
+    return ((edge_lengths[:, :-1] + edge_lengths[:, 1:]) / 2).ravel()
+
+
+def _triangle_kernel(positions: np.ndarray, scale: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """1D bilinear (triangle) kernel centered on positions, widened to the target pixel size when downsampling."""
+    radius = np.maximum(1, scale)
+    first = _nan_floor(positions - radius) + 1
+    neighbours = first[:, None] + np.arange(_kernel_size(2 * radius))[None, :]
+    weights = np.clip(1 - np.abs(neighbours - positions[:, None]) / radius[:, None], 0, None)
+    return neighbours, np.nan_to_num(weights)
+
+
+def _box_kernel(footprint_min: np.ndarray, footprint_max: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """1D overlap length of every pixel [i, i + 1] with the footprint [min, max]."""
+    first = _nan_floor(footprint_min)
+    neighbours = first[:, None] + np.arange(_kernel_size(footprint_max - footprint_min) + 1)[None, :]
+    weights = np.minimum(neighbours + 1, footprint_max[:, None]) - np.maximum(neighbours, footprint_min[:, None])
+    return neighbours, np.nan_to_num(np.clip(weights, 0, None))
+
+
+def _kernel_size(widths: np.ndarray) -> int:
+    if not np.any(np.isfinite(widths)):
+        return 1
+    return int(np.ceil(np.nanmax(widths)))
+
+
+def _nan_floor(values: np.ndarray) -> np.ndarray:
+    """Floor as integers, NaN positions are sent far out of any grid."""
+    return np.floor(np.nan_to_num(values, nan=-(2**40))).astype(np.int64)
+
+
+def _inside(grid: GSGrid, cols: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    return (cols >= 0) & (cols < grid.width) & (rows >= 0) & (rows < grid.height)
+
+
+def _grid_to_arrays(grid: GSGrid, prefix: str) -> Dict[str, np.ndarray]:
+    return {
+        f"{prefix}_parameters": np.array(
+            [grid.x0, grid.y0, grid.resolution_x, grid.resolution_y, grid.width, grid.height], dtype=np.float64
+        ),
+        f"{prefix}_crs": np.array(grid.crs.to_wkt() if grid.crs is not None else ""),
+        f"{prefix}_name": np.array(grid.name or ""),
+    }
+
+
+def _grid_from_arrays(archive: Dict[str, np.ndarray], prefix: str) -> GSGrid:
+    x0, y0, resolution_x, resolution_y, width, height = archive[f"{prefix}_parameters"].tolist()
+    crs_wkt, name = str(archive[f"{prefix}_crs"]), str(archive[f"{prefix}_name"])
+    return GSGrid(
+        x0=x0,
+        y0=y0,
+        resolution=(resolution_x, resolution_y),
+        width=int(width),
+        height=int(height),
+        crs=CRS.from_wkt(crs_wkt) if crs_wkt else None,
+        name=name or None,
+    )
+
+
+_regridder_cache: OrderedDict = OrderedDict()
+_regridder_cache_nbytes = 0
+_regridder_cache_lock = threading.Lock()
+
+
+def get_regridder(
+    source_grid: GSGrid,
+    target_grid: GSGrid,
+    resampling: Resampling | None = None,
+    cache_dir: str | Path | None = None,
+) -> Regridder:
+    """Get a regridder from the in-memory LRU cache, the on-disk cache or compute it.
+
+    The in-memory cache is bounded to REGRIDDER_CACHE_MAX_BYTES of index maps and weights.
+
+    Args:
+        source_grid (GSGrid): Grid of the data to regrid
+        target_grid (GSGrid): Output grid
+        resampling (Resampling | None, optional): Resampling method. Defaults to nearest.
+        cache_dir (str | Path | None, optional): Directory where regridders are persisted. Defaults to None (memory only).
+
+    Returns:
+        Regridder: the regridder for the (source grid, target grid, resampling) triple
+    """
+    resampling = Resampling.nearest if resampling is None else Resampling(resampling)
+    key = (source_grid, target_grid, resampling.value)
+    with _regridder_cache_lock:
+        if key in _regridder_cache:
+            _regridder_cache.move_to_end(key)
+            return _regridder_cache[key]
+
+    cache_file = None
+    if cache_dir is not None:
+        digest = hashlib.sha256(repr((source_grid.key, target_grid.key, resampling.value)).encode()).hexdigest()
+        cache_file = Path(cache_dir) / f"regridder_{digest[:32]}.npz"
+    if cache_file is not None and cache_file.exists():
+        regridder = Regridder.load(cache_file)
+    else:
+        regridder = Regridder(source_grid=source_grid, target_grid=target_grid, resampling=resampling)
+        if cache_file is not None:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            regridder.save(cache_file)
+
+    global _regridder_cache_nbytes
+    with _regridder_cache_lock:
+        if key in _regridder_cache:
+            # Computed concurrently by another thread
+            _regridder_cache_nbytes -= _regridder_cache[key].nbytes
+        _regridder_cache[key] = regridder
+        _regridder_cache_nbytes += regridder.nbytes
+        _regridder_cache.move_to_end(key)
+        while len(_regridder_cache) > 1 and _regridder_cache_nbytes > REGRIDDER_CACHE_MAX_BYTES:
+            _, evicted = _regridder_cache.popitem(last=False)
+            _regridder_cache_nbytes -= evicted.nbytes
+    return regridder
+
+
+def clear_regridder_cache() -> None:
+    """Empty the in-memory regridder cache."""
+    global _regridder_cache_nbytes
+    with _regridder_cache_lock:
+        _regridder_cache.clear()
+        _regridder_cache_nbytes = 0
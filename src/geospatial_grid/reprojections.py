@@ -1,11 +1,50 @@
+import itertools
+import json
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import xarray as xr
 import pyproj
 import rasterio
+import rasterio.warp
+import rasterio.windows
+import dask
+import dask.array as da
 from affine import Affine
-from typing import Tuple, Dict
-from geospatial_grid.gsgrid import GSGrid
+from rasterio.enums import Resampling
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+from geospatial_grid.aligned import (
+    ReprojectionPath,
+    aligned_regridding_function,
+    select_reprojection_path,
+)
+from geospatial_grid.gsgrid import GSGrid, GSGridError, project_bounds
+from geospatial_grid.georeferencing import apply_on_grid, default_nodata, georef_netcdf, resolve_nodata
+from geospatial_grid.instrumentation import stage
+from geospatial_grid.packing import PackingError, cast_to_encoding, pack
+from geospatial_grid.regridder import SUPPORTED_RESAMPLINGS, get_regridder
 import numpy as np
 
+logger = logging.getLogger(__name__)
+
+# Source pixels to add around the source window of an output tile so that the resampling kernel is complete
+RESAMPLING_KERNEL_MARGIN = {
+    Resampling.nearest: 1,
+    Resampling.bilinear: 2,
+    Resampling.cubic: 3,
+    Resampling.cubic_spline: 3,
+    Resampling.lanczos: 4,
+}
+DEFAULT_KERNEL_MARGIN = 2
+# Suffix of the directory next to a Zarr store where the tiles already written are recorded
+ZARR_COMPLETED_TILES_SUFFIX = ".completed_tiles"
+# File of the completed tiles directory recording the tiling, tiles are only resumed with the same one
+ZARR_TILING_FILE = "tiling.json"
+# Points added on each tile edge when projecting tile bounds to the source CRS
+TILE_BOUNDS_DENSIFICATION = 21
+
 
 def reproject_data(
     data: xr.Dataset | xr.DataArray,
@@ -24,14 +63,17 @@ def reproject_data(
     # Wrap rioxarray reproject_data so that it's typed
 
     # Rioxarray reproject nearest by default
-    return data.rio.reproject(
-        dst_crs=new_crs,
-        resolution=new_resolution,
-        resampling=resampling,
-        transform=transform,
-        nodata=nodata,
-        shape=shape,
-    )
+    with stage("warp", data=data, path=ReprojectionPath.WARP.value) as warp:
+        data_reprojected = data.rio.reproject(
+            dst_crs=new_crs,
+            resolution=new_resolution,
+            resampling=resampling,
+            transform=transform,
+            nodata=nodata,
+            shape=shape,
+        )
+        warp.output = data_reprojected
+    return data_reprojected
 
 
 def reproject_using_grid(
@@ -39,18 +81,102 @@ def reproject_using_grid(
     output_grid: GSGrid,
     nodata: int | float | None = None,
     resampling_method: rasterio.enums.Resampling | None = None,
+    use_regridder_cache: bool = False,
+    allow_fast_path: bool = True,
+    encoding: Dict | None = None,
+    crop_to_overlap: bool = False,
 ) -> xr.Dataset | xr.DataArray:
     """Object oriented regridding function.
 
+    When the data grid and output_grid share the CRS and the pixel lattice (same resolution or integer
+    multiples), the GDAL warp is skipped and data are cropped/padded or block reduced with NumPy.
+    See select_reprojection_path() for the path taken.
+
+    With an encoding, data are packed before being regridded (see packing.pack()): the output grid is only ever
+    allocated in the compact dtype, no data pixels hold the _FillValue and the CF packing attributes are set
+    for NetCDF/Zarr writes. Interpolated and averaged values are within a scale_factor of the unpacked
+    regridding.
+
     Args:
         data (xr.Dataset | xr.DataArray): Data to reproject
         output_grid (GSGrid): Output grid definition in the form of an object
         nodata (int | float | None, optional): no data value of the output Xarray object. Defaults to None.
         resampling_method (rasterio.enums.Resampling | None, optional): Resampling method. Defaults to nearest in rio.reproject().
+        use_regridder_cache (bool, optional): Reuse precomputed index maps/weights for this (data grid, output grid) pair
+            instead of a full GDAL warp. Only nearest, bilinear and average resampling. Data not on a regular
+            grid are warped. Defaults to False.
+        allow_fast_path (bool, optional): Use NumPy slicing/block reduction on aligned grids. Defaults to True.
+        encoding (Dict | None, optional): Storage encoding (dtype, scale_factor, add_offset, _FillValue) of a
+            DataArray, or of every Dataset variable to pack by name. nodata is then the _FillValue. Defaults to None.
+        crop_to_overlap (bool, optional): Only regrid the data window needed on the part of output_grid
+            overlapped by the data grid (see GSGrid.overlap_window()) and pad with no data, data not overlapping
+            output_grid are not regridded. For scenes covering a small part of output_grid. Defaults to False.
 
     Returns:
         xr.Dataset | xr.DataArray: the regridded Xarray object
     """
+    resampling_method = Resampling.nearest if resampling_method is None else Resampling(resampling_method)
+    if encoding is not None:
+        if nodata is not None:
+            raise PackingError("The no data value of packed data is the encoding _FillValue, nodata has to be None")
+        with stage("packing", data=data) as packing:
+            data = pack(data, encoding, warpable=True)
+            packing.output = data
+    with stage("reproject_using_grid", data=data) as reprojection:
+        try:
+            source_grid = GSGrid.from_xarray(data)
+        except GSGridError:
+            source_grid = None
+
+        regridding_kwargs = dict(
+            nodata=nodata,
+            resampling_method=resampling_method,
+            use_regridder_cache=use_regridder_cache,
+            allow_fast_path=allow_fast_path,
+        )
+        if crop_to_overlap and source_grid is not None:
+            data_reprojected, reprojection.path = _reproject_on_overlap(
+                data, source_grid=source_grid, output_grid=output_grid, **regridding_kwargs
+            )
+        else:
+            data_reprojected, reprojection.path = _reproject_on_grid(
+                data, source_grid=source_grid, output_grid=output_grid, **regridding_kwargs
+            )
+        if encoding is not None:
+            data_reprojected = cast_to_encoding(data_reprojected, encoding)
+        reprojection.output = data_reprojected
+
+    return data_reprojected
+
+
+def _reproject_on_grid(
+    data: xr.Dataset | xr.DataArray,
+    source_grid: GSGrid | None,
+    output_grid: GSGrid,
+    nodata: int | float | None,
+    resampling_method: Resampling,
+    use_regridder_cache: bool,
+    allow_fast_path: bool,
+) -> Tuple[xr.Dataset | xr.DataArray, str]:
+    """reproject_using_grid() core: regridded data and the path taken."""
+    with stage("select_path"):
+        path = select_reprojection_path(source_grid, output_grid, resampling_method)
+    logger.debug("reproject_using_grid path: %s", path.value)
+    if allow_fast_path and path != ReprojectionPath.WARP:
+        with stage("aligned", data=data, path=path.value) as aligned:
+            # The source grid is known, data of a single pixel row or column have no transform to derive it from
+            func = aligned_regridding_function(source_grid, output_grid, resampling_method)
+            data_reprojected = apply_on_grid(data=data, output_grid=output_grid, func=func, nodata=nodata)
+            aligned.output = data_reprojected
+        return data_reprojected, path.value
+
+    if use_regridder_cache and source_grid is not None:
+        with stage("regridder", data=data, path="regridder") as regridding:
+            regridder = get_regridder(source_grid=source_grid, target_grid=output_grid, resampling=resampling_method)
+            data_reprojected = regridder.regrid(data, nodata=nodata)
+            regridding.output = data_reprojected
+        return data_reprojected, "regridder"
+
     data_reprojected = reproject_data(
         data=data,
         shape=output_grid.shape,
@@ -59,10 +185,570 @@ def reproject_using_grid(
         resampling=resampling_method,
         nodata=nodata,
     )
+    return data_reprojected, ReprojectionPath.WARP.value
 
+
+def _reproject_on_overlap(
+    data: xr.Dataset | xr.DataArray,
+    source_grid: GSGrid,
+    output_grid: GSGrid,
+    nodata: int | float | None,
+    resampling_method: Resampling,
+    **regridding_kwargs,
+) -> Tuple[xr.Dataset | xr.DataArray, str]:
+    """Regrid the data window needed on the part of output_grid overlapped by source_grid only, then pad it.
+
+    Data not overlapping output_grid are not regridded, the output is filled with no data.
+    """
+    with stage("overlap"):
+        window = output_grid.overlap_window(source_grid)
+        overlap_grid = output_grid.sub_grid(*window) if window is not None else None
+        source_window = (
+            _source_window(source_grid, overlap_grid, resampling_method) if overlap_grid is not None else None
+        )
+    if overlap_grid == output_grid and source_window == (slice(0, source_grid.height), slice(0, source_grid.width)):
+        return _reproject_on_grid(
+            data,
+            source_grid=source_grid,
+            output_grid=output_grid,
+            nodata=nodata,
+            resampling_method=resampling_method,
+            **regridding_kwargs,
+        )
+
+    if source_window is None:
+        with stage("skip", data=data, path="skip") as skipping:
+            func = partial(_nodata_array, output_shape=output_grid.shape)
+            data_reprojected = apply_on_grid(data=data, output_grid=output_grid, func=func, nodata=nodata)
+            skipping.output = data_reprojected
+        return data_reprojected, "skip"
+
+    cropped, path = _reproject_on_grid(
+        data.isel(y=source_window[0], x=source_window[1]),
+        source_grid=source_grid.sub_grid(*source_window),
+        output_grid=overlap_grid,
+        nodata=nodata,
+        resampling_method=resampling_method,
+        **regridding_kwargs,
+    )
+    with stage("pad", data=cropped, path=ReprojectionPath.SLICE.value) as padding:
+        func = aligned_regridding_function(overlap_grid, output_grid, Resampling.nearest)
+        data_reprojected = apply_on_grid(data=cropped, output_grid=output_grid, func=func, nodata=nodata)
+        padding.output = data_reprojected
+    return data_reprojected, path
+
+
+def _nodata_array(
+    array: np.ndarray, src_nodata: int | float | None, dst_nodata: int | float, output_shape: Tuple[int, int]
+) -> np.ndarray:
+    """(..., height, width) array of dst_nodata, for apply_on_grid()."""
+    return np.full(array.shape[:-2] + tuple(output_shape), dst_nodata, dtype=array.dtype)
+
+
+def reproject_using_grid_batched(
+    data: xr.Dataset | xr.DataArray,
+    output_grid: GSGrid,
+    nodata: int | float | None = None,
+    resampling_method: rasterio.enums.Resampling | None = None,
+    max_workers: int | None = None,
+) -> xr.Dataset | xr.DataArray:
+    """Regridding of many variables and time steps sharing the data grid.
+
+    The geometry is computed once for the (data grid, output grid) pair and applied to every variable as a single
+    operation on its stacked (..., y, x) array, variables being regridded concurrently in a thread pool:
+    - aligned grids: NumPy slicing/block reduction (see select_reprojection_path())
+    - nearest, bilinear and average: regridder index maps/weights, cached in memory (see get_regridder())
+    - other resamplings: one GDAL warp call per variable with all the bands
+
+    Args:
+        data (xr.Dataset | xr.DataArray): Data to reproject
+        output_grid (GSGrid): Output grid definition in the form of an object
+        nodata (int | float | None, optional): no data value of the output Xarray object. Defaults to None.
+        resampling_method (rasterio.enums.Resampling | None, optional): Resampling method. Defaults to nearest.
+        max_workers (int | None, optional): Threads regridding variables. Defaults to the ThreadPoolExecutor default.
+
+    Returns:
+        xr.Dataset | xr.DataArray: the regridded Xarray object
+    """
+    resampling_method = Resampling.nearest if resampling_method is None else Resampling(resampling_method)
+    with stage("reproject_using_grid_batched", data=data) as reprojection:
+        source_grid = GSGrid.from_xarray(data)
+        with stage("select_path"):
+            func = batch_regridding_function(source_grid, output_grid, resampling_method)
+        data_reprojected = apply_on_grid(
+            data=data, output_grid=output_grid, func=func, nodata=nodata, max_workers=max_workers
+        )
+        reprojection.output = data_reprojected
     return data_reprojected
 
 
+def batch_regridding_function(
+    source_grid: GSGrid, output_grid: GSGrid, resampling: Resampling
+) -> Callable[..., np.ndarray]:
+    """Thread-safe function regridding (..., y, x) arrays from source_grid to output_grid, for apply_on_grid()."""
+    path = select_reprojection_path(source_grid, output_grid, resampling)
+    logger.debug("reproject_using_grid_batched path: %s", path.value)
+    if path != ReprojectionPath.WARP:
+        return aligned_regridding_function(source_grid, output_grid, resampling)
+    if resampling in SUPPORTED_RESAMPLINGS:
+        return get_regridder(source_grid=source_grid, target_grid=output_grid, resampling=resampling).regrid_array
+    return partial(
+        _warp_block,
+        src_transform=source_grid.affine,
+        src_crs=source_grid.crs,
+        dst_grid=output_grid,
+        resampling=resampling,
+    )
+
+
+def reproject_using_grid_chunked(
+    data: xr.Dataset | xr.DataArray,
+    output_grid: GSGrid,
+    tile_width: int = 1024,
+    tile_height: int = 1024,
+    nodata: int | float | None = None,
+    resampling_method: rasterio.enums.Resampling | None = None,
+) -> xr.Dataset | xr.DataArray:
+    """Lazy regridding streaming over the output grid in tiles.
+
+    Each output tile is warped by a dask task from the minimal source window covering it, so that memory
+    scales with the tile size and not with the scene size. Chunks of the data along non spatial dimensions
+    (e.g. time) are preserved, chunk the input along them to bound memory for long stacks.
+
+    Args:
+        data (xr.Dataset | xr.DataArray): Data to reproject, NumPy or dask backed
+        output_grid (GSGrid): Output grid definition in the form of an object
+        tile_width (int, optional): Output tile width in pixels. Defaults to 1024.
+        tile_height (int, optional): Output tile height in pixels. Defaults to 1024.
+        nodata (int | float | None, optional): no data value of the output Xarray object. Defaults to None.
+        resampling_method (rasterio.enums.Resampling | None, optional): Resampling method. Defaults to nearest.
+
+    Returns:
+        xr.Dataset | xr.DataArray: the regridded Xarray object, dask backed and chunked on output tiles
+    """
+    resampling_method = Resampling.nearest if resampling_method is None else Resampling(resampling_method)
+    source_grid = GSGrid.from_xarray(data)
+    data = data.drop_vars("spatial_ref", errors="ignore")
+
+    def _reproject(data_array: xr.DataArray) -> xr.DataArray:
+        if "x" not in data_array.dims or "y" not in data_array.dims:
+            return data_array
+        return _reproject_data_array_chunked(
+            data_array=data_array,
+            source_grid=source_grid,
+            output_grid=output_grid,
+            tile_width=tile_width,
+            tile_height=tile_height,
+            nodata=nodata,
+            resampling_method=resampling_method,
+        )
+
+    # Only the graph is built here, the tiles are timed by "warp" stages when computed
+    with stage("reproject_using_grid_chunked", data=data, path=ReprojectionPath.WARP.value):
+        if isinstance(data, xr.Dataset):
+            data_reprojected = data.map(_reproject)
+            data_reprojected.attrs = data.attrs
+        else:
+            data_reprojected = _reproject(data)
+        data_reprojected = georef_netcdf(data_reprojected, crs=output_grid.crs, transform=output_grid.affine)
+    return data_reprojected
+
+
+def reproject_to_zarr(
+    data: xr.Dataset | xr.DataArray,
+    output_grid: GSGrid,
+    store: str | Path,
+    tile_width: int = 1024,
+    tile_height: int = 1024,
+    nodata: int | float | None = None,
+    resampling_method: rasterio.enums.Resampling | None = None,
+    max_workers: int | None = None,
+) -> xr.Dataset:
+    """Out-of-core regridding written straight into a Zarr store, tile by tile in a process pool. Resumable.
+
+    The store is created with the georeferenced layout of reproject_using_grid_chunked(), chunked on output
+    tiles (and on the data chunks along other dimensions, which have to be regular). Every output tile is then
+    warped by a worker process from the minimal source window covering it and written in place. Written tiles
+    are recorded by pixel window in a <store>.completed_tiles directory next to the store, out of the Zarr
+    hierarchy, with the tiling. Running again on the same store only computes the missing tiles, with the same
+    tiling, variables and dimensions (GSGridError otherwise).
+
+    Args:
+        data (xr.Dataset | xr.DataArray): Data to reproject, NumPy, dask or lazily file backed
+        output_grid (GSGrid): Output grid definition in the form of an object
+        store (str | Path): Local Zarr store path
+        tile_width (int, optional): Output tile width in pixels. Defaults to 1024.
+        tile_height (int, optional): Output tile height in pixels. Defaults to 1024.
+        nodata (int | float | None, optional): no data value of the output Xarray object. Defaults to None.
+        resampling_method (rasterio.enums.Resampling | None, optional): Resampling method. Defaults to nearest.
+        max_workers (int | None, optional): Worker processes. Defaults to the ProcessPoolExecutor default.
+
+    Returns:
+        xr.Dataset: the regridded Dataset lazily opened from the store, no data not masked
+    """
+    resampling_method = Resampling.nearest if resampling_method is None else Resampling(resampling_method)
+    if isinstance(data, xr.DataArray):
+        data = data.to_dataset(name=data.name if data.name is not None else "data")
+    store = Path(store)
+    completed_tiles_dir = store.with_name(store.name + ZARR_COMPLETED_TILES_SUFFIX)
+    source_grid = GSGrid.from_xarray(data)
+    template = reproject_using_grid_chunked(
+        data=data,
+        output_grid=output_grid,
+        tile_width=tile_width,
+        tile_height=tile_height,
+        nodata=nodata,
+        resampling_method=resampling_method,
+    )
+    tiling = {"tile_width": tile_width, "tile_height": tile_height}
+    tiling_path = completed_tiles_dir / ZARR_TILING_FILE
+    if completed_tiles_dir.exists() and store.exists():
+        _check_zarr_store(store, template=template, output_grid=output_grid, tiling=tiling, tiling_path=tiling_path)
+    else:
+        # Only the metadata and the in-memory coordinates are written here
+        template.to_zarr(store, mode="w", compute=False, consolidated=False)
+        completed_tiles_dir.mkdir(exist_ok=True)
+        for completed_tile_path in completed_tiles_dir.iterdir():
+            completed_tile_path.unlink()
+        tiling_path.write_text(json.dumps(tiling))
+
+    spatial_variables = [name for name, variable in template.data_vars.items() if isinstance(variable.data, da.Array)]
+    tiles = output_grid.tiles(tile_width=tile_width, tile_height=tile_height)
+    source_windows = _source_windows(source_grid, [tile.grid for tile in tiles], resampling_method)
+    # Spawned workers: forking a process where GDAL and dask threads run can deadlock
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [
+            executor.submit(
+                _reproject_tile_to_zarr,
+                store=store,
+                completed_tile_path=completed_tiles_dir / _completed_tile_name(tile.window),
+                sources={
+                    name: (
+                        data[name].transpose(..., "y", "x").isel(y=source_window[0], x=source_window[1])
+                        if source_window is not None
+                        else data[name].transpose(..., "y", "x").isel(y=slice(0, 0), x=slice(0, 0))
+                    )
+                    for name in spatial_variables
+                },
+                leading_slices={
+                    name: [_chunk_slices(chunks) for chunks in template[name].chunks[:-2]] for name in spatial_variables
+                },
+                src_grid=source_grid.sub_grid(*source_window) if source_window is not None else None,
+                src_nodata={name: data[name].rio.nodata for name in spatial_variables},
+                dst_grid=tile.grid,
+                dst_nodata={name: template[name].attrs["_FillValue"] for name in spatial_variables},
+                dst_window=tile.window,
+                resampling=resampling_method,
+            )
+            for tile, source_window in zip(tiles, source_windows)
+            if not (completed_tiles_dir / _completed_tile_name(tile.window)).exists()
+        ]
+        for future in futures:
+            future.result()
+    return _open_zarr_store(store)
+
+
+def _completed_tile_name(window: Tuple[slice, slice]) -> str:
+    """Name of the marker of a written tile, after its pixel window: rowstart-rowstop_colstart-colstop."""
+    rows, cols = window
+    return f"{rows.start}-{rows.stop}_{cols.start}-{cols.stop}"
+
+
+def _check_zarr_store(store: Path, template: xr.Dataset, output_grid: GSGrid, tiling: Dict, tiling_path: Path) -> None:
+    """Raise GSGridError when the tiles written in store can't be completed with template tiled with tiling."""
+    stored = _open_zarr_store(store)
+    store_grid = GSGrid.from_xarray(stored)
+    try:
+        # Tolerant to the floating point noise of the stored coordinates
+        on_output_grid = store_grid.shape == output_grid.shape and output_grid.window_of(store_grid) is not None
+    except GSGridError:
+        on_output_grid = False
+    if not on_output_grid:
+        raise GSGridError(f"Zarr store {store} is not on the output grid {output_grid}")
+    stored_tiling = json.loads(tiling_path.read_text()) if tiling_path.exists() else None
+    if stored_tiling != tiling:
+        raise GSGridError(f"Zarr store {store} is written with the tiling {stored_tiling}, not {tiling}")
+    if set(stored.data_vars) != set(template.data_vars):
+        raise GSGridError(f"Zarr store {store} variables {sorted(stored.data_vars)} differ from the data ones")
+    for dim, size in template.sizes.items():
+        if dim in ("x", "y"):
+            continue
+        same_index = dim not in template.indexes or template.indexes[dim].equals(stored.indexes.get(dim))
+        if stored.sizes.get(dim) != size or not same_index:
+            raise GSGridError(f"Zarr store {store} dimension {dim} differs from the data one")
+    for name, variable in template.data_vars.items():
+        if not isinstance(variable.data, da.Array):
+            continue
+        chunks = tuple(dim_chunks[0] for dim_chunks in variable.chunks)
+        if stored[name].dims != variable.dims or stored[name].encoding.get("chunks") != chunks:
+            raise GSGridError(
+                f"Zarr store {store} variable {name} has dimensions {stored[name].dims} and chunks "
+                f"{stored[name].encoding.get('chunks')}, expected {variable.dims} and {chunks}"
+            )
+
+
+def _open_zarr_store(store: Path) -> xr.Dataset:
+    reprojected = xr.open_zarr(store, consolidated=False, mask_and_scale=False)
+    # The grid mapping variable is read back as a data variable
+    return reprojected.set_coords([name for name in ("spatial_ref",) if name in reprojected.data_vars])
+
+
+def _reproject_tile_to_zarr(
+    store: Path,
+    completed_tile_path: Path,
+    sources: Dict[str, xr.DataArray],
+    leading_slices: Dict[str, List[List[slice]]],
+    src_grid: GSGrid | None,
+    src_nodata: Dict[str, int | float | None],
+    dst_grid: GSGrid,
+    dst_nodata: Dict[str, int | float],
+    dst_window: Tuple[slice, slice],
+    resampling: Resampling,
+) -> None:
+    """Warp the (..., y, x) source windows onto a tile and write it in the Zarr store, one store chunk at a time.
+
+    src_grid is None for tiles out of the data footprint, written with no data: the Zarr fill value does not
+    necessarily match it.
+    """
+    for name, source in sources.items():
+        for leading in itertools.product(*leading_slices[name]):
+            if src_grid is None:
+                leading_shape = tuple(s.stop - s.start for s in leading)
+                tile = np.full(leading_shape + dst_grid.shape, dst_nodata[name], dtype=source.dtype)
+            else:
+                tile = _warp_block(
+                    source[leading].values,
+                    src_transform=src_grid.affine,
+                    src_crs=src_grid.crs,
+                    src_nodata=src_nodata[name],
+                    dst_grid=dst_grid,
+                    dst_nodata=dst_nodata[name],
+                    resampling=resampling,
+                )
+            region = dict(zip(source.dims, leading + dst_window))
+            xr.Dataset({name: (source.dims, tile)}).to_zarr(store, region=region, consolidated=False)
+    completed_tile_path.touch()
+
+
+def _reproject_data_array_chunked(
+    data_array: xr.DataArray,
+    source_grid: GSGrid,
+    output_grid: GSGrid,
+    tile_width: int,
+    tile_height: int,
+    nodata: int | float | None,
+    resampling_method: Resampling,
+) -> xr.DataArray:
+    data_array = data_array.transpose(..., "y", "x")
+    src_nodata, dst_nodata = data_array.rio.nodata, resolve_nodata(data_array, nodata)
+    source = data_array.data if isinstance(data_array.data, da.Array) else da.from_array(data_array.data, chunks=-1)
+    leading_slices = [_chunk_slices(chunks) for chunks in source.chunks[:-2]]
+
+    tiles = output_grid.tiles(tile_width=tile_width, tile_height=tile_height)
+    n_tile_cols = sum(tile.row_off == 0 for tile in tiles)
+    n_tile_rows = len(tiles) // n_tile_cols
+    blocks = np.empty([len(slices) for slices in leading_slices] + [n_tile_rows, n_tile_cols], dtype=object)
+    source_windows = _source_windows(source_grid, [tile.grid for tile in tiles], resampling_method)
+    for i_tile, (tile, source_window) in enumerate(zip(tiles, source_windows)):
+        for leading_index in itertools.product(*[range(len(slices)) for slices in leading_slices]):
+            leading = tuple(slices[i] for slices, i in zip(leading_slices, leading_index))
+            block_shape = tuple(s.stop - s.start for s in leading) + tile.grid.shape
+            if source_window is None:
+                block = da.full(block_shape, dst_nodata, dtype=data_array.dtype)
+            else:
+                block = da.from_delayed(
+                    dask.delayed(_warp_block)(
+                        source[leading + source_window],
+                        src_transform=source_grid.sub_grid(*source_window).affine,
+                        src_crs=source_grid.crs,
+                        src_nodata=src_nodata,
+                        dst_grid=tile.grid,
+                        dst_nodata=dst_nodata,
+                        resampling=resampling_method,
+                    ),
+                    shape=block_shape,
+                    dtype=data_array.dtype,
+                )
+            blocks[leading_index + divmod(i_tile, n_tile_cols)] = block
+
+    reprojected = xr.DataArray(
+        da.block(blocks.tolist()),
+        dims=data_array.dims,
+        coords={
+            name: coord
+            for name, coord in data_array.coords.items()
+            if "x" not in coord.dims and "y" not in coord.dims
+        },
+        attrs=data_array.attrs,
+    )
+    # The DataArray would otherwise be named after the dask graph
+    reprojected.name = data_array.name
+    reprojected.attrs["_FillValue"] = dst_nodata
+    return reprojected.assign_coords(output_grid.xarray_coords)
+
+
+def _warp_block(
+    source: np.ndarray,
+    src_transform: Affine,
+    src_crs: pyproj.CRS,
+    src_nodata: int | float | None,
+    dst_grid: GSGrid,
+    dst_nodata: int | float,
+    resampling: Resampling,
+) -> np.ndarray:
+    """GDAL warp of a (..., y, x) NumPy block onto dst_grid."""
+    leading_shape = source.shape[:-2]
+    destination = np.full((int(np.prod(leading_shape)),) + dst_grid.shape, dst_nodata, dtype=source.dtype)
+    if destination.shape[0] > 0:
+        with stage("warp", data=source, path=ReprojectionPath.WARP.value) as warp:
+            rasterio.warp.reproject(
+                source=source.reshape((-1,) + source.shape[-2:]),
+                destination=destination,
+                src_transform=src_transform,
+                src_crs=src_crs,
+                src_nodata=src_nodata,
+                dst_transform=dst_grid.affine,
+                dst_crs=dst_grid.crs,
+                dst_nodata=dst_nodata,
+                resampling=resampling,
+            )
+            warp.output = destination
+    return destination.reshape(leading_shape + dst_grid.shape)
+
+
+def _source_window(
+    source_grid: GSGrid, target_grid: GSGrid, resampling: Resampling
+) -> Tuple[slice, slice] | None:
+    """Minimal source pixel window covering target_grid, with a margin for the resampling kernel.
+
+    Returns None when target_grid does not intersect source_grid.
+    """
+    return _source_windows(source_grid, [target_grid], resampling)[0]
+
+
+def _source_windows(
+    source_grid: GSGrid, target_grids: List[GSGrid], resampling: Resampling
+) -> List[Tuple[slice, slice] | None]:
+    """_source_window() of many target grids, with their bounds projected in one call."""
+    windows = []
+    for target_grid, footprint in zip(target_grids, _source_footprints(source_grid, target_grids)):
+        if footprint is None:
+            windows.append(None)
+            continue
+        row_min, row_max, col_min, col_max = footprint
+        # The kernel is widened when downsampling
+        scale = max(1.0, *_downsampling_factors(footprint, target_grid))
+        margin = int(np.ceil(RESAMPLING_KERNEL_MARGIN.get(resampling, DEFAULT_KERNEL_MARGIN) * scale))
+        col_start = max(0, int(np.floor(col_min)) - margin)
+        col_stop = min(source_grid.width, int(np.ceil(col_max)) + margin)
+        row_start = max(0, int(np.floor(row_min)) - margin)
+        row_stop = min(source_grid.height, int(np.ceil(row_max)) + margin)
+        if col_start >= col_stop or row_start >= row_stop:
+            windows.append(None)
+        else:
+            windows.append((slice(row_start, row_stop), slice(col_start, col_stop)))
+    return windows
+
+
+def _source_footprints(
+    source_grid: GSGrid, target_grids: List[GSGrid]
+) -> List[Tuple[float, float, float, float] | None]:
+    """(row min, row max, col min, col max) fractional source pixel bounds of target grids, None if not projectable."""
+    bounds = project_bounds(target_grids, source_grid.key[0], densify_pts=TILE_BOUNDS_DENSIFICATION)
+    rows_min = (source_grid.y0 - bounds[:, 3]) / source_grid.resolution_y
+    rows_max = (source_grid.y0 - bounds[:, 1]) / source_grid.resolution_y
+    cols_min = (bounds[:, 0] - source_grid.x0) / source_grid.resolution_x
+    cols_max = (bounds[:, 2] - source_grid.x0) / source_grid.resolution_x
+    return [
+        None if np.isnan(footprint).any() else footprint
+        for footprint in zip(rows_min, rows_max, cols_min, cols_max)
+    ]
+
+
+def _downsampling_factors(
+    footprint: Tuple[float, float, float, float], target_grid: GSGrid
+) -> Tuple[float, float]:
+    """Source pixels per target pixel along y and x."""
+    row_min, row_max, col_min, col_max = footprint
+    return (row_max - row_min) / target_grid.height, (col_max - col_min) / target_grid.width
+
+
+def _chunk_slices(chunks: Tuple[int, ...]) -> list[slice]:
+    bounds = np.cumsum((0,) + tuple(chunks))
+    return [slice(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def read_raster_on_grid(
+    raster: str | Path | rasterio.DatasetReader,
+    output_grid: GSGrid,
+    nodata: int | float | None = None,
+    resampling_method: rasterio.enums.Resampling | None = None,
+    use_overviews: bool = True,
+) -> xr.DataArray:
+    """Read only the part of a raster file needed to fill output_grid and reproject it.
+
+    The source window covering output_grid bounds, with a margin for the resampling kernel, is read instead of
+    the whole raster. When output_grid is coarser than the raster, the coarsest overview level not coarser than
+    output_grid is read instead of the full resolution data.
+
+    Args:
+        raster (str | Path | rasterio.DatasetReader): Raster file path or opened raster (GeoTIFF, NetCDF...)
+        output_grid (GSGrid): Output grid definition in the form of an object
+        nodata (int | float | None, optional): no data value of the output. Defaults to the raster no data.
+        resampling_method (rasterio.enums.Resampling | None, optional): Resampling method. Defaults to nearest.
+        use_overviews (bool, optional): Read overviews when output_grid is coarser. Defaults to True.
+
+    Returns:
+        xr.DataArray: (band, y, x) DataArray on output_grid
+    """
+    if not isinstance(raster, rasterio.DatasetReader):
+        with rasterio.open(raster) as opened_raster:
+            return read_raster_on_grid(opened_raster, output_grid, nodata, resampling_method, use_overviews)
+
+    resampling_method = Resampling.nearest if resampling_method is None else Resampling(resampling_method)
+    source_grid = GSGrid.from_rasterio(raster)
+    footprint = _source_footprints(source_grid, [output_grid])[0]
+    if use_overviews and footprint is not None:
+        overview_level = _overview_level(raster.overviews(1), min(_downsampling_factors(footprint, output_grid)))
+        if overview_level is not None:
+            with rasterio.open(raster.name, overview_level=overview_level) as overview:
+                return read_raster_on_grid(overview, output_grid, nodata, resampling_method, use_overviews=False)
+
+    dtype = np.dtype(raster.dtypes[0])
+    dst_nodata = nodata if nodata is not None else raster.nodata if raster.nodata is not None else default_nodata(dtype)
+    with stage("read_raster_on_grid", path=ReprojectionPath.WARP.value) as reading:
+        window = _source_window(source_grid, output_grid, resampling_method)
+        if window is None:
+            reprojected = np.full((raster.count,) + output_grid.shape, dst_nodata, dtype=dtype)
+        else:
+            with stage("read") as read:
+                source = raster.read(window=rasterio.windows.Window.from_slices(*window))
+                read.output = source
+            reading.data = source
+            reprojected = _warp_block(
+                source,
+                src_transform=source_grid.sub_grid(*window).affine,
+                src_crs=source_grid.crs,
+                src_nodata=raster.nodata,
+                dst_grid=output_grid,
+                dst_nodata=dst_nodata,
+                resampling=resampling_method,
+            )
+        data_array = xr.DataArray(
+            reprojected,
+            dims=("band", "y", "x"),
+            coords={"band": list(raster.indexes), **output_grid.xarray_coords},
+            attrs={"_FillValue": dst_nodata},
+        )
+        data_array = georef_netcdf(data_array, crs=output_grid.crs, transform=output_grid.affine)
+        reading.output = data_array
+    return data_array
+
+
+def _overview_level(overview_factors: list[int], downsampling_factor: float) -> int | None:
+    """Index of the coarsest overview not coarser than downsampling_factor, None for full resolution."""
+    levels = [level for level, factor in enumerate(overview_factors) if factor <= downsampling_factor]
+    return levels[-1] if levels else None
 
 
 def extract_netcdf_coords_from_rasterio_raster(raster: rasterio.DatasetReader) -> Dict[str, np.array]:
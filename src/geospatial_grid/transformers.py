@@ -0,0 +1,44 @@
+"""Process-wide cache of pyproj transformers, shared by every coordinate transformation of the package."""
+
+import threading
+from collections import OrderedDict
+
+from pyproj import CRS, Transformer
+
+TRANSFORMER_CACHE_SIZE = 64
+
+_transformer_cache: OrderedDict = OrderedDict()
+_transformer_cache_lock = threading.Lock()
+
+
+def get_transformer(crs_from: CRS | int | str, crs_to: CRS | int | str) -> Transformer:
+    """always_xy Transformer from crs_from to crs_to, created once per CRS pair and kept in an LRU cache.
+
+    CRSs are pyproj CRS objects or anything CRS.from_user_input() accepts (EPSG code, "EPSG:XXXX", PROJ string,
+    WKT). Passing the same string is the cheapest lookup. pyproj Transformers can be shared between threads.
+    """
+    key = (_crs_key(crs_from), _crs_key(crs_to))
+    with _transformer_cache_lock:
+        if key in _transformer_cache:
+            _transformer_cache.move_to_end(key)
+            return _transformer_cache[key]
+
+    transformer = Transformer.from_crs(
+        crs_from=CRS.from_user_input(crs_from), crs_to=CRS.from_user_input(crs_to), always_xy=True
+    )
+    with _transformer_cache_lock:
+        _transformer_cache[key] = transformer
+        _transformer_cache.move_to_end(key)
+        while len(_transformer_cache) > TRANSFORMER_CACHE_SIZE:
+            _transformer_cache.popitem(last=False)
+    return transformer
+
+
+def clear_transformer_cache() -> None:
+    """Empty the transformer cache."""
+    with _transformer_cache_lock:
+        _transformer_cache.clear()
+
+
+def _crs_key(crs: CRS | int | str) -> int | str:
+    return crs.to_wkt() if isinstance(crs, CRS) else crs
@@ -0,0 +1,142 @@
+import numpy as np
+import pytest
+import xarray as xr
+from pyproj import CRS
+from rasterio.enums import Resampling
+
+from geospatial_grid.aligned import ReprojectionPath, block_reduce, select_reprojection_path
+from geospatial_grid.georeferencing import georef_netcdf_rioxarray
+from geospatial_grid.gsgrid import GSGrid
+from geospatial_grid.reprojections import reproject_using_grid
+
+test_source_grid = GSGrid(x0=100, y0=1200, resolution=10, width=24, height=18, crs=CRS.from_epsg(32631))
+rng = np.random.default_rng(0)
+test_categories = rng.integers(0, 4, size=(2, 18, 24)).astype(np.uint8)
+test_categories[:, 3, 4] = 255
+test_data_array_uint8 = georef_netcdf_rioxarray(
+    xr.DataArray(test_categories, coords=test_source_grid.xarray_coords, dims=("t", "y", "x")),
+    crs=test_source_grid.crs,
+).rio.write_nodata(255)
+test_values = rng.random((2, 18, 24)).astype(np.float32)
+test_values[:, 5, 5] = -1
+test_values[:, 7, 2] = np.nan
+test_data_array_float = georef_netcdf_rioxarray(
+    xr.DataArray(test_values, coords=test_source_grid.xarray_coords, dims=("t", "y", "x")), crs=test_source_grid.crs
+).rio.write_nodata(-1)
+
+test_output_grids = {
+    "crop": GSGrid(x0=150, y0=1150, resolution=10, width=10, height=8, crs=CRS.from_epsg(32631)),
+    "pad": GSGrid(x0=50, y0=1230, resolution=10, width=30, height=25, crs=CRS.from_epsg(32631)),
+    "coarsen_2": GSGrid(x0=100, y0=1200, resolution=20, width=12, height=9, crs=CRS.from_epsg(32631)),
+    "coarsen_3_pad": GSGrid(x0=70, y0=1230, resolution=30, width=10, height=8, crs=CRS.from_epsg(32631)),
+    "coarsen_2x3": GSGrid(x0=120, y0=1180, resolution=(30, 20), width=6, height=7, crs=CRS.from_epsg(32631)),
+    "refine_2": GSGrid(x0=95, y0=1205, resolution=5, width=50, height=40, crs=CRS.from_epsg(32631)),
+}
+
+
+@pytest.mark.parametrize(
+    ("grid_name", "resampling", "expected_path"),
+    (
+        ["crop", Resampling.bilinear, ReprojectionPath.SLICE],
+        ["pad", Resampling.nearest, ReprojectionPath.SLICE],
+        ["coarsen_2", Resampling.average, ReprojectionPath.BLOCK_REDUCE],
+        ["coarsen_2", Resampling.bilinear, ReprojectionPath.WARP],
+        ["coarsen_3_pad", Resampling.nearest, ReprojectionPath.BLOCK_REDUCE],
+        # GDAL fills output pixels out of the source from the edge pixels when aggregating
+        ["coarsen_3_pad", Resampling.average, ReprojectionPath.WARP],
+        ["refine_2", Resampling.nearest, ReprojectionPath.REPEAT],
+        ["refine_2", Resampling.bilinear, ReprojectionPath.WARP],
+    ),
+)
+def test_select_reprojection_path(grid_name: str, resampling: Resampling, expected_path: ReprojectionPath):
+    assert select_reprojection_path(test_source_grid, test_output_grids[grid_name], resampling) == expected_path
+
+
+def test_select_reprojection_path_not_aligned():
+    shifted_grid = GSGrid(x0=105, y0=1200, resolution=10, width=24, height=18, crs=CRS.from_epsg(32631))
+    other_crs_grid = GSGrid(x0=100, y0=1200, resolution=10, width=24, height=18, crs=CRS.from_epsg(32632))
+    non_integer_grid = GSGrid(x0=100, y0=1200, resolution=15, width=24, height=18, crs=CRS.from_epsg(32631))
+    for output_grid in (shifted_grid, other_crs_grid, non_integer_grid):
+        assert select_reprojection_path(test_source_grid, output_grid, Resampling.nearest) == ReprojectionPath.WARP
+
+
+@pytest.mark.parametrize("grid_name", test_output_grids.keys())
+@pytest.mark.parametrize(
+    "resampling",
+    (Resampling.nearest, Resampling.average, Resampling.sum, Resampling.min, Resampling.max, Resampling.mode),
+)
+@pytest.mark.parametrize("data", (test_data_array_float, test_data_array_uint8))
+def test_fast_path_same_as_gdal(grid_name: str, resampling: Resampling, data: xr.DataArray):
+    output_grid = test_output_grids[grid_name]
+    if select_reprojection_path(test_source_grid, output_grid, resampling) == ReprojectionPath.WARP:
+        pytest.skip("Not a fast path case")
+    fast = reproject_using_grid(data=data, output_grid=output_grid, resampling_method=resampling, nodata=254)
+    gdal = reproject_using_grid(
+        data=data, output_grid=output_grid, resampling_method=resampling, nodata=254, allow_fast_path=False
+    )
+    assert fast.dtype == gdal.dtype
+    np.testing.assert_allclose(fast.values, gdal.values, rtol=1e-6)
+    np.testing.assert_allclose(fast.coords["x"].values, gdal.coords["x"].values)
+    np.testing.assert_allclose(fast.coords["y"].values, gdal.coords["y"].values)
+    assert fast.attrs["_FillValue"] == 254
+    # Same georeferencing, GeoTransform included
+    assert fast.coords["spatial_ref"].attrs == gdal.coords["spatial_ref"].attrs
+
+
+def test_fast_path_crop_is_zero_copy():
+    cropped = reproject_using_grid(data=test_data_array_float, output_grid=test_output_grids["crop"])
+    assert np.shares_memory(cropped.values, test_data_array_float.values)
+    assert cropped.rio.crs == test_source_grid.crs
+
+
+def test_fast_path_dataset():
+    test_dataset = xr.Dataset({"uint8": test_data_array_uint8, "float": test_data_array_float})
+    coarsened = reproject_using_grid(
+        data=test_dataset, output_grid=test_output_grids["coarsen_2"], resampling_method=Resampling.mode
+    )
+    assert coarsened.data_vars["uint8"].shape == (2, 9, 12)
+    assert coarsened.data_vars["float"].dtype == np.float32
+
+
+def test_block_reduce():
+    test_array = np.array([[1, 2, 5, 5], [3, np.nan, 5, 7]])
+    assert np.array_equal(
+        block_reduce(test_array, factor_y=2, factor_x=2, resampling=Resampling.mode), np.array([[1, 5]])
+    )
+    assert np.array_equal(
+        block_reduce(test_array, factor_y=2, factor_x=2, resampling=Resampling.max), np.array([[3, 7]])
+    )
+    assert np.isnan(block_reduce(test_array, factor_y=2, factor_x=2, resampling=Resampling.average)[0, 0])
+    assert np.array_equal(
+        block_reduce(test_array, factor_y=1, factor_x=2, resampling=Resampling.average, src_nodata=7, dst_nodata=-1),
+        np.array([[1.5, 5], [np.nan, 5]]),
+        equal_nan=True,
+    )
+
+
+def test_block_reduce_mode_ties():
+    # Like GDAL, the value reaching the top count first in row major order wins
+    test_array = np.array([[3, 1, 2, 3, 0, 3], [1, 3, 3, 2, 3, 0]], dtype=np.uint8)
+    assert np.array_equal(
+        block_reduce(test_array, factor_y=2, factor_x=2, resampling=Resampling.mode, src_nodata=0, dst_nodata=255),
+        np.array([[1, 3, 3]]),
+    )
+    test_random = np.random.default_rng(1).integers(0, 3, size=(16, 16)).astype(np.float32)
+    test_random[0, :3] = np.nan
+    test_reduced = block_reduce(test_random, factor_y=8, factor_x=8, resampling=Resampling.mode)
+    for row in range(2):
+        for col in range(2):
+            values = test_random[row * 8 : row * 8 + 8, col * 8 : col * 8 + 8].ravel()
+            values = values[~np.isnan(values)]
+            counts = {value: np.sum(values == value) for value in np.unique(values)}
+            assert counts[test_reduced[row, col]] == max(counts.values())
+
+
+def test_block_reduce_skip_nan():
+    array = np.array([[1, np.nan, 3, 3], [1, 1, np.nan, np.nan]], dtype=np.float32)
+    np.testing.assert_array_equal(
+        block_reduce(array, factor_y=2, factor_x=2, resampling=Resampling.average), [[np.nan, np.nan]]
+    )
+    np.testing.assert_array_equal(
+        block_reduce(array, factor_y=2, factor_x=2, resampling=Resampling.average, skip_nan=True), [[1, 3]]
+    )
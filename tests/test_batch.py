@@ -0,0 +1,122 @@
+import threading
+from pathlib import Path
+
+import numpy as np
+import xarray as xr
+from pyproj import CRS
+
+from geospatial_grid import batch
+from geospatial_grid.batch import reproject_files
+from geospatial_grid.georeferencing import georef_netcdf
+from geospatial_grid.gsgrid import GSGrid
+from geospatial_grid.reprojections import reproject_using_grid
+
+test_grid = GSGrid(x0=0, y0=10, resolution=1, width=10, height=10, crs=CRS.from_epsg(3857))
+test_output_grid = GSGrid(x0=0.5, y0=9.5, resolution=0.5, width=12, height=12, crs=CRS.from_epsg(3857))
+
+
+def _write_files(directory: Path, n_files: int) -> list[Path]:
+    paths = []
+    for i_file in range(n_files):
+        values = np.full((10, 10), i_file, dtype=np.float32)
+        data = georef_netcdf(
+            xr.Dataset({"fsc": (("y", "x"), values)}, coords=test_grid.xarray_coords), crs=test_grid.crs
+        )
+        path = directory / f"swath_{i_file}.nc"
+        data.to_netcdf(path)
+        paths.append(path)
+    return paths
+
+
+def test_reproject_files_written(tmp_path):
+    paths = _write_files(tmp_path, n_files=5)
+    results = list(reproject_files(paths, test_output_grid, output_dir=tmp_path / "out", max_workers=2))
+    assert sorted(result.path for result in results) == paths
+    assert all(result.ok for result in results), [result.error_traceback for result in results]
+    for result in results:
+        assert result.output == tmp_path / "out" / result.path.name
+        regridded = xr.load_dataset(result.output, decode_coords="all")
+        expected = reproject_using_grid(xr.load_dataset(result.path, decode_coords="all"), output_grid=test_output_grid)
+        np.testing.assert_array_equal(regridded["fsc"].values, expected["fsc"].values)
+        assert regridded.rio.crs == test_output_grid.crs
+    # No temporary file left
+    assert sorted(path.name for path in (tmp_path / "out").iterdir()) == [path.name for path in paths]
+
+
+def test_reproject_files_in_memory_failures_reported(tmp_path):
+    paths = _write_files(tmp_path, n_files=3)
+    missing = tmp_path / "missing.nc"
+    results = {result.path: result for result in reproject_files([paths[0], missing, *paths[1:]], test_output_grid)}
+    assert len(results) == 4
+    assert not results[missing].ok and results[missing].output is None
+    assert "missing.nc" in results[missing].error_traceback
+    for i_file, path in enumerate(paths):
+        assert results[path].ok
+        assert results[path].output["fsc"].shape == test_output_grid.shape
+        assert np.nanmax(results[path].output["fsc"].values) == i_file
+
+
+def test_reproject_files_backpressure(tmp_path, monkeypatch):
+    paths = _write_files(tmp_path, n_files=1) * 20
+    in_flight, max_in_flight, lock = [0], [0], threading.Lock()
+    reproject_file = batch._reproject_file
+
+    def _counting_reproject_file(**kwargs):
+        with lock:
+            in_flight[0] += 1
+            max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+        try:
+            return reproject_file(**kwargs)
+        finally:
+            with lock:
+                in_flight[0] -= 1
+
+    monkeypatch.setattr(batch, "_reproject_file", _counting_reproject_file)
+    pulled = []
+
+    def _paths():
+        for path in paths:
+            pulled.append(path)
+            yield path
+
+    results = reproject_files(_paths(), test_output_grid, max_workers=2, max_pending=3)
+    next(results)
+    # Paths are pulled lazily, no more than max_pending files are submitted
+    assert len(pulled) == 3
+    assert len(list(results)) == 19
+    assert max_in_flight[0] <= 2
+
+
+def test_reproject_files_processes(tmp_path):
+    paths = _write_files(tmp_path, n_files=3)
+    results = list(
+        reproject_files(paths, test_output_grid, output_dir=tmp_path / "out", max_workers=2, use_processes=True)
+    )
+    assert all(result.ok for result in results)
+    assert sorted(result.output for result in results) == [tmp_path / "out" / path.name for path in paths]
+
+
+def test_reproject_files_output_names(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    first, second = _write_files(tmp_path / "a", n_files=1)[0], _write_files(tmp_path / "b", n_files=1)[0]
+    other_suffix = first.rename(first.with_suffix(".nc4"))
+    results = {
+        result.path: result
+        for result in reproject_files([other_suffix, second], test_output_grid, output_dir=tmp_path / "out")
+    }
+    assert results[other_suffix].ok and results[other_suffix].output == tmp_path / "out" / "swath_0.nc"
+    # Same output file name from another directory: reported, not overwritten
+    assert isinstance(results[second].error, batch.BatchError) and results[second].output is None
+    assert "swath_0.nc" in results[second].error_traceback
+
+    results = list(
+        reproject_files(
+            [other_suffix, second],
+            test_output_grid,
+            output_dir=tmp_path / "out",
+            output_name=lambda path: f"{path.parent.name}_{path.stem}.nc",
+        )
+    )
+    assert all(result.ok for result in results)
+    assert sorted(result.output.name for result in results) == ["a_swath_0.nc", "b_swath_0.nc"]
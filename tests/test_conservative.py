@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+import xarray as xr
+from pyproj import CRS
+from rasterio.enums import Resampling
+
+from geospatial_grid.conservative import (
+    ConservativeRegridder,
+    _balanced_row_blocks,
+    _clipped_area,
+    _row_block,
+    compute_overlap_weights,
+)
+from geospatial_grid.georeferencing import georef_netcdf_rioxarray
+from geospatial_grid.grid_database import SIN375mGrid, UTM375mGridCantal
+from geospatial_grid.gsgrid import GSGrid
+from geospatial_grid.regridder import RegridderError
+from geospatial_grid.reprojections import _source_window, reproject_using_grid
+
+test_source_grid = GSGrid(x0=0, y0=10, resolution=1, width=10, height=10, crs=CRS.from_epsg(3857))
+rng = np.random.default_rng(0)
+
+
+def test_clipped_area():
+    xs = np.array([[0, 0, 1, 1], [0.5, 0.5, 1.5, 1.5], [-1, -1, 2, 2], [0.5, -0.2, 0.5, 1.2], [2, 2, 3, 3]])
+    ys = np.array([[0, 1, 1, 0], [0.5, 1.5, 1.5, 0.5], [-1, 2, 2, -1], [-0.2, 0.5, 1.2, 0.5], [0, 1, 1, 0]])
+    # Unit square, quarter, covering square, diamond with its 4 corners cut, disjoint
+    np.testing.assert_allclose(_clipped_area(xs.astype(float), ys.astype(float)), [1, 0.25, 1, 0.82, 0])
+
+
+def test_overlap_weights_partial_coverage():
+    # 2x2 source pixels per target pixel, first and last columns half out of the source grid
+    target_grid = GSGrid(x0=-1, y0=10, resolution=2, width=6, height=5, crs=CRS.from_epsg(3857))
+    weights = compute_overlap_weights(test_source_grid, target_grid)
+    weights_sum = np.asarray(weights.sum(axis=1)).reshape(target_grid.shape)
+    np.testing.assert_allclose(weights_sum, np.tile([2, 4, 4, 4, 4, 2], (5, 1)))
+    # Partition of unity: every source pixel is fully distributed among the target pixels
+    np.testing.assert_allclose(np.asarray(weights.sum(axis=0)).ravel(), 1)
+
+
+def test_conservative_regridding_aligned_same_as_average():
+    data = georef_netcdf_rioxarray(
+        xr.DataArray(
+            rng.random((2, 10, 10)), dims=("t", "y", "x"), coords={"t": [0, 1], **test_source_grid.xarray_coords}
+        ),
+        crs=test_source_grid.crs,
+    )
+    target_grid = GSGrid(x0=0, y0=10, resolution=2, width=5, height=5, crs=CRS.from_epsg(3857))
+    regridded = ConservativeRegridder(test_source_grid, target_grid).regrid(data)
+    expected = reproject_using_grid(data, output_grid=target_grid, resampling_method=Resampling.average)
+    np.testing.assert_allclose(regridded.values, expected.values)
+    assert regridded.rio.crs == target_grid.crs
+
+
+def test_conservative_regridding_nan_aware():
+    target_grid = GSGrid(x0=0, y0=10, resolution=2, width=5, height=5, crs=CRS.from_epsg(3857))
+    array = np.arange(100, dtype=np.float32).reshape(10, 10)
+    array[0, 0] = np.nan
+    array[2:4, 2:4] = np.nan
+    array[0, 2] = 255
+    regridded = ConservativeRegridder(test_source_grid, target_grid, max_workers=3).regrid_array(array, src_nodata=255)
+    assert regridded.dtype == np.float32
+    assert regridded[0, 0] == pytest.approx((1 + 10 + 11) / 3)
+    assert np.isnan(regridded[1, 1])
+    assert regridded[0, 1] == pytest.approx((3 + 12 + 13) / 3)
+    assert regridded[4, 4] == pytest.approx(array[8:, 8:].mean())
+
+
+def test_conservative_regridding_integer():
+    target_grid = GSGrid(x0=0, y0=10, resolution=2, width=5, height=5, crs=CRS.from_epsg(3857))
+    array = np.zeros((10, 10), dtype=np.uint8)
+    array[:2, :2] = [[0, 1], [1, 1]]
+    array[2:4, :2] = 255
+    regridded = ConservativeRegridder(test_source_grid, target_grid).regrid_array(array, src_nodata=255, dst_nodata=255)
+    assert regridded.dtype == np.uint8
+    assert regridded[0, 0] == 1
+    assert regridded[1, 0] == 255
+
+
+def test_conservative_regridding_other_crs_conserves_mass():
+    target_grid = UTM375mGridCantal()
+    source_grid = SIN375mGrid().sub_grid(*_source_window(SIN375mGrid(), target_grid, Resampling.average))
+    regridder = ConservativeRegridder(source_grid, target_grid, max_workers=2)
+    source_areas = np.asarray(regridder.weights.sum(axis=0)).reshape(source_grid.shape)
+    assert source_areas.max() == pytest.approx(1)
+    # Interior source pixels are fully covered by the target pixels
+    covered = source_areas > 1 - 1e-9
+    assert covered.sum() > 0.8 * target_grid.width * target_grid.height
+
+    field = rng.random((3, *source_grid.shape))
+    field[:, ~covered] = 0
+    regridded = regridder.regrid_array(field)
+    # Mean value times target pixel area (in source pixels) sums up to the source total
+    np.testing.assert_allclose(
+        (np.nan_to_num(regridded) * regridder.weights_sum.reshape(target_grid.shape)).sum(axis=(1, 2)),
+        field.sum(axis=(1, 2)),
+    )
+
+
+def test_row_blocks_share_the_weights():
+    target_grid = GSGrid(x0=0.3, y0=9.6, resolution=0.7, width=12, height=11, crs=CRS.from_epsg(3857))
+    weights = compute_overlap_weights(test_source_grid, target_grid)
+    blocks = _balanced_row_blocks(weights, n_blocks=3)
+    assert len(blocks) == 3 and blocks[0][0] == 0 and blocks[-1][1] == weights.shape[0]
+    dense = rng.random((weights.shape[1], 2))
+    for start, stop in blocks:
+        block = _row_block(weights, start, stop)
+        assert np.shares_memory(block.data, weights.data) and np.shares_memory(block.indices, weights.indices)
+        np.testing.assert_array_equal(block.toarray(), weights[start:stop].toarray())
+    np.testing.assert_allclose(
+        ConservativeRegridder(test_source_grid, target_grid, weights=weights, max_workers=3)._matmul(dense),
+        weights @ dense,
+    )
+
+
+def test_conservative_regridder_shape_mismatch():
+    regridder = ConservativeRegridder(test_source_grid, test_source_grid)
+    with pytest.raises(RegridderError):
+        regridder.regrid_array(np.zeros((5, 5)))
+    with pytest.raises(RegridderError):
+        ConservativeRegridder(test_source_grid, test_source_grid.sub_grid(slice(0, 5), slice(0, 5)), regridder.weights)
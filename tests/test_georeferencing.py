@@ -2,7 +2,8 @@ import numpy as np
 import xarray as xr
 import rioxarray
 from pyproj import CRS
-from geospatial_grid.georeferencing import georef_netcdf_manually, georef_netcdf_rioxarray
+from geospatial_grid.georeferencing import georef_netcdf, georef_netcdf_manually, georef_netcdf_rioxarray
+from geospatial_grid.grid_database import LatLon375mGrid, SIN375mGrid, UTM375mGrid
 import pandas as pd
 import pytest
 
@@ -43,3 +44,44 @@ def test_mutual_georef_data_array(
     assert test_data_array_georef_rioxarray.coords["x"].attrs["axis"] == "X"
     assert test_data_array_georef_manually.coords["y"].attrs["axis"] == "Y"
     assert test_data_array_georef_rioxarray.coords["y"].attrs["axis"] == "Y"
+
+
+def _fsc_data(as_dataset: bool) -> xr.DataArray | xr.Dataset:
+    data_array = xr.DataArray(
+        np.zeros((2, 40, 10), dtype=np.float32),
+        coords={"x": np.arange(20, 30), "y": np.arange(10, -30, -1), "t": [0, 1]},
+        dims=("t", "y", "x"),
+        attrs={"long_name": "fractional snow cover"},
+    )
+    if as_dataset:
+        return xr.Dataset({"fsc": data_array, "fsc_qa": data_array.astype(np.uint8), "t_bounds": data_array.t})
+    return data_array
+
+
+@pytest.mark.parametrize("crs", (CRS.from_epsg(4326), UTM375mGrid().crs, SIN375mGrid().crs, LatLon375mGrid().crs))
+@pytest.mark.parametrize("as_dataset", (False, True))
+def test_georef_netcdf_same_as_rioxarray(as_dataset: bool, crs: CRS):
+    data = _fsc_data(as_dataset)
+    georeferenced = georef_netcdf(data, crs=crs)
+    expected = georef_netcdf_rioxarray(data, crs=crs)
+    xr.testing.assert_identical(georeferenced, expected)
+    assert georeferenced.encoding == expected.encoding
+    for name in georeferenced.coords:
+        assert georeferenced[name].encoding == expected[name].encoding
+    if as_dataset:
+        for name in georeferenced.data_vars:
+            assert georeferenced[name].encoding == expected[name].encoding
+    assert georeferenced.rio.crs == expected.rio.crs
+    # The input is left untouched
+    xr.testing.assert_identical(data, _fsc_data(as_dataset))
+
+
+@pytest.mark.parametrize("as_dataset", (False, True))
+def test_georef_netcdf_shares_data(as_dataset: bool):
+    data = _fsc_data(as_dataset)
+    georeferenced = georef_netcdf(data, crs=CRS.from_epsg(4326))
+    if as_dataset:
+        for name in data.data_vars:
+            assert np.shares_memory(georeferenced[name].values, data[name].values)
+    else:
+        assert np.shares_memory(georeferenced.values, data.values)
@@ -0,0 +1,74 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+import xarray as xr
+from pyproj import CRS
+
+from geospatial_grid.grid_database import (
+    GridRegistry,
+    GridRegistryError,
+    LatLon375mGrid,
+    SIN375mGrid,
+    UTM375mGrid,
+    UTM375mGridCantal,
+    default_registry,
+)
+from geospatial_grid.georeferencing import georef_netcdf_rioxarray
+from geospatial_grid.gsgrid import GSGrid
+
+
+def test_grid_registry_default_grids():
+    registry = default_registry()
+    assert registry is default_registry()
+    assert registry.names == ["UTM_375m", "UTM_375m_Cantal", "SIN_375m", "GEO_375m"]
+    for grid_class in (UTM375mGrid, UTM375mGridCantal, SIN375mGrid, LatLon375mGrid):
+        grid = grid_class()
+        assert registry[grid.name] == grid
+        assert registry.find(grid) is registry[grid.name]
+    assert registry["UTM_375m"].crs is registry["UTM_375m_Cantal"].crs is UTM375mGrid().crs
+    with pytest.raises(GridRegistryError):
+        registry["unknown"]
+
+
+def test_grid_registry_find():
+    registry = default_registry()
+    cantal_grid = registry["UTM_375m_Cantal"]
+    # Same grid with floating point noise and an equivalent CRS with a different WKT
+    noisy_grid = GSGrid(
+        x0=cantal_grid.x0 + 1e-7,
+        y0=cantal_grid.y0 - 1e-7,
+        resolution=375.0000000001,
+        width=155,
+        height=155,
+        crs=CRS.from_wkt(cantal_grid.crs.to_wkt("WKT1_GDAL")),
+    )
+    assert registry.find(noisy_grid) is cantal_grid
+    data = georef_netcdf_rioxarray(
+        xr.DataArray(np.zeros(cantal_grid.shape), coords=cantal_grid.xarray_coords), crs=cantal_grid.crs
+    )
+    assert registry.find(data) is cantal_grid
+    assert registry.find(cantal_grid.sub_grid(rows=slice(1, None), cols=slice(None))) is None
+    assert registry.find(xr.DataArray(np.zeros(3), dims=("x",), coords={"x": [0, 1, 3]})) is None
+
+
+@pytest.mark.parametrize("name", ["SIN_375m", "GEO_375m", "UTM_375m"])
+def test_grid_registry_find_float32_coords(name: str):
+    registry = default_registry()
+    grid = registry[name]
+    coords = {dim: values.astype(np.float32) for dim, values in grid.xarray_coords.items()}
+    data = georef_netcdf_rioxarray(xr.DataArray(np.zeros(grid.shape, dtype=np.uint8), coords=coords), crs=grid.crs)
+    assert registry.find(data) is grid
+
+
+def test_grid_registry_save_load(tmp_path: Path):
+    registry = GridRegistry([UTM375mGridCantal(), LatLon375mGrid(), GSGrid(0, 10, 1, 10, 10, name="no_crs")])
+    with pytest.raises(GridRegistryError):
+        registry.add(LatLon375mGrid())
+    with pytest.raises(GridRegistryError):
+        registry.add(GSGrid(0, 10, 1, 10, 10))
+    registry.save(tmp_path / "registry.json")
+    loaded_registry = GridRegistry.load(tmp_path / "registry.json")
+    assert loaded_registry.names == registry.names
+    for grid in registry:
+        assert loaded_registry[grid.name] == grid
@@ -1,6 +1,13 @@
+import os
+import pickle
+import subprocess
+import sys
+from pathlib import Path
+
 import numpy as np
-from geospatial_grid.gsgrid import GSGrid, GSGridError
+from geospatial_grid.gsgrid import GSGrid, GSGridError, mosaic, project_bounds
 from geospatial_grid.georeferencing import georef_netcdf_rioxarray
+from geospatial_grid.grid_database import UTM375mGridCantal
 import pytest
 import xarray as xr
 from pyproj import CRS
@@ -75,3 +82,296 @@ def test_grid_from_dataset():
     assert test_grid.ymin == 0
     assert test_grid.xmax == 200
     assert test_grid.ymax == 200
+
+
+def test_sub_grid():
+    test_grid = GSGrid(resolution=(1, 2), x0=0, y0=1, width=200, height=100, crs=CRS.from_epsg(3857))
+    test_sub_grid = test_grid.sub_grid(rows=slice(10, 20), cols=slice(5, None))
+    assert test_sub_grid.x0 == 5
+    assert test_sub_grid.y0 == -19
+    assert test_sub_grid.shape == (10, 195)
+    assert test_sub_grid.xend == test_grid.xend
+    assert test_sub_grid.crs == test_grid.crs
+    with pytest.raises(GSGridError):
+        test_grid.sub_grid(rows=slice(10, 10), cols=slice(0, 10))
+
+
+@pytest.mark.parametrize("halo", (0, 2))
+def test_tiles_and_mosaic(halo: int):
+    test_grid = GSGrid(resolution=(1, 2), x0=0, y0=1, width=23, height=17)
+    test_tiles = test_grid.tiles(tile_width=5, tile_height=4, halo=halo)
+    assert len(test_tiles) == 5 * 5
+
+    coverage = np.zeros(test_grid.shape, dtype=int)
+    for tile in test_tiles:
+        coverage[tile.core_window] += 1
+        assert tile.grid.x0 == test_grid.x0 + tile.col_off * test_grid.resolution_x
+        assert tile.grid.y0 == test_grid.y0 - tile.row_off * test_grid.resolution_y
+        assert np.array_equal(tile.grid.xcoords, test_grid.xcoords[tile.window[1]])
+        assert np.array_equal(tile.grid.ycoords, test_grid.ycoords[tile.window[0]])
+        assert tile.row_off >= 0 and tile.window[0].stop <= test_grid.height
+        assert tile.window[1].stop - tile.window[1].start <= 5 + 2 * halo
+    assert np.all(coverage == 1)
+
+    test_array = np.arange(2 * 17 * 23).reshape(2, 17, 23)
+    tile_arrays = [test_array[(..., *tile.window)] for tile in test_tiles]
+    out = np.zeros_like(test_array)
+    assert mosaic(test_tiles, tile_arrays, out=out) is out
+    assert np.array_equal(out, test_array)
+
+
+def test_tiles_arguments():
+    with pytest.raises(GSGridError):
+        GSGrid(resolution=1, x0=0, y0=1, width=10, height=10).tiles(tile_width=0, tile_height=4)
+
+
+def test_grid_immutable():
+    test_grid = GSGrid(resolution=(1, 2), x0=0, y0=1, width=200, height=100, crs=CRS.from_epsg(3857))
+    with pytest.raises(GSGridError):
+        test_grid.x0 = 10
+    with pytest.raises(GSGridError):
+        test_grid.new_attribute = 10
+    with pytest.raises(GSGridError):
+        del test_grid.width
+    assert not hasattr(test_grid, "__dict__")
+
+
+def test_grid_cached_read_only_coords():
+    test_grid = GSGrid(resolution=(1, 2), x0=0, y0=1, width=200, height=100)
+    assert np.shares_memory(test_grid.xcoords, test_grid.xcoords)
+    assert np.array_equal(test_grid.ycoords, test_grid.xarray_coords["y"].values)
+    assert test_grid.affine is test_grid.affine
+    # Indexes are shared, adding a coordinate to the returned copy leaves the cached coordinates unchanged
+    coords = test_grid.xarray_coords
+    assert coords.xindexes["x"] is test_grid.xarray_coords.xindexes["x"]
+    coords["t"] = [0, 1]
+    assert list(test_grid.xarray_coords) == ["y", "x"]
+    for coords in (test_grid.xcoords, test_grid.ycoords):
+        with pytest.raises(ValueError):
+            coords[0] = 1
+        with pytest.raises(ValueError):
+            coords.flags.writeable = True
+
+
+def test_grid_hash_and_equality():
+    test_grid = GSGrid(resolution=(1, 2), x0=0, y0=1, width=200, height=100, crs=CRS.from_epsg(3857), name="a")
+    same_grid = GSGrid(resolution=(1, 2), x0=0, y0=1, width=200, height=100, crs="EPSG:3857", name="b")
+    assert test_grid == same_grid
+    assert hash(test_grid) == hash(same_grid)
+    assert {test_grid: 1}[same_grid] == 1
+    assert test_grid != GSGrid(resolution=(1, 2), x0=0, y0=1, width=200, height=100, crs=CRS.from_epsg(4326))
+    assert test_grid != GSGrid(resolution=(1, 2), x0=0, y0=1, width=200, height=101, crs=CRS.from_epsg(3857))
+    assert test_grid != GSGrid(resolution=(1, 1), x0=0, y0=1, width=200, height=100, crs=CRS.from_epsg(3857))
+
+
+@pytest.mark.parametrize("test_grid", (GSGrid(resolution=(1, 2), x0=0, y0=1, width=20, height=10), UTM375mGridCantal()))
+def test_grid_pickle(test_grid: GSGrid):
+    test_grid.xcoords
+    unpickled_grid = pickle.loads(pickle.dumps(test_grid))
+    assert type(unpickled_grid) is type(test_grid)
+    assert unpickled_grid == test_grid
+    assert unpickled_grid.name == test_grid.name
+    assert np.array_equal(unpickled_grid.xcoords, test_grid.xcoords)
+
+
+def test_grid_from_dataset_float_coordinates():
+    # Coordinates computed in floating point are not exactly evenly spaced
+    x_coords = np.float32(0.1) * np.arange(0, 300, dtype=np.float32) + np.float32(1234.56)
+    test_data_array = georef_netcdf_rioxarray(
+        xr.DataArray(0, coords={"x": x_coords.astype(np.float64), "y": np.arange(200, -1, -2)}, dims=("x", "y")),
+        crs=CRS.from_epsg(4326),
+    )
+    assert not np.array_equal(x_coords, np.arange(x_coords[0], x_coords[0] + 300 * 0.1, 0.1))
+    test_grid = GSGrid.from_xarray(data=test_data_array)
+    assert test_grid.width == 300
+    np.testing.assert_allclose(test_grid.resolution_x, 0.1, rtol=1e-5)
+
+
+def test_grid_from_netcdf_file():
+    test_dataset = xr.open_dataset(Path(__file__).parents[1] / "data" / "fsc_cantal_viirs_jpss1.nc")
+    test_grid = GSGrid.from_xarray(test_dataset)
+    assert test_grid.shape == (159, 162)
+    np.testing.assert_allclose(test_grid.resolution_x, 370.650173222222)
+
+
+def test_window_of():
+    test_grid = GSGrid(resolution=(1, 2), x0=0, y0=1, width=200, height=100, crs=CRS.from_epsg(3857))
+    test_sub_grid = GSGrid(resolution=(1, 2), x0=10 + 1e-7, y0=-19, width=50, height=20, crs=CRS.from_epsg(3857))
+    rows, cols = test_grid.window_of(test_sub_grid)
+    assert (rows, cols) == (slice(10, 30), slice(10, 60))
+    np.testing.assert_allclose(test_grid.xcoords[cols], test_sub_grid.xcoords)
+    assert test_grid.window_of(test_grid) == (slice(0, 100), slice(0, 200))
+    assert test_grid.window_of(test_grid.sub_grid(rows=slice(3, 7), cols=slice(8, 9))) == (slice(3, 7), slice(8, 9))
+
+    # Not aligned
+    with pytest.raises(GSGridError):
+        test_grid.window_of(GSGrid(resolution=(1, 2), x0=10.5, y0=-19, width=50, height=20, crs=CRS.from_epsg(3857)))
+    # Not the same resolution
+    with pytest.raises(GSGridError):
+        test_grid.window_of(GSGrid(resolution=(2, 2), x0=10, y0=-19, width=50, height=20, crs=CRS.from_epsg(3857)))
+    # Not the same CRS
+    with pytest.raises(GSGridError):
+        test_grid.window_of(GSGrid(resolution=(1, 2), x0=10, y0=-19, width=50, height=20, crs=CRS.from_epsg(4326)))
+    # Not contained
+    with pytest.raises(GSGridError):
+        test_grid.window_of(GSGrid(resolution=(1, 2), x0=160, y0=-19, width=50, height=20, crs=CRS.from_epsg(3857)))
+
+
+def test_world_to_pixel():
+    test_grid = GSGrid(resolution=(1, 2), x0=10, y0=20, width=5, height=4, crs=CRS.from_epsg(32631))
+    rows, cols = test_grid.world_to_pixel(
+        np.array([10.1, 14.9, 12.5, 9.9, 12, np.nan]), np.array([19.9, 12.1, 15, 15, 21, 15])
+    )
+    assert np.array_equal(rows.compressed(), [0, 3, 2])
+    assert np.array_equal(cols.compressed(), [0, 4, 2])
+    assert np.array_equal(rows.mask, [False, False, False, True, True, True])
+    xs, ys = test_grid.pixel_to_world(rows.compressed(), cols.compressed())
+    assert np.array_equal(xs, [10.5, 14.5, 12.5])
+    assert np.array_equal(ys, [19, 13, 15])
+
+
+def test_world_to_pixel_other_crs():
+    test_grid = UTM375mGridCantal()
+    rows = np.array([0, 10, 154])
+    cols = np.array([3, 100, 154])
+    lons, lats = test_grid.pixel_to_world(rows, cols, crs=CRS.from_epsg(4326))
+    assert np.all((lons > 2) & (lons < 4) & (lats > 44) & (lats < 46))
+    test_rows, test_cols = test_grid.world_to_pixel(lons, lats, crs=CRS.from_epsg(4326))
+    assert np.array_equal(test_rows, rows)
+    assert np.array_equal(test_cols, cols)
+
+
+def test_sample():
+    test_grid = GSGrid(resolution=1, x0=0, y0=4, width=3, height=4, crs=CRS.from_epsg(32631))
+    test_data = np.arange(24).reshape(2, 4, 3)
+    test_sampled = test_grid.sample(test_data, xs=np.array([0.5, 2.5, 5]), ys=np.array([3.5, 0.5, 1]))
+    assert test_sampled.shape == (2, 3)
+    assert np.array_equal(test_sampled[:, :2], [[0, 11], [12, 23]])
+    assert np.all(test_sampled.mask[:, 2])
+    test_data_array = xr.DataArray(test_data, dims=("t", "y", "x")).transpose("y", "x", "t")
+    assert np.array_equal(test_grid.sample(test_data_array, xs=[1.5], ys=[2.5]), [[4], [16]])
+    with pytest.raises(GSGridError):
+        test_grid.sample(test_data[:, :2], xs=[1.5], ys=[2.5])
+
+
+def test_project_bounds():
+    test_grid = UTM375mGridCantal()
+    test_grids = [tile.grid for tile in test_grid.tiles(tile_width=50, tile_height=60)] + [
+        GSGrid(resolution=0.1, x0=2, y0=46, width=10, height=10, crs=CRS.from_epsg(4326))
+    ]
+    test_bounds = project_bounds(test_grids, 4326)
+    assert test_bounds.shape == (len(test_grids), 4)
+    for grid, bounds in zip(test_grids, test_bounds):
+        np.testing.assert_allclose(bounds, grid.bounds_projected_to_epsg(4326), atol=1e-9)
+    np.testing.assert_allclose(
+        project_bounds(test_grid.tiles(tile_width=50, tile_height=60)[:1], 4326, densify_pts=2)[0],
+        test_grids[0].bounds_projected_to_epsg(4326, densify_pts=2),
+    )
+    # On the other side of the globe in an orthographic projection
+    test_other_side = GSGrid(resolution=1, x0=170, y0=10, width=2, height=2, crs=CRS.from_epsg(4326))
+    assert np.all(np.isnan(project_bounds([test_other_side, test_grid], "+proj=ortho +lon_0=0 +lat_0=0")[0]))
+
+
+def test_pyramid():
+    base_grid = UTM375mGridCantal()
+    levels = base_grid.pyramid((1, 2, 3))
+    assert levels[0] is base_grid
+    for factor, level in zip((2, 3), levels[1:]):
+        assert (level.resolution_x, level.resolution_y) == (
+            base_grid.resolution_x * factor,
+            base_grid.resolution_y * factor,
+        )
+        assert (level.x0, level.y0) == (base_grid.x0, base_grid.y0)
+        assert level.shape == (-(-base_grid.height // factor), -(-base_grid.width // factor))
+        # Covers the base grid, with at most a partial block along each axis
+        assert level.xend >= base_grid.xend > level.xend - level.resolution_x
+        assert level.yend <= base_grid.yend < level.yend + level.resolution_y
+    with pytest.raises(GSGridError):
+        base_grid.coarsened(1.5)
+    with pytest.raises(GSGridError):
+        base_grid.coarsened(0)
+
+
+def test_grid_overlap_same_crs():
+    test_grid = GSGrid(resolution=1, x0=0, y0=10, width=10, height=10, crs=CRS.from_epsg(3857))
+    test_other = GSGrid(resolution=0.5, x0=7.25, y0=12, width=10, height=16, crs=CRS.from_epsg(3857))
+    assert test_grid.overlap_window(test_other) == (slice(0, 6), slice(7, 10))
+    assert test_grid.overlaps(test_other) and test_other.overlaps(test_grid)
+    assert test_grid.intersection(test_other) == test_grid.sub_grid(slice(0, 6), slice(7, 10))
+    assert not test_grid.contains(test_other)
+    assert test_grid.contains(test_grid.sub_grid(slice(2, 5), slice(1, 9)))
+    union = test_grid.union(test_other)
+    assert (union.x0, union.y0, union.width, union.height) == (0, 12, 13, 12)
+    assert union.window_of(test_grid) == (slice(2, 12), slice(0, 10))
+
+    test_outside = GSGrid(resolution=1, x0=10, y0=10, width=5, height=5, crs=CRS.from_epsg(3857))
+    assert test_grid.overlap_window(test_outside) is None
+    assert not test_grid.overlaps(test_outside)
+    assert test_grid.intersection(test_outside) is None
+    with pytest.raises(GSGridError):
+        test_grid.overlaps(GSGrid(resolution=1, x0=0, y0=10, width=10, height=10))
+
+
+def test_grid_overlap_other_crs():
+    test_grid = UTM375mGridCantal()
+    lon_min, lat_min, lon_max, lat_max = project_bounds([test_grid], 4326)[0]
+    test_inside = GSGrid(
+        resolution=0.01, x0=lon_min + 0.2, y0=lat_max - 0.2, width=20, height=20, crs=CRS.from_epsg(4326)
+    )
+    assert test_grid.contains(test_inside)
+    intersection = test_grid.intersection(test_inside)
+    assert test_grid.contains(intersection)
+    # The intersection covers the projected footprint of the other grid
+    xmin, ymin, xmax, ymax = project_bounds([test_inside], test_grid.crs)[0]
+    assert intersection.x0 <= xmin and intersection.xend >= xmax
+    assert intersection.yend <= ymin and intersection.y0 >= ymax
+
+    test_straddling = GSGrid(
+        resolution=0.01, x0=lon_max - 0.1, y0=lat_max - 0.2, width=20, height=20, crs=CRS.from_epsg(4326)
+    )
+    assert test_grid.overlaps(test_straddling) and not test_grid.contains(test_straddling)
+    assert test_grid.intersection(test_straddling).xend == test_grid.xend
+    union = test_grid.union(test_straddling)
+    assert union.contains(test_grid) and union.contains(test_straddling)
+    assert (union.x0, union.y0, union.height) == (test_grid.x0, test_grid.y0, test_grid.height)
+
+    test_far = GSGrid(resolution=0.01, x0=-120, y0=40, width=20, height=20, crs=CRS.from_epsg(4326))
+    assert not test_grid.overlaps(test_far)
+    assert test_grid.intersection(test_far) is None
+
+
+# Import of the grid geometry, NumPy excluded, in seconds. Importing xarray, rasterio and pyproj takes ~1 s
+IMPORT_TIME_BUDGET = 0.2
+
+
+def test_grid_geometry_import_light():
+    script = """
+import sys, time
+import numpy
+start = time.perf_counter()
+from geospatial_grid.grid_database import UTM375mGrid
+grid = UTM375mGrid()
+grid.window_of(grid.tiles(tile_width=256, tile_height=256)[5].grid)
+grid.pyramid()
+print(time.perf_counter() - start)
+print(",".join(sorted({"xarray", "rasterio", "pyproj", "rioxarray", "dask", "affine"} & set(sys.modules))))
+"""
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    )
+    import_time, heavy_modules = result.stdout.splitlines()
+    assert heavy_modules == ""
+    assert float(import_time) < IMPORT_TIME_BUDGET
+
+
+def test_grid_crs_parsed_on_first_use():
+    test_grid = GSGrid(resolution=1, x0=0, y0=10, width=10, height=10, crs="EPSG:3857")
+    test_sub_grid = test_grid.sub_grid(slice(2, 5), slice(1, 9))
+    assert test_grid.window_of(test_sub_grid) == (slice(2, 5), slice(1, 9))
+    assert test_grid.crs == CRS.from_epsg(3857)
+    assert test_grid.crs is GSGrid(resolution=2, x0=0, y0=10, width=5, height=5, crs="EPSG:3857").crs
+    assert pickle.loads(pickle.dumps(test_sub_grid)) == test_sub_grid
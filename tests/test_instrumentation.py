@@ -0,0 +1,95 @@
+import time
+
+import numpy as np
+import pytest
+import xarray as xr
+from pyproj import CRS
+from rasterio.enums import Resampling
+
+from geospatial_grid import instrumentation
+from geospatial_grid.georeferencing import georef_netcdf
+from geospatial_grid.gsgrid import GSGrid
+from geospatial_grid.instrumentation import StageRecord, add_callback, record_stages, remove_callback, stage
+from geospatial_grid.reprojections import reproject_using_grid
+
+test_grid = GSGrid(x0=0, y0=10, resolution=1, width=10, height=10, crs=CRS.from_epsg(3857))
+test_data = georef_netcdf(
+    xr.DataArray(np.ones((2, 10, 10), dtype=np.float32), dims=("t", "y", "x"), coords=test_grid.xarray_coords),
+    crs=test_grid.crs,
+)
+
+
+def test_record_stages_aligned_path():
+    output_grid = GSGrid(x0=0, y0=10, resolution=2, width=5, height=5, crs=CRS.from_epsg(3857))
+    with record_stages() as recorder:
+        reproject_using_grid(test_data, output_grid=output_grid, resampling_method=Resampling.average)
+    stages = {record.stage: record for record in recorder.records}
+    assert {"reproject_using_grid", "grid_from_xarray", "crs_parsing", "select_path", "aligned"} <= set(stages)
+    assert "warp" not in stages
+    assert stages["reproject_using_grid"].path == "block_reduce"
+    assert stages["reproject_using_grid"].bytes_in == 800
+    assert stages["reproject_using_grid"].bytes_out == 200
+    assert not any(record.failed for record in recorder.records)
+    # The outer stage completes last
+    assert recorder.records[-1].stage == "reproject_using_grid"
+
+
+def test_record_stages_warp_path():
+    output_grid = GSGrid(x0=0.5, y0=10, resolution=1, width=10, height=10, crs=CRS.from_epsg(3857))
+    with record_stages() as recorder:
+        reproject_using_grid(test_data, output_grid=output_grid)
+    stages = {record.stage: record for record in recorder.records}
+    assert stages["reproject_using_grid"].path == "warp"
+    assert stages["warp"].bytes_out == 800
+    assert "aligned" not in stages
+    assert set(recorder.total_durations()) == {record.stage for record in recorder.records}
+
+
+def test_disabled_records_nothing():
+    recorder = instrumentation.StageRecorder()
+    with recorder:
+        pass
+    reproject_using_grid(test_data, output_grid=test_grid)
+    assert recorder.records == []
+    assert not instrumentation.is_enabled()
+    assert stage("warp", data=test_data) is instrumentation._DISABLED_STAGE
+
+
+def test_failed_stage_recorded():
+    with record_stages() as recorder:
+        with pytest.raises(ValueError):
+            with stage("failing", data=np.zeros(4, dtype=np.uint8)):
+                raise ValueError
+    assert recorder.records[0].failed
+    assert recorder.records[0].bytes_in == 4
+
+
+def test_callbacks_and_to_dicts():
+    records = []
+    add_callback(records.append)
+    try:
+        with stage("sized", data=10, path="aligned") as sized:
+            sized.output = np.zeros(3, dtype=np.float64)
+    finally:
+        remove_callback(records.append)
+    assert len(records) == 1 and isinstance(records[0], StageRecord)
+    with stage("not recorded"):
+        pass
+    assert len(records) == 1
+
+    with record_stages() as recorder:
+        with stage("sized", data=10) as sized:
+            sized.output = 24
+    (record,) = recorder.to_dicts()
+    assert set(record) == set(StageRecord._fields)
+    assert (record["stage"], record["bytes_in"], record["bytes_out"], record["failed"]) == ("sized", 10, 24, False)
+
+
+def test_disabled_overhead():
+    n_stages = 100_000
+    start = time.perf_counter()
+    for _ in range(n_stages):
+        with stage("disabled", data=test_data) as disabled:
+            disabled.output = test_data
+    # A few hundred nanoseconds per stage, generous bound for slow CI machines
+    assert (time.perf_counter() - start) / n_stages < 5e-6
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+import xarray as xr
+from pyproj import CRS
+from rasterio.enums import Resampling
+
+from geospatial_grid.aligned import block_reduce
+from geospatial_grid.georeferencing import georef_netcdf
+from geospatial_grid.gsgrid import GSGrid, GSGridError
+from geospatial_grid.instrumentation import record_stages
+from geospatial_grid.multiscale import build_multiscale
+
+test_source_grid = GSGrid(x0=500000, y0=5000000, resolution=100, width=60, height=50, crs=CRS.from_epsg(32631))
+test_base_grid = GSGrid(x0=501000, y0=4999000, resolution=150, width=33, height=27, crs=CRS.from_epsg(32631))
+rng = np.random.default_rng(0)
+test_values = rng.random((2, 50, 60)).astype(np.float32)
+test_values[:, 10:20, 10:20] = np.nan
+test_classes = rng.integers(0, 3, size=(2, 50, 60)).astype(np.uint8)
+test_data = georef_netcdf(
+    xr.Dataset(
+        {"fsc": (("t", "y", "x"), test_values), "land_cover": (("t", "y", "x"), test_classes)},
+        coords={"t": [0, 1], **test_source_grid.xarray_coords},
+        attrs={"product": "test"},
+    ),
+    crs=test_source_grid.crs,
+)
+
+
+def _assert_on_grid(data: xr.Dataset | xr.DataArray, grid: GSGrid) -> None:
+    data_grid = GSGrid.from_xarray(data)
+    assert data_grid.crs == grid.crs
+    assert data_grid.shape == grid.shape
+    np.testing.assert_allclose(data_grid.affine[:6], grid.affine[:6])
+
+
+def test_build_multiscale_one_warp():
+    with record_stages() as recorder:
+        multiscale = build_multiscale(
+            test_data,
+            base_grid=test_base_grid,
+            factors=(1, 2, 4),
+            resampling_method=Resampling.nearest,
+            categorical_variables=["land_cover"],
+        )
+    assert sum(record.stage == "warp" for record in recorder.records) == 1
+    assert list(multiscale) == [1, 2, 4]
+
+    finest = multiscale[1]
+    for factor, level_grid in zip((2, 4), test_base_grid.pyramid((2, 4))):
+        level = multiscale[factor]
+        _assert_on_grid(level, level_grid)
+        assert level.rio.crs == level_grid.crs
+        assert list(level.data_vars) == ["fsc", "land_cover"]
+        assert level.attrs == {"product": "test"}
+        # Partial blocks of the last row and column padded with no data, out of the reduction
+        height, width = level_grid.height * factor, level_grid.width * factor
+        fsc = np.full((2, height, width), np.nan, dtype=np.float32)
+        fsc[:, : test_base_grid.height, : test_base_grid.width] = finest["fsc"].values
+        expected = block_reduce(fsc, factor_y=factor, factor_x=factor, resampling=Resampling.average, skip_nan=True)
+        np.testing.assert_allclose(level["fsc"].values, expected, rtol=1e-6)
+        land_cover = np.full((2, height, width), 255, dtype=np.uint8)
+        land_cover[:, : test_base_grid.height, : test_base_grid.width] = finest["land_cover"].values
+        expected = block_reduce(
+            land_cover, factor_y=factor, factor_x=factor, resampling=Resampling.mode, src_nodata=255, dst_nodata=255
+        )
+        np.testing.assert_array_equal(level["land_cover"].values, expected)
+
+    # NaN-aware: blocks partly in the NaN square are averaged over their valid pixels
+    assert np.isnan(finest["fsc"].values).any()
+    assert np.isnan(multiscale[4]["fsc"].values).sum() < np.isnan(finest["fsc"].values).sum() / 16
+
+
+def test_build_multiscale_data_array_coarser_base():
+    data_array = test_data["fsc"]
+    multiscale = build_multiscale(
+        data_array, base_grid=test_base_grid, factors=(6, 2), resampling_method=Resampling.bilinear
+    )
+    assert list(multiscale) == [2, 6]
+    _assert_on_grid(multiscale[2], test_base_grid.coarsened(2))
+    _assert_on_grid(multiscale[6], test_base_grid.coarsened(6))
+    assert multiscale[6].name == "fsc"
+
+
+def test_build_multiscale_invalid():
+    with pytest.raises(GSGridError):
+        build_multiscale(test_data, base_grid=test_base_grid, factors=(2, 3))
+    with pytest.raises(GSGridError):
+        build_multiscale(test_data, base_grid=test_base_grid, reduction=Resampling.bilinear)
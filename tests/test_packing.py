@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+import xarray as xr
+from pyproj import CRS
+from rasterio.enums import Resampling
+
+from geospatial_grid.georeferencing import georef_netcdf
+from geospatial_grid.gsgrid import GSGrid
+from geospatial_grid.packing import PackingError, pack, pack_array
+from geospatial_grid.reprojections import reproject_using_grid
+
+test_source_grid = GSGrid(x0=500000, y0=5000000, resolution=100, width=60, height=50, crs=CRS.from_epsg(32631))
+test_output_grid = GSGrid(x0=3.005, y0=45.14, resolution=0.001, width=50, height=40, crs=CRS.from_epsg(4326))
+rng = np.random.default_rng(0)
+test_fsc = rng.uniform(0, 100, (2, 50, 60))
+test_fsc[:, 10:20, 10:20] = np.nan
+test_data = georef_netcdf(
+    xr.Dataset(
+        {
+            "fsc": (("t", "y", "x"), test_fsc),
+            "cloud_mask": (("t", "y", "x"), (test_fsc > 50).astype(np.float64)),
+            "quality": (("t", "y", "x"), rng.integers(0, 10, (2, 50, 60)).astype(np.int16)),
+        },
+        coords={"t": [0, 1], **test_source_grid.xarray_coords},
+    ),
+    crs=test_source_grid.crs,
+)
+fsc_encoding = {"dtype": "uint8", "scale_factor": 0.5, "_FillValue": 255}
+
+
+def test_pack_array():
+    array = np.array([[[-3.0, 0.2, 0.3, 127.4, 300, np.nan, -1]]])
+    packed = pack_array(array, dtype=np.uint8, scale_factor=0.5, add_offset=-1.0, fill_value=255, src_nodata=-1)
+    assert packed.dtype == np.uint8
+    # Clipped to [0, 254], 255 being the fill value
+    np.testing.assert_array_equal(packed, [[[0, 2, 3, 254, 254, 255, 255]]])
+    packed = pack_array(array, dtype=np.int16)
+    np.testing.assert_array_equal(packed, [[[-3, 0, 0, 127, 300, -32768, -1]]])
+
+
+@pytest.mark.parametrize("resampling", (Resampling.nearest, Resampling.bilinear))
+def test_reproject_using_grid_packed(resampling):
+    expected = reproject_using_grid(test_data["fsc"], output_grid=test_output_grid, resampling_method=resampling)
+    packed = reproject_using_grid(
+        test_data["fsc"], output_grid=test_output_grid, resampling_method=resampling, encoding=fsc_encoding
+    )
+    assert packed.dtype == np.uint8
+    assert packed.encoding["dtype"] == np.uint8
+    assert packed.attrs["_FillValue"] == 255 and packed.attrs["scale_factor"] == 0.5
+    assert packed.rio.nodata == 255
+    unpacked = xr.decode_cf(packed.to_dataset())["fsc"]
+    assert unpacked.dtype.kind == "f"
+    # No data edges of an interpolation on packed values may move by a pixel
+    both_valid = ~np.isnan(unpacked.values) & ~np.isnan(expected.values)
+    assert both_valid.mean() > 0.7 and (np.isnan(unpacked.values) == np.isnan(expected.values)).mean() > 0.99
+    tolerance = 0.25 if resampling == Resampling.nearest else 0.5
+    np.testing.assert_allclose(unpacked.values[both_valid], expected.values[both_valid], atol=tolerance)
+
+
+def test_reproject_using_grid_packed_dataset_netcdf(tmp_path):
+    encoding = {"fsc": fsc_encoding, "cloud_mask": {"dtype": "uint8"}}
+    packed = reproject_using_grid(test_data, output_grid=test_output_grid, encoding=encoding)
+    assert (packed["fsc"].dtype, packed["cloud_mask"].dtype, packed["quality"].dtype) == (np.uint8, np.uint8, np.int16)
+    assert packed["cloud_mask"].attrs["_FillValue"] == 255
+    expected = reproject_using_grid(test_data, output_grid=test_output_grid)
+    np.testing.assert_array_equal(packed["quality"].values, expected["quality"].values)
+
+    # Written as is, unpacked when read
+    packed.to_netcdf(tmp_path / "packed.nc")
+    with xr.open_dataset(tmp_path / "packed.nc", mask_and_scale=False) as stored:
+        assert stored["fsc"].dtype == np.uint8
+        np.testing.assert_array_equal(stored["fsc"].values, packed["fsc"].values)
+    with xr.open_dataset(tmp_path / "packed.nc") as stored:
+        np.testing.assert_allclose(stored["fsc"].values, expected["fsc"].values, atol=0.25)
+        np.testing.assert_array_equal(stored["cloud_mask"].values, expected["cloud_mask"].values)
+
+
+def test_reproject_using_grid_packed_aligned_float16():
+    output_grid = test_source_grid.coarsened(2)
+    packed = reproject_using_grid(
+        test_data["fsc"], output_grid=output_grid, resampling_method=Resampling.average, encoding={"dtype": "float16"}
+    )
+    assert packed.dtype == np.float16
+    expected = reproject_using_grid(test_data["fsc"], output_grid=output_grid, resampling_method=Resampling.average)
+    np.testing.assert_allclose(packed.values, expected.values, rtol=1e-3)
+
+
+def test_pack_invalid_encoding():
+    with pytest.raises(PackingError):
+        pack(test_data["fsc"], {"scale_factor": 0.5})
+    with pytest.raises(PackingError):
+        pack(test_data, {"snow_depth": fsc_encoding})
+    with pytest.raises(PackingError):
+        pack(test_data["fsc"], {"dtype": "uint8", "compression": "zlib"})
+    with pytest.raises(PackingError):
+        reproject_using_grid(test_data["fsc"], output_grid=test_output_grid, nodata=0, encoding=fsc_encoding)
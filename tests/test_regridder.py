@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+from pyproj import CRS
+from rasterio.enums import Resampling
+
+from geospatial_grid.georeferencing import georef_netcdf_rioxarray
+from geospatial_grid.gsgrid import GSGrid
+from geospatial_grid import regridder as regridder_module
+from geospatial_grid.regridder import Regridder, RegridderError, clear_regridder_cache, get_regridder
+from geospatial_grid.reprojections import reproject_using_grid
+
+test_array = np.zeros(shape=(3, 10, 10))
+test_array[:, :, ::2] = 1
+test_data_array_georef = georef_netcdf_rioxarray(
+    xr.DataArray(
+        test_array,
+        coords={"x": np.arange(0, 10), "y": np.arange(10, 0, -1), "t": pd.date_range("20251201", "20251203")},
+        dims=("t", "y", "x"),
+    ),
+    crs=CRS.from_epsg(3857),
+)
+test_source_grid = GSGrid.from_xarray(test_data_array_georef)
+
+rng = np.random.default_rng(0)
+test_random_data_array = georef_netcdf_rioxarray(
+    xr.DataArray(
+        rng.random((2, 40, 50)),
+        coords={"x": np.arange(0, 50) * 1000 + 500000, "y": np.arange(5000000, 4960000, -1000), "t": [0, 1]},
+        dims=("t", "y", "x"),
+    ),
+    crs=CRS.from_epsg(32631),
+)
+
+
+@pytest.mark.parametrize(
+    ("resampling", "output_grid"),
+    (
+        [Resampling.nearest, GSGrid(x0=0.1, y0=10, resolution=(1, 1), width=5, height=5, crs=CRS.from_epsg(3857))],
+        [Resampling.bilinear, GSGrid(x0=0, y0=10, resolution=(1, 1), width=5, height=5, crs=CRS.from_epsg(3857))],
+        [Resampling.average, GSGrid(x0=-0.5, y0=10.5, resolution=(2, 2), width=5, height=5, crs=CRS.from_epsg(3857))],
+    ),
+)
+def test_regridder_same_crs_matches_rioxarray(resampling: Resampling, output_grid: GSGrid):
+    regridded = Regridder(test_source_grid, output_grid, resampling=resampling).regrid(test_data_array_georef)
+    reprojected = reproject_using_grid(
+        data=test_data_array_georef, output_grid=output_grid, resampling_method=resampling, allow_fast_path=False
+    )
+    np.testing.assert_allclose(regridded.values, reprojected.values)
+    np.testing.assert_allclose(regridded.coords["x"].values, reprojected.coords["x"].values)
+    np.testing.assert_allclose(regridded.coords["y"].values, reprojected.coords["y"].values)
+    assert CRS.from_wkt(regridded.coords["spatial_ref"].attrs["spatial_ref"]) == CRS.from_epsg(3857)
+
+
+@pytest.mark.parametrize("resampling", (Resampling.nearest, Resampling.bilinear))
+def test_regridder_cross_crs_close_to_rioxarray(resampling: Resampling):
+    output_grid = GSGrid(x0=3.05, y0=45.1, resolution=0.01, width=40, height=20, crs=CRS.from_epsg(4326))
+    source_grid = GSGrid.from_xarray(test_random_data_array)
+    regridded = Regridder(source_grid, output_grid, resampling=resampling).regrid(test_random_data_array)
+    reprojected = reproject_using_grid(
+        data=test_random_data_array, output_grid=output_grid, resampling_method=resampling, allow_fast_path=False
+    )
+    both_valid = ~np.isnan(regridded.values) & ~np.isnan(reprojected.values)
+    assert both_valid.mean() > 0.9
+    # GDAL uses an approximate transformer and widens the bilinear kernel when downsampling
+    differences = np.abs(regridded.values[both_valid] - reprojected.values[both_valid])
+    if resampling == Resampling.nearest:
+        assert np.mean(differences < 1e-6) > 0.95
+    else:
+        assert np.mean(differences) < 0.02
+
+
+def test_regridder_nodata():
+    data = test_data_array_georef.copy()
+    data[:, 0, 0] = np.nan
+    data.attrs["_FillValue"] = np.nan
+    output_grid = GSGrid(x0=-1.5, y0=11.5, resolution=(1, 1), width=12, height=12, crs=CRS.from_epsg(3857))
+    regridded = Regridder(test_source_grid, output_grid, resampling=Resampling.nearest).regrid(data, nodata=-1)
+    assert np.all(regridded.values[:, [0, -1], :] == -1)
+    assert np.all(regridded.values[:, :, [0, -1]] == -1)
+    assert np.all(regridded.values[:, 1, 1] == -1)
+    assert regridded.attrs["_FillValue"] == -1
+    assert np.array_equal(regridded.values[:, 2:-1, 2:-1], test_data_array_georef.values[:, 1:, 1:])
+
+
+def test_regridder_unsupported_resampling():
+    with pytest.raises(RegridderError):
+        Regridder(test_source_grid, test_source_grid, resampling=Resampling.cubic)
+
+
+def test_regridder_cache(tmp_path):
+    output_grid = GSGrid(x0=0, y0=10, resolution=(1, 1), width=5, height=5, crs=CRS.from_epsg(3857))
+    clear_regridder_cache()
+    regridder = get_regridder(test_source_grid, output_grid, resampling=Resampling.bilinear, cache_dir=tmp_path)
+    same_grid = GSGrid(x0=0, y0=10, resolution=(1, 1), width=5, height=5, crs=CRS.from_epsg(3857))
+    assert get_regridder(test_source_grid, same_grid, resampling=Resampling.bilinear) is regridder
+    assert get_regridder(test_source_grid, same_grid, resampling=Resampling.nearest) is not regridder
+
+    clear_regridder_cache()
+    loaded = get_regridder(test_source_grid, output_grid, resampling=Resampling.bilinear, cache_dir=tmp_path)
+    assert loaded is not regridder
+    assert np.array_equal(loaded.indices, regridder.indices)
+    assert np.array_equal(loaded.weights, regridder.weights)
+    assert loaded.target_grid.shape == output_grid.shape
+    # Written through a temporary file renamed in place
+    assert [path.suffix for path in tmp_path.iterdir()] == [".npz"]
+
+
+def test_regridder_cache_bounded_by_size(monkeypatch):
+    clear_regridder_cache()
+    grids = [GSGrid(x0=0, y0=10, resolution=1, width=5, height=5 + i, crs=CRS.from_epsg(3857)) for i in range(3)]
+    regridders = [get_regridder(test_source_grid, grid) for grid in grids[:2]]
+    max_bytes = regridders[0].nbytes + Regridder(test_source_grid, grids[2]).nbytes
+    monkeypatch.setattr(regridder_module, "REGRIDDER_CACHE_MAX_BYTES", max_bytes)
+    assert get_regridder(test_source_grid, grids[0]) is regridders[0]
+    # Doesn't fit, the least recently used regridder is evicted
+    get_regridder(test_source_grid, grids[2])
+    assert get_regridder(test_source_grid, grids[0]) is regridders[0]
+    assert get_regridder(test_source_grid, grids[1]) is not regridders[1]
+    clear_regridder_cache()
+
+
+def test_reproject_using_grid_with_regridder_cache():
+    test_grid = GSGrid(x0=0, y0=10, resolution=(1, 1), width=5, height=5, crs=CRS.from_epsg(3857))
+    test_reprojected = reproject_using_grid(
+        data=test_data_array_georef,
+        output_grid=test_grid,
+        resampling_method=Resampling.bilinear,
+        use_regridder_cache=True,
+    )
+    assert np.array_equal(test_reprojected.values, 0.5 * np.ones_like(test_reprojected.values))
+
+
+def test_reproject_using_grid_with_regridder_cache_irregular_data():
+    # No source grid to compute a regridder for, falls back to the warp
+    irregular_data = test_data_array_georef.assign_coords(x=np.array([0, 1, 2, 3, 4, 5, 6, 7, 8, 10]))
+    test_grid = GSGrid(x0=0, y0=10, resolution=(1, 1), width=5, height=5, crs=CRS.from_epsg(3857))
+    test_reprojected = reproject_using_grid(
+        data=irregular_data, output_grid=test_grid, resampling_method=Resampling.nearest, use_regridder_cache=True
+    )
+    assert test_reprojected.shape == (3, 5, 5)
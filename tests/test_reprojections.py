@@ -1,12 +1,22 @@
 import numpy as np
 import xarray as xr
 from rasterio.enums import Resampling
-from geospatial_grid.gsgrid import GSGrid
+from geospatial_grid.gsgrid import GSGrid, GSGridError
 from pyproj import CRS
 import pandas as pd
-from geospatial_grid.reprojections import reproject_using_grid
+from geospatial_grid.reprojections import (
+    read_raster_on_grid,
+    reproject_using_grid,
+    reproject_using_grid_batched,
+    reproject_using_grid_chunked,
+    reproject_to_zarr,
+)
 from geospatial_grid.georeferencing import georef_netcdf_rioxarray
+from geospatial_grid.instrumentation import record_stages
 import pytest
+import rasterio
+import rioxarray
+from pathlib import Path
 
 
 test_array = np.zeros(shape=(3, 10, 10))
@@ -87,3 +97,265 @@ def test_reproject_dataset():
     )
     assert np.array_equal(test_reprojected.data_vars["tda2"].values, np.zeros_like(test_reprojected.data_vars["tda2"].values))
 
+
+@pytest.mark.parametrize("resampling", (Resampling.nearest, Resampling.bilinear))
+def test_reproject_using_grid_chunked_same_as_reproject_using_grid(resampling: Resampling):
+    test_grid = GSGrid(x0=-1, y0=11, resolution=(0.5, 0.5), width=23, height=19, crs=CRS.from_epsg(3857))
+    test_reprojected_chunked = reproject_using_grid_chunked(
+        data=test_dataset_georef.chunk(t=1),
+        output_grid=test_grid,
+        tile_width=5,
+        tile_height=4,
+        resampling_method=resampling,
+    )
+    test_reprojected = reproject_using_grid(
+        data=test_dataset_georef, output_grid=test_grid, resampling_method=resampling
+    )
+    assert test_reprojected_chunked.data_vars["tda1"].chunks == ((1, 1, 1), (4, 4, 4, 4, 3), (5, 5, 5, 5, 3))
+    assert np.array_equal(test_reprojected_chunked.coords["x"].values, test_grid.xcoords)
+    for var in ("tda1", "tda2"):
+        np.testing.assert_array_equal(test_reprojected_chunked[var].values, test_reprojected[var].values)
+    reprojected_crs = CRS.from_wkt(test_reprojected_chunked.coords["spatial_ref"].attrs["spatial_ref"])
+    assert reprojected_crs == CRS.from_epsg(3857)
+
+
+def test_reproject_using_grid_chunked_other_crs():
+    test_grid = GSGrid(x0=0, y0=9e-5, resolution=(1e-5, 1e-5), width=10, height=10, crs=CRS.from_epsg(4326))
+    test_reprojected_chunked = reproject_using_grid_chunked(
+        data=test_data_array_georef, output_grid=test_grid, tile_width=3, tile_height=3, nodata=-1
+    )
+    test_reprojected = reproject_using_grid(
+        data=test_data_array_georef, output_grid=test_grid, nodata=-1, resampling_method=Resampling.nearest
+    )
+    assert test_reprojected_chunked.attrs["_FillValue"] == -1
+    assert test_reprojected_chunked.name is None
+    np.testing.assert_array_equal(test_reprojected_chunked.values, test_reprojected.values)
+
+
+@pytest.mark.parametrize(
+    ("output_grid", "resampling"),
+    (
+        [GSGrid(x0=-0.2, y0=9.8, resolution=2, width=4, height=4, crs=CRS.from_epsg(3857)), Resampling.average],
+        [GSGrid(x0=-0.5, y0=12.5, resolution=2, width=6, height=7, crs=CRS.from_epsg(3857)), Resampling.sum],
+        [GSGrid(x0=0.3, y0=9.6, resolution=0.7, width=12, height=12, crs=CRS.from_epsg(3857)), Resampling.nearest],
+        [GSGrid(x0=0.3, y0=9.6, resolution=1.3, width=7, height=7, crs=CRS.from_epsg(3857)), Resampling.max],
+        [GSGrid(x0=0, y0=0.0001, resolution=1e-5, width=9, height=9, crs=CRS.from_epsg(4326)), Resampling.mode],
+    ),
+)
+@pytest.mark.parametrize("max_workers", (1, None))
+def test_reproject_using_grid_batched_same_as_reproject_using_grid(
+    output_grid: GSGrid, resampling: Resampling, max_workers: int | None
+):
+    test_dataset = xr.Dataset(
+        {"tda1": test_data_array_georef, "tda2": test_data_array_2_georef.astype(np.float32), "scalar": 1}
+    )
+    test_reprojected = reproject_using_grid(data=test_dataset, output_grid=output_grid, resampling_method=resampling)
+    test_batched = reproject_using_grid_batched(
+        data=test_dataset, output_grid=output_grid, resampling_method=resampling, max_workers=max_workers
+    )
+    assert list(test_batched.data_vars) == list(test_reprojected.data_vars)
+    assert test_batched.data_vars["scalar"] == 1
+    for name in ("tda1", "tda2"):
+        assert test_batched.data_vars[name].dims == ("t", "y", "x")
+        assert test_batched.data_vars[name].dtype == test_reprojected.data_vars[name].dtype
+        np.testing.assert_allclose(test_batched.data_vars[name].values, test_reprojected.data_vars[name].values)
+    assert test_batched.rio.crs == output_grid.crs
+
+
+test_dem_path = Path(__file__).parent.parent / "data" / "dem_cantal.tif"
+
+
+@pytest.mark.parametrize(
+    ("output_grid", "resampling"),
+    (
+        [
+            GSGrid(x0=460000, y0=5010000, resolution=200, width=60, height=50, crs=CRS.from_epsg(32631)),
+            Resampling.bilinear,
+        ],
+        [
+            GSGrid(x0=660000, y0=6460000, resolution=250, width=40, height=30, crs=CRS.from_epsg(2154)),
+            Resampling.nearest,
+        ],
+        [GSGrid(x0=2.0, y0=45.3, resolution=0.01, width=90, height=60, crs=CRS.from_epsg(4326)), Resampling.average],
+    ),
+)
+def test_read_raster_on_grid_same_as_reproject_using_grid(output_grid: GSGrid, resampling: Resampling):
+    test_dem = georef_netcdf_rioxarray(rioxarray.open_rasterio(test_dem_path), crs=CRS.from_epsg(2154))
+    test_reprojected = reproject_using_grid(
+        data=test_dem, output_grid=output_grid, resampling_method=resampling, allow_fast_path=False
+    )
+    test_read = read_raster_on_grid(test_dem_path, output_grid=output_grid, resampling_method=resampling)
+    assert test_read.dims == ("band", "y", "x")
+    assert test_read.attrs["_FillValue"] == -10000
+    assert test_read.rio.crs == output_grid.crs
+    np.testing.assert_allclose(test_read.coords["x"].values, test_reprojected.coords["x"].values)
+    np.testing.assert_allclose(test_read.values, test_reprojected.values, rtol=1e-6)
+
+
+def test_read_raster_on_grid_overviews(tmp_path: Path):
+    test_dem_with_overviews_path = tmp_path / "dem_with_overviews.tif"
+    with rasterio.open(test_dem_path) as test_dem:
+        profile, values = test_dem.profile, test_dem.read()
+    with rasterio.open(test_dem_with_overviews_path, "w", **profile) as test_dem_with_overviews:
+        test_dem_with_overviews.write(values)
+        test_dem_with_overviews.build_overviews([2, 4], Resampling.average)
+
+    # 1000 m target, coarsest overview not coarser is the 4x (1000 m) one
+    test_grid = GSGrid(x0=650000, y0=6470000, resolution=1000, width=50, height=50, crs=CRS.from_epsg(2154))
+    test_read = read_raster_on_grid(test_dem_with_overviews_path, output_grid=test_grid)
+    test_overview = georef_netcdf_rioxarray(
+        rioxarray.open_rasterio(test_dem_with_overviews_path, overview_level=1), crs=CRS.from_epsg(2154)
+    )
+    np.testing.assert_array_equal(
+        test_read.values, reproject_using_grid(data=test_overview, output_grid=test_grid, allow_fast_path=False).values
+    )
+
+    test_read_full_resolution = read_raster_on_grid(
+        test_dem_with_overviews_path, output_grid=test_grid, use_overviews=False
+    )
+    test_full_resolution = georef_netcdf_rioxarray(rioxarray.open_rasterio(test_dem_path), crs=CRS.from_epsg(2154))
+    np.testing.assert_array_equal(
+        test_read_full_resolution.values,
+        reproject_using_grid(data=test_full_resolution, output_grid=test_grid, allow_fast_path=False).values,
+    )
+    assert not np.array_equal(test_read.values, test_read_full_resolution.values)
+
+
+@pytest.mark.parametrize(
+    "test_grid",
+    (
+        # Partial overlap, same CRS and lattice: sliced and padded
+        GSGrid(x0=-5, y0=12, resolution=(1, 1), width=30, height=20, crs=CRS.from_epsg(3857)),
+        # Partial overlap, warped
+        GSGrid(x0=-5.3, y0=11.6, resolution=(0.4, 0.4), width=60, height=40, crs=CRS.from_epsg(3857)),
+        GSGrid(x0=-4e-5, y0=9e-5, resolution=(1e-5, 1e-5), width=30, height=30, crs=CRS.from_epsg(4326)),
+    ),
+)
+@pytest.mark.parametrize("resampling", (Resampling.nearest, Resampling.bilinear))
+def test_reproject_using_grid_crop_to_overlap(test_grid: GSGrid, resampling: Resampling):
+    test_cropped = reproject_using_grid(
+        data=test_dataset_georef, output_grid=test_grid, resampling_method=resampling, nodata=-1, crop_to_overlap=True
+    )
+    test_reprojected = reproject_using_grid(
+        data=test_dataset_georef, output_grid=test_grid, resampling_method=resampling, nodata=-1
+    )
+    assert GSGrid.from_xarray(test_cropped).affine == test_grid.affine
+    for var in ("tda1", "tda2"):
+        assert test_cropped[var].dims == test_reprojected[var].dims
+        # Bilinear weights of the cropped warp differ by rounding errors
+        np.testing.assert_allclose(test_cropped[var].values, test_reprojected[var].values, rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize(
+    "test_grid",
+    (
+        # Overlap of a single output column, same lattice then shifted lattice
+        GSGrid(x0=990, y0=1000, resolution=10, width=50, height=50, crs=CRS.from_epsg(32631)),
+        GSGrid(x0=993, y0=1004, resolution=10, width=50, height=50, crs=CRS.from_epsg(32631)),
+        # No overlap
+        GSGrid(x0=2000, y0=1000, resolution=10, width=50, height=50, crs=CRS.from_epsg(32631)),
+    ),
+)
+def test_reproject_using_grid_crop_to_overlap_same_crs(test_grid: GSGrid):
+    source_grid = GSGrid(x0=0, y0=1000, resolution=10, width=100, height=100, crs=CRS.from_epsg(32631))
+    test_source = georef_netcdf_rioxarray(
+        xr.DataArray(
+            np.arange(10000, dtype=np.float32).reshape(1, 100, 100),
+            coords={"t": [0], **source_grid.xarray_coords},
+            dims=("t", "y", "x"),
+        ),
+        crs=source_grid.crs,
+    )
+    test_cropped = reproject_using_grid(data=test_source, output_grid=test_grid, nodata=-1, crop_to_overlap=True)
+    test_reprojected = reproject_using_grid(data=test_source, output_grid=test_grid, nodata=-1)
+    assert GSGrid.from_xarray(test_cropped).affine == test_grid.affine
+    assert test_cropped.dims == test_reprojected.dims
+    np.testing.assert_array_equal(test_cropped.values, test_reprojected.values)
+
+
+def test_reproject_using_grid_crop_to_overlap_outside():
+    test_grid = GSGrid(x0=100, y0=10, resolution=(1, 1), width=10, height=10, crs=CRS.from_epsg(3857))
+    with record_stages() as recorder:
+        test_cropped = reproject_using_grid(
+            data=test_data_array_georef, output_grid=test_grid, nodata=-1, crop_to_overlap=True
+        )
+    assert [record.path for record in recorder.records if record.stage == "reproject_using_grid"] == ["skip"]
+    assert test_cropped.shape == (3, 10, 10)
+    assert np.all(test_cropped.values == -1)
+    assert test_cropped.attrs["_FillValue"] == -1
+
+
+def test_read_raster_on_grid_outside():
+    test_grid = GSGrid(x0=0, y0=10, resolution=1, width=10, height=10, crs=CRS.from_epsg(2154))
+    test_read = read_raster_on_grid(test_dem_path, output_grid=test_grid, nodata=0)
+    assert test_read.shape == (1, 10, 10)
+    assert np.all(test_read.values == 0)
+
+
+def test_reproject_to_zarr(tmp_path: Path):
+    test_dataset = xr.Dataset(
+        {
+            "tda1": test_data_array_georef,
+            "tda2": test_data_array_2_georef.astype(np.int16).rio.write_nodata(-1),
+            "scalar": 1,
+        }
+    ).chunk(t=1)
+    test_grid = GSGrid(x0=0.3, y0=9.6, resolution=0.7, width=16, height=12, crs=CRS.from_epsg(3857))
+    test_reprojected = reproject_using_grid(data=test_dataset, output_grid=test_grid, allow_fast_path=False)
+    test_store = tmp_path / "reprojected.zarr"
+    test_written = reproject_to_zarr(
+        data=test_dataset, output_grid=test_grid, store=test_store, tile_width=5, tile_height=5, max_workers=2
+    )
+    assert test_written.rio.crs == test_grid.crs
+    assert test_written.data_vars["tda1"].chunks == ((1, 1, 1), (5, 5, 2), (5, 5, 5, 1))
+    assert test_written.data_vars["scalar"] == 1
+    for name in ("tda1", "tda2"):
+        assert test_written.data_vars[name].dtype == test_reprojected.data_vars[name].dtype
+        np.testing.assert_equal(
+            test_written.data_vars[name].attrs["_FillValue"], test_reprojected.data_vars[name].attrs["_FillValue"]
+        )
+        np.testing.assert_array_equal(test_written.data_vars[name].values, test_reprojected.data_vars[name].values)
+
+    # Simulate a crash: tile 0 not recorded, the others recorded but tile 1 altered afterwards
+    test_written.close()
+    (tmp_path / "reprojected.zarr.completed_tiles" / "0-5_0-5").unlink()
+    xr.Dataset({"tda2": (("t", "y", "x"), np.full((3, 5, 5), 7, dtype=np.int16))}).to_zarr(
+        test_store, region={"t": slice(0, 3), "y": slice(0, 5), "x": slice(0, 5)}, consolidated=False
+    )
+    xr.Dataset({"tda2": (("t", "y", "x"), np.full((3, 5, 5), 7, dtype=np.int16))}).to_zarr(
+        test_store, region={"t": slice(0, 3), "y": slice(0, 5), "x": slice(5, 10)}, consolidated=False
+    )
+    test_resumed = reproject_to_zarr(
+        data=test_dataset, output_grid=test_grid, store=test_store, tile_width=5, tile_height=5, max_workers=2
+    )
+    np.testing.assert_array_equal(
+        test_resumed.data_vars["tda2"].values[:, :5, :5], test_reprojected.data_vars["tda2"].values[:, :5, :5]
+    )
+    assert np.all(test_resumed.data_vars["tda2"].values[:, :5, 5:10] == 7)
+
+    # Resuming with another tiling, other variables or other time steps would leave pixels unwritten
+    with pytest.raises(GSGridError):
+        reproject_to_zarr(data=test_dataset, output_grid=test_grid, store=test_store, tile_width=8, tile_height=8)
+    with pytest.raises(GSGridError):
+        reproject_to_zarr(
+            data=test_dataset.drop_vars("tda2"), output_grid=test_grid, store=test_store, tile_width=5, tile_height=5
+        )
+    with pytest.raises(GSGridError):
+        reproject_to_zarr(
+            data=test_dataset.isel(t=slice(0, 2)), output_grid=test_grid, store=test_store, tile_width=5, tile_height=5
+        )
+    with pytest.raises(GSGridError):
+        reproject_to_zarr(
+            data=test_dataset.chunk(t=3), output_grid=test_grid, store=test_store, tile_width=5, tile_height=5
+        )
+
+
+def test_reproject_to_zarr_other_grid(tmp_path: Path):
+    test_grid = GSGrid(x0=0, y0=10, resolution=1, width=6, height=6, crs=CRS.from_epsg(3857))
+    reproject_to_zarr(data=test_data_array_georef, output_grid=test_grid, store=tmp_path / "test.zarr", max_workers=1)
+    with pytest.raises(GSGridError):
+        reproject_to_zarr(
+            data=test_data_array_georef,
+            output_grid=GSGrid(x0=0, y0=10, resolution=2, width=3, height=3, crs=CRS.from_epsg(3857)),
+            store=tmp_path / "test.zarr",
+        )
@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from pyproj import CRS
+
+import geospatial_grid.transformers
+from geospatial_grid.transformers import clear_transformer_cache, get_transformer
+
+
+def test_get_transformer():
+    clear_transformer_cache()
+    transformer = get_transformer(CRS.from_epsg(32631), 4326)
+    assert transformer is get_transformer(CRS.from_epsg(32631), 4326)
+    assert transformer is not get_transformer(4326, CRS.from_epsg(32631))
+    # always_xy
+    lon, lat = transformer.transform(500000, 5000000)
+    np.testing.assert_allclose((lon, lat), (3, 45.153), atol=0.001)
+
+
+def test_get_transformer_lru(monkeypatch):
+    monkeypatch.setattr(geospatial_grid.transformers, "TRANSFORMER_CACHE_SIZE", 2)
+    clear_transformer_cache()
+    transformer = get_transformer(32631, 4326)
+    get_transformer(32632, 4326)
+    assert get_transformer(32631, 4326) is transformer
+    get_transformer(32633, 4326)
+    # 32632 -> 4326 was the least recently used
+    assert get_transformer(32631, 4326) is transformer
+    assert len(geospatial_grid.transformers._transformer_cache) == 2
+    clear_transformer_cache()
+    assert get_transformer(32631, 4326) is not transformer
+
+
+def test_get_transformer_threads():
+    clear_transformer_cache()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(
+            executor.map(lambda i: get_transformer(32631, 4326).transform(500000 + i, 5000000), range(100))
+        )
+    assert len(set(results)) == 100